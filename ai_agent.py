@@ -1,35 +1,59 @@
-import os
-from openai import OpenAI
-from config.prompts import (
-    OPENAI_MODEL,
+from prompts import (
     OPENAI_TEMPERATURE,
-    WEBSITE_ANALYSIS_PROMPT,
-    LINKEDIN_ANALYSIS_PROMPT,
-    MESSAGE_GENERATION_PROMPT,
-    SYSTEM_CONTEXT
+    MESSAGE_GENERATION_PROMPT
 )
+from llm_client import get_llm_client
+from model_router import get_model_router
+from summarizer import get_summarizer
+from prompt_registry import get_prompt
+from prompt_packing import PackedRunner, pack_items, packed_instructions
+from structured_output import JSON_MODE
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
 class AIAgent:
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        self.model = OPENAI_MODEL
+        self.llm_client = get_llm_client()
+        # Modell pro Stufe: Zusammenfassungen auf dem kleinen, Nachrichten auf dem großen Modell
+        self.router = get_model_router()
+        # Lange Seiten werden abschnittsweise verdichtet statt ungekürzt in den Prompt zu gehen
+        self.summarizer = get_summarizer()
         self.temperature = OPENAI_TEMPERATURE
     
+    def _request(self, prompt, inputs, **params):
+        """Parameter einer Chat-Completion, gecacht über den gemeinsamen LLM-Cache."""
+        return self.router.request(get_prompt(prompt), inputs, self.temperature, **params)
+    
+    def _website_request(self, website_content):
+        # Nahezu gleiche Websites (z.B. derselben Branche) teilen sich die Analyse über den semantischen Cache
+        return self._request("website_analysis", {"website_content": website_content}, semantic_input=website_content)
+    
+    def _linkedin_request(self, linkedin_content):
+        return self._request("linkedin_analysis", {"linkedin_content": linkedin_content}, semantic_input=linkedin_content)
+    
+    def _message_request(self, website_summary, linkedin_summary, communication_style):
+        return self._request("message_generation", {
+            "website_summary": website_summary,
+            "linkedin_summary": linkedin_summary,
+            "communication_style": communication_style
+        })
+    
     def analyze_website(self, website_content):
         """Analysiert den Website-Content mit dem konfigurierten Prompt."""
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                temperature=self.temperature,
-                messages=[
-                    {"role": "system", "content": SYSTEM_CONTEXT},
-                    {"role": "user", "content": WEBSITE_ANALYSIS_PROMPT + "\n\n" + website_content}
-                ]
-            )
-            return response.choices[0].message.content
+            website_content = self.summarizer.condense(website_content, "Website")
+            return self.llm_client.complete(**self._website_request(website_content))
+        except Exception as e:
+            logger.error(f"Fehler bei der Website-Analyse: {str(e)}")
+            return "Keine Website-Analyse verfügbar"
+    
+    async def aanalyze_website(self, website_content):
+        """Asynchrone Variante von analyze_website."""
+        try:
+            website_content = await self.summarizer.acondense(website_content, "Website")
+            return await self.llm_client.acomplete(**self._website_request(website_content))
         except Exception as e:
             logger.error(f"Fehler bei der Website-Analyse: {str(e)}")
             return "Keine Website-Analyse verfügbar"
@@ -37,15 +61,17 @@ class AIAgent:
     def analyze_linkedin(self, linkedin_content):
         """Analysiert den LinkedIn-Content mit dem konfigurierten Prompt."""
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                temperature=self.temperature,
-                messages=[
-                    {"role": "system", "content": SYSTEM_CONTEXT},
-                    {"role": "user", "content": LINKEDIN_ANALYSIS_PROMPT + "\n\n" + linkedin_content}
-                ]
-            )
-            return response.choices[0].message.content
+            linkedin_content = self.summarizer.condense(linkedin_content, "LinkedIn-Profil")
+            return self.llm_client.complete(**self._linkedin_request(linkedin_content))
+        except Exception as e:
+            logger.error(f"Fehler bei der LinkedIn-Analyse: {str(e)}")
+            return "Keine LinkedIn-Analyse verfügbar"
+    
+    async def aanalyze_linkedin(self, linkedin_content):
+        """Asynchrone Variante von analyze_linkedin."""
+        try:
+            linkedin_content = await self.summarizer.acondense(linkedin_content, "LinkedIn-Profil")
+            return await self.llm_client.acomplete(**self._linkedin_request(linkedin_content))
         except Exception as e:
             logger.error(f"Fehler bei der LinkedIn-Analyse: {str(e)}")
             return "Keine LinkedIn-Analyse verfügbar"
@@ -53,25 +79,81 @@ class AIAgent:
     def generate_message(self, website_summary, linkedin_summary, communication_style):
         """Generiert eine personalisierte Nachricht basierend auf den Analysen."""
         try:
-            prompt = MESSAGE_GENERATION_PROMPT.format(
-                website_summary=website_summary,
-                linkedin_summary=linkedin_summary,
-                communication_style=communication_style
+            return self.llm_client.complete(
+                **self._message_request(website_summary, linkedin_summary, communication_style)
             )
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                temperature=self.temperature,
-                messages=[
-                    {"role": "system", "content": SYSTEM_CONTEXT},
-                    {"role": "user", "content": prompt}
-                ]
+        except Exception as e:
+            logger.error(f"Fehler bei der Nachrichtengenerierung: {str(e)}")
+            return "Keine personalisierte Nachricht verfügbar"
+    
+    async def agenerate_message(self, website_summary, linkedin_summary, communication_style):
+        """Asynchrone Variante von generate_message."""
+        try:
+            return await self.llm_client.acomplete(
+                **self._message_request(website_summary, linkedin_summary, communication_style)
             )
-            return response.choices[0].message.content
         except Exception as e:
             logger.error(f"Fehler bei der Nachrichtengenerierung: {str(e)}")
             return "Keine personalisierte Nachricht verfügbar"
 
+    async def aanalyze_lead(self, website_content, linkedin_content, communication_style):
+        """Analysiert Website und LinkedIn-Profil gleichzeitig und generiert daraus die Nachricht.
+        
+        Die beiden Analysen sind unabhängig voneinander; erst die Nachrichtengenerierung
+        wartet auf beide Ergebnisse.
+        """
+        website_summary, linkedin_summary = await asyncio.gather(
+            self.aanalyze_website(website_content),
+            self.aanalyze_linkedin(linkedin_content)
+        )
+        message = await self.agenerate_message(website_summary, linkedin_summary, communication_style)
+        return {
+            "website_summary": website_summary,
+            "linkedin_summary": linkedin_summary,
+            "message": message
+        }
+    
+    def analyze_lead(self, website_content, linkedin_content, communication_style):
+        """Blockierende Variante von aanalyze_lead."""
+        return self.llm_client.run(
+            self.aanalyze_lead(website_content, linkedin_content, communication_style)
+        )
+
+    def _packed_message_request(self, pack):
+        """Ein Prompt für die Nachrichten mehrerer Leads; Systemkontext und Regeln werden nur einmal gesendet."""
+        prompt = get_prompt(
+            "packed_message_generation",
+            message_rules=MESSAGE_GENERATION_PROMPT.format(
+                website_summary="website_summary des Leads",
+                linkedin_summary="linkedin_summary des Leads",
+                communication_style="communication_style des Leads"
+            ),
+            packed_instructions=packed_instructions("Text der personalisierten Nachricht als String")
+        )
+        return self.router.request(prompt, {"leads": pack_items(pack)}, self.temperature, cache_inputs=pack,
+                                   response_format=JSON_MODE)
+    
+    def generate_messages(self, leads, pack_size=10):
+        """Generiert die Nachrichten vieler Leads mit gepackten Prompts.
+        
+        leads ist eine Liste von Dicts mit website_summary, linkedin_summary und
+        communication_style. Leads ohne gültige Ausgabe werden einzeln generiert.
+        """
+        def is_message(item):
+            return isinstance(item, str) and bool(item.strip())
+        
+        packer = PackedRunner(self.llm_client, self._packed_message_request, is_message, pack_size=pack_size)
+        items = {
+            str(i): {key: lead[key] for key in ("website_summary", "linkedin_summary", "communication_style")}
+            for i, lead in enumerate(leads)
+        }
+        results = packer.run(items)
+        logger.info(f"Gepackte Nachrichtengenerierung: {packer.stats()}")
+        return [
+            results[str(i)] if str(i) in results else self.generate_message(**items[str(i)])
+            for i in range(len(leads))
+        ]
+
 # Funktionen für die Streamlit-App
 def get_leads_from_apify():
     """Holt die Leads von Apify."""
@@ -0,0 +1,169 @@
+"""
+Offline-Benchmark der HTML-Extraktoren gegen den gespeicherten Seiten-Korpus.
+
+Misst Seiten/Sekunde, p50/p95-Latenz und Spitzenspeicher von DomainAnalyzer,
+LinkedInAnalyzer und AIAgent.scrape_website (Textextraktion) und vergleicht
+die Ausgaben feldweise mit den Golden-Ergebnissen.
+
+Verwendung:
+    python benchmarks/extraction_benchmark.py [--repeat 20] [--update-golden]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_DIR = os.path.join(ROOT, "benchmarks", "corpus")
+
+# Die Extraktoren brauchen keine Zugangsdaten, config.py prüft diese aber beim Import
+for var in ("OPENAI_API_KEY", "APIFY_API_KEY", "APIFY_ACTOR_ID", "APIFY_DATASET_URL",
+            "SPREADSHEET_ID", "EMAIL_USERNAME", "EMAIL_PASSWORD"):
+    os.environ.setdefault(var, "offline-benchmark")
+os.chdir(ROOT)
+sys.path.insert(0, ROOT)
+
+from domain_analyzer import DomainAnalyzer
+from linkedin_analyzer import LinkedInAnalyzer
+
+def load_frontend_agent():
+    """Lädt frontend/ai_agent.py, das denselben Modulnamen wie ai_agent.py trägt"""
+    spec = importlib.util.spec_from_file_location("frontend_ai_agent", os.path.join(ROOT, "frontend", "ai_agent.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.AIAgent
+
+def build_extractors() -> Dict[str, Dict]:
+    """Extraktoren mit den Seitentypen, auf die sie angewendet werden"""
+    domain_analyzer = DomainAnalyzer()
+    linkedin_analyzer = LinkedInAnalyzer()
+    agent_class = load_frontend_agent()
+
+    return {
+        "domain_analyzer": {"kinds": {"company"}, "run": domain_analyzer.parse_html},
+        "linkedin_analyzer": {"kinds": {"profile"}, "run": linkedin_analyzer.parse_html},
+        # scrape_website wird im Frontend für Websites und LinkedIn-Profile verwendet
+        "scrape_website": {"kinds": {"company", "profile"}, "run": lambda html, url: agent_class.extract_text(html)}
+    }
+
+def load_corpus() -> Dict:
+    with open(os.path.join(CORPUS_DIR, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    for page in manifest["pages"]:
+        with open(os.path.join(CORPUS_DIR, "pages", f"{page['id']}.html"), "r", encoding="utf-8") as f:
+            page["html"] = f.read()
+    return manifest
+
+def golden_path(page_id: str) -> str:
+    return os.path.join(CORPUS_DIR, "golden", f"{page_id}.json")
+
+def load_golden(page_id: str) -> Dict:
+    path = golden_path(page_id)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def diff_fields(expected, actual, prefix: str = "") -> List[str]:
+    """Vergleicht zwei Ausgaben feldweise und gibt die abweichenden Felder zurück"""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        diffs = []
+        for key in sorted(set(expected) | set(actual)):
+            diffs.extend(diff_fields(expected.get(key), actual.get(key), f"{prefix}.{key}" if prefix else key))
+        return diffs
+    if expected != actual:
+        return [f"{prefix or '<wert>'}: {_short(expected)} -> {_short(actual)}"]
+    return []
+
+def _short(value, limit: int = 60) -> str:
+    text = json.dumps(value, ensure_ascii=False)
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def benchmark(name: str, run: Callable, pages: List[Dict], repeat: int) -> Dict:
+    """Führt einen Extraktor über alle Seiten aus und misst Latenz und Speicher"""
+    latencies = []
+    outputs = {}
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            t0 = time.perf_counter()
+            outputs[page["id"]] = run(page["html"], page["url"])
+            latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "extractor": name,
+        "pages": len(latencies),
+        "pages_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "peak_mem_kb": peak / 1024,
+        "outputs": outputs
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline-Benchmark der HTML-Extraktoren")
+    parser.add_argument("--repeat", type=int, default=20, help="Durchläufe über den Korpus")
+    parser.add_argument("--update-golden", action="store_true", help="Golden-Ergebnisse mit der aktuellen Ausgabe überschreiben")
+    parser.add_argument("--json", action="store_true", help="Ergebnisse als JSON ausgeben")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    extractors = build_extractors()
+    goldens = {page["id"]: load_golden(page["id"]) for page in corpus["pages"]}
+
+    results = []
+    diffs = []
+    for name, extractor in extractors.items():
+        pages = [page for page in corpus["pages"] if page["kind"] in extractor["kinds"]]
+        result = benchmark(name, extractor["run"], pages, args.repeat)
+
+        for page_id, output in result.pop("outputs").items():
+            if args.update_golden:
+                goldens[page_id][name] = output
+            elif name in goldens[page_id]:
+                diffs.extend(f"{page_id} [{name}] {d}" for d in diff_fields(goldens[page_id][name], output))
+            else:
+                diffs.append(f"{page_id} [{name}] kein Golden-Ergebnis vorhanden")
+        results.append(result)
+
+    if args.update_golden:
+        for page_id, golden in goldens.items():
+            with open(golden_path(page_id), "w", encoding="utf-8") as f:
+                json.dump(golden, f, indent=2, ensure_ascii=False)
+                f.write("\n")
+
+    if args.json:
+        print(json.dumps({"corpus_version": corpus["version"], "results": results, "diffs": diffs}, indent=2, ensure_ascii=False))
+    else:
+        print(f"Korpus v{corpus['version']}: {len(corpus['pages'])} Seiten, {args.repeat} Durchläufe")
+        print(f"{'Extraktor':<20}{'Seiten':>8}{'Seiten/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'Peak KB':>10}")
+        for r in results:
+            print(f"{r['extractor']:<20}{r['pages']:>8}{r['pages_per_sec']:>12.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['peak_mem_kb']:>10.0f}")
+        if args.update_golden:
+            print("Golden-Ergebnisse aktualisiert")
+        elif diffs:
+            print(f"\n{len(diffs)} Abweichungen gegenüber Golden:")
+            for d in diffs:
+                print(f"  {d}")
+        else:
+            print("\nKeine Abweichungen gegenüber Golden")
+
+    sys.exit(1 if diffs and not args.update_golden else 0)
+
+if __name__ == "__main__":
+    main()
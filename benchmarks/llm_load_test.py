@@ -0,0 +1,149 @@
+"""
+Lasttest der LLM-Stufen gegen den OpenAI-kompatiblen Mock-Server.
+
+Schickt synthetische Leads durch CommunicationAnalyzer.analyze_many, die
+Website-/LinkedIn-Analyse und Nachrichtengenerierung des AIAgent sowie
+LeadProcessor.agenerate_content (ohne Browser und E-Mail-Versand). Gemessen
+werden Leads/Sekunde, Fehler, p50/p95-Latenz pro Stufe und wie oft der Server
+mit 429 geantwortet hat, d.h. wie Limiter, Parallelität und Backoff unter Last
+zusammenspielen. Ohne --base-url startet der Mock im selben Prozess.
+
+Verwendung:
+    python benchmarks/llm_load_test.py --leads 2000 --latency lognormal:0.8:0.5 --error-rate 0.02 --tpm 200000
+    LLM_TPM_LIMIT=200000 LLM_MAX_CONCURRENCY=32 python benchmarks/llm_load_test.py --leads 2000 --tpm 200000
+    HEDGE_CALL_CLASSES='*' python benchmarks/llm_load_test.py --leads 1000 --latency lognormal:0.3:0.8
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# config.py prüft die Zugangsdaten beim Import; gegen den Mock genügen Platzhalter
+for var in ("OPENAI_API_KEY", "APIFY_API_KEY", "APIFY_ACTOR_ID", "APIFY_DATASET_URL",
+            "SPREADSHEET_ID", "EMAIL_USERNAME", "EMAIL_PASSWORD"):
+    os.environ.setdefault(var, "mock-load-test")
+os.chdir(ROOT)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from mock_openai_server import MockOpenAIServer, add_mock_arguments, mock_options
+
+STAGES = ("analyzer", "agent", "processor")
+
+INDUSTRIES = ["Maschinenbau", "Software", "Logistik", "Gesundheitswesen", "Einzelhandel", "Beratung", "Energie"]
+TITLES = ["Geschäftsführer", "Head of Sales", "CMO", "Gründerin", "Vertriebsleiter", "CTO", "Marketing Managerin"]
+
+def synthetic_leads(count: int, seed: int = 7) -> List[Dict]:
+    """Leads mit Website- und Profildaten, damit keine Stufe einen Browser braucht"""
+    rng = random.Random(seed)
+    leads = []
+    for i in range(count):
+        industry = rng.choice(INDUSTRIES)
+        title = rng.choice(TITLES)
+        leads.append({
+            "email": f"lead{i}@example.com",
+            "name": f"Lead {i}",
+            "title": title,
+            "company": f"Firma {i} GmbH",
+            "industry": industry,
+            "headline": f"{title} bei Firma {i} | {industry}",
+            "domain_info": {"title": f"Firma {i}", "description": f"Lösungen für {industry} seit {1990 + i % 30}"},
+            "linkedin_info": {"about": f"{title} mit {5 + i % 20} Jahren Erfahrung in {industry}."}
+        })
+    return leads
+
+def run_analyzer(leads: List[Dict]) -> int:
+    from communication_analyzer import CommunicationAnalyzer
+    results = CommunicationAnalyzer().analyze_many(leads)
+    return sum(1 for result in results if isinstance(result, Exception))
+
+def run_agent(leads: List[Dict]) -> int:
+    from ai_agent import AIAgent
+    agent = AIAgent()
+    coroutines = [
+        agent.aanalyze_lead(lead["domain_info"]["description"], lead["linkedin_info"]["about"], "formell")
+        for lead in leads
+    ]
+    results = agent.llm_client.run(agent.llm_client.gather(coroutines, return_exceptions=True))
+    return sum(1 for result in results if isinstance(result, Exception))
+
+def run_processor(leads: List[Dict]) -> int:
+    from lead_processor import LeadProcessor
+
+    class OfflineLeadProcessor(LeadProcessor):
+        """Nur die LLM-Stufen: kein Browser, Leads bringen ihre Daten mit"""
+        def setup_browser(self):
+            self.browser = None
+
+    processor = OfflineLeadProcessor()
+    plan = {"communication_style": True, "email": True}
+    coroutines = [processor.agenerate_content(lead, lead, plan) for lead in leads]
+    results = processor.llm_client.run(processor.llm_client.gather(coroutines, return_exceptions=True))
+    return sum(1 for result in results if isinstance(result, Exception))
+
+RUNNERS = {"analyzer": run_analyzer, "agent": run_agent, "processor": run_processor}
+
+def server_stats(base_url: str) -> Dict:
+    with urllib.request.urlopen(base_url.rstrip("/") + "/stats", timeout=10) as response:
+        return json.loads(response.read())
+
+def main():
+    parser = argparse.ArgumentParser(description="Lasttest der LLM-Stufen gegen den Mock-Server")
+    parser.add_argument("--leads", type=int, default=500, help="Anzahl synthetischer Leads")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Kommagetrennt: " + ", ".join(STAGES))
+    parser.add_argument("--base-url", help="Bereits laufender Mock-Server, z.B. http://127.0.0.1:8800/v1")
+    parser.add_argument("--keep-cache", action="store_true", help="Konfigurierten LLM-Cache verwenden statt eines leeren")
+    parser.add_argument("--json", action="store_true", help="Ergebnisse als JSON ausgeben")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server = MockOpenAIServer(**mock_options(args)).start()
+        base_url = server.base_url
+    os.environ["OPENAI_BASE_URL"] = base_url
+    if not args.keep_cache:
+        # Ein gefüllter Cache würde die Last vom Server fernhalten
+        os.environ["LLM_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "llm_cache.sqlite3")
+
+    from llm_client import get_llm_client
+    leads = synthetic_leads(args.leads)
+    results = []
+    for stage in [stage.strip() for stage in args.stages.split(",") if stage.strip()]:
+        started = time.perf_counter()
+        errors = RUNNERS[stage](leads)
+        elapsed = time.perf_counter() - started
+        results.append({"stage": stage, "leads": len(leads), "seconds": round(elapsed, 2),
+                        "leads_per_sec": round(len(leads) / elapsed, 1) if elapsed else 0.0, "errors": errors})
+
+    report = {"results": results, "usage": get_llm_client().usage_stats(), "server": server_stats(base_url),
+              "hedging": get_llm_client().hedger.stats()}
+    if server is not None:
+        server.stop()
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+    print(f"{'Stufe':<12}{'Leads':>8}{'Sekunden':>10}{'Leads/s':>10}{'Fehler':>8}")
+    for r in results:
+        print(f"{r['stage']:<12}{r['leads']:>8}{r['seconds']:>10.2f}{r['leads_per_sec']:>10.1f}{r['errors']:>8}")
+    print(f"\n{'Namespace':<28}{'Aufrufe':>8}{'p50 s':>8}{'p95 s':>8}")
+    for namespace, usage in report["usage"].items():
+        print(f"{namespace:<28}{usage['calls']:>8}{usage['latency_p50_s']:>8.2f}{usage['latency_p95_s']:>8.2f}")
+    if report["hedging"]:
+        print(f"\n{'Hedging':<28}{'Aufrufe':>8}{'Hedges':>8}{'Gewonnen':>10}{'p99 ohne':>10}{'p99 mit':>9}{'Kappungen':>11}")
+        for call_class, hedge in report["hedging"].items():
+            print(f"{call_class:<28}{hedge['calls']:>8}{hedge['hedged']:>8}{hedge['hedge_wins']:>10}"
+                  f"{hedge['p99_without_s']:>10.2f}{hedge['p99_with_s']:>9.2f}{hedge['p99_cuts']:>11}")
+    print(f"\nServer: {report['server']}")
+
+if __name__ == "__main__":
+    main()
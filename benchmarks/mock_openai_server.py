@@ -0,0 +1,364 @@
+"""
+OpenAI-kompatibler Mock-Server für Lasttests der LLM-Pipeline.
+
+Beantwortet /v1/chat/completions (auch gestreamt) und /v1/embeddings mit
+konfigurierbarer Latenzverteilung, eingestreuten 429/500-Fehlern und einem
+Minutenbudget für Requests und Tokens wie bei der echten API. Erwartet ein
+Prompt JSON, antwortet der Server mit den Feldern, die der Prompt beschreibt
+(auch für gepackte Prompts pro Lead-ID); eigene Antworten lassen sich über
+--canned vorgeben. GET /stats liefert die Zähler des Servers.
+
+Verwendung:
+    python benchmarks/mock_openai_server.py --port 8800 --latency lognormal:0.8:0.5 --error-rate 0.02 --tpm 90000
+    OPENAI_BASE_URL=http://127.0.0.1:8800/v1 python run.py --test
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+# Feldbeschreibungen in den Prompts: "- name: Beschreibung" oder "- name (Liste von Texten): Beschreibung"
+FIELD_LINE = re.compile(r"^\s*-\s*([A-Za-z_]+)\s*(?:\(([^)]*)\))?\s*:\s*(.*)$", re.M)
+
+FILLER = ("Wir unterstützen Unternehmen dabei, ihre Vertriebsprozesse messbar effizienter zu gestalten "
+          "und mit klaren Daten bessere Entscheidungen zu treffen.").split()
+
+class LatencyDistribution:
+    """Latenz in Sekunden, z.B. "fixed:0.5", "uniform:0.2:1.5", "lognormal:0.8:0.5" (Median, Sigma), "exponential:0.6" (Mittel)"""
+
+    def __init__(self, spec: str = "fixed:0"):
+        kind, *values = spec.split(":")
+        self.kind = kind
+        self.values = [float(value) for value in values]
+        if kind not in ("fixed", "uniform", "lognormal", "exponential"):
+            raise ValueError(f"Unbekannte Latenzverteilung: {spec}")
+
+    def sample(self) -> float:
+        if self.kind == "uniform":
+            return random.uniform(*self.values)
+        if self.kind == "lognormal":
+            median, sigma = self.values
+            return random.lognormvariate(0, sigma) * median
+        if self.kind == "exponential":
+            return random.expovariate(1 / self.values[0])
+        return self.values[0] if self.values else 0.0
+
+def estimate_tokens(text: str) -> int:
+    """Grobe Schätzung wie bei der API-Abrechnung, ohne Tokenizer: etwa vier Zeichen pro Token"""
+    return max(1, len(text) // 4)
+
+class MinuteBudget:
+    """Gleitendes 60-Sekunden-Fenster für Requests und Tokens"""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._events = deque()
+        self._lock = threading.Lock()
+
+    def take(self, tokens: int) -> Optional[float]:
+        """Bucht einen Request; gibt None zurück oder die Wartezeit, bis das Budget reicht"""
+        now = time.monotonic()
+        with self._lock:
+            while self._events and now - self._events[0][0] >= 60:
+                self._events.popleft()
+            used_tokens = sum(event[1] for event in self._events)
+            # Ein Aufruf über dem Minutenbudget darf nur in ein leeres Fenster
+            if (self.rpm and len(self._events) + 1 > self.rpm) or (self.tpm and self._events and used_tokens + tokens > self.tpm):
+                # Wie die API: Wartezeit bis der älteste Eintrag aus dem Fenster fällt
+                return max(0.05, 60 - (now - self._events[0][0]))
+            self._events.append((now, tokens))
+            return None
+
+    def remaining(self) -> Tuple[int, int]:
+        with self._lock:
+            return (self.rpm - len(self._events) if self.rpm else 0,
+                    self.tpm - sum(event[1] for event in self._events) if self.tpm else 0)
+
+class MockOpenAI:
+    """Zustand und Antwortlogik des Servers, unabhängig vom HTTP-Handler"""
+
+    def __init__(self, latency: str = "fixed:0", token_latency: float = 0.0, error_rate: float = 0.0,
+                 server_error_rate: float = 0.0, retry_after: float = 1.0, rpm: int = 0, tpm: int = 0,
+                 completion_tokens: int = 120, logprob: float = -0.05, embedding_dim: int = 1536,
+                 canned: Optional[List[Dict[str, Any]]] = None, seed: Optional[int] = None):
+        self.latency = LatencyDistribution(latency)
+        self.token_latency = token_latency
+        self.error_rate = error_rate
+        self.server_error_rate = server_error_rate
+        self.retry_after = retry_after
+        self.budget = MinuteBudget(rpm, tpm)
+        self.completion_tokens = completion_tokens
+        self.logprob = logprob
+        self.embedding_dim = embedding_dim
+        self.canned = canned or []
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        if seed is not None:
+            random.seed(seed)
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counts[name] += amount
+
+    def admit(self, tokens: int) -> Optional[Tuple[int, Dict[str, Any], Dict[str, str]]]:
+        """Prüft Fehlerinjektion und Minutenbudget; gibt (Status, Fehler, Header) oder None zurück"""
+        if random.random() < self.server_error_rate:
+            self.count("injected_500")
+            return 500, {"message": "Mock: injizierter Serverfehler", "type": "server_error"}, {}
+        if random.random() < self.error_rate:
+            self.count("injected_429")
+            return 429, {"message": "Mock: injiziertes Rate-Limit", "type": "rate_limit_exceeded"}, \
+                {"retry-after": str(self.retry_after)}
+        wait = self.budget.take(tokens)
+        if wait is not None:
+            self.count("rate_limited_429")
+            return 429, {"message": "Mock: Minutenbudget erschöpft", "type": "rate_limit_exceeded"}, \
+                {"retry-after-ms": str(int(wait * 1000))}
+        return None
+
+    def rate_headers(self) -> Dict[str, str]:
+        requests, tokens = self.budget.remaining()
+        return {"x-ratelimit-remaining-requests": str(requests), "x-ratelimit-remaining-tokens": str(tokens)}
+
+    def _text(self, words: int, seed: str) -> str:
+        rng = random.Random(seed)
+        return " ".join(rng.choice(FILLER) for _ in range(words)).capitalize() + "."
+
+    def _item(self, fields: List[Tuple[str, str, str]], seed: str) -> Any:
+        if not fields:
+            return self._text(self.completion_tokens * 3 // 4, seed)
+        words = max(3, self.completion_tokens * 3 // 4 // len(fields))
+        item = {}
+        for name, kind, description in fields:
+            if "Liste" in kind or description.startswith("Liste"):
+                item[name] = [self._text(3, f"{seed}{name}{i}") for i in range(2)]
+            else:
+                item[name] = self._text(words, seed + name)
+        return item
+
+    def chat_content(self, request: Dict[str, Any]) -> str:
+        """Antworttext: passende Vorgabe aus --canned, sonst aus den Feldern des Prompts erzeugt"""
+        messages = request.get("messages", [])
+        text = "\n".join(str(message.get("content", "")) for message in messages)
+        for entry in self.canned:
+            if entry["match"] in text:
+                content = entry["content"]
+                return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+
+        seed = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        wants_json = (request.get("response_format") or {}).get("type") == "json_object" or "JSON" in text
+        if not wants_json:
+            return self._text(self.completion_tokens * 3 // 4, seed)
+
+        fields = {}
+        for name, kind, description in FIELD_LINE.findall(text):
+            fields[name] = (name, kind, description)
+        fields = list(fields.values())
+        if "Lead-ID" in text:
+            last = str(messages[-1].get("content", "")) if messages else ""
+            start = last.rfind("\n{") + 1 if not last.startswith("{") else 0
+            try:
+                ids = list(json.JSONDecoder().raw_decode(last[start:])[0])
+            except ValueError:
+                ids = []
+            return json.dumps({lead_id: self._item(fields, seed + lead_id) for lead_id in ids}, ensure_ascii=False)
+        return json.dumps(self._item(fields, seed), ensure_ascii=False)
+
+    def embedding(self, text: str) -> List[float]:
+        """Deterministischer Vektor pro Text, damit ein semantischer Cache reproduzierbar trifft"""
+        rng = random.Random(hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest())
+        return [rng.gauss(0, 1) for _ in range(self.embedding_dim)]
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    mock: MockOpenAI = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in {**self.mock.rate_headers(), **(headers or {})}.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            self._send(200, dict(self.mock.counts))
+        elif self.path.rstrip("/").endswith("/models"):
+            self._send(200, {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "mock"}]})
+        else:
+            self._send(404, {"error": {"message": f"Unbekannter Pfad {self.path}"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.endswith("/chat/completions"):
+            self._chat(request)
+        elif self.path.endswith("/embeddings"):
+            self._embeddings(request)
+        else:
+            self._send(404, {"error": {"message": f"Unbekannter Pfad {self.path}"}})
+
+    def _reject(self, tokens: int) -> bool:
+        rejection = self.mock.admit(tokens)
+        if rejection is None:
+            return False
+        status, error, headers = rejection
+        self._send(status, {"error": error}, headers)
+        return True
+
+    def _chat(self, request: Dict[str, Any]):
+        mock = self.mock
+        mock.count("chat_requests")
+        prompt = "".join(str(message.get("content", "")) for message in request.get("messages", []))
+        prompt_tokens = estimate_tokens(prompt)
+        if self._reject(prompt_tokens + int(request.get("max_tokens") or mock.completion_tokens)):
+            return
+
+        content = mock.chat_content(request)
+        completion_tokens = estimate_tokens(content)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        mock.count("prompt_tokens", prompt_tokens)
+        mock.count("completion_tokens", completion_tokens)
+        base = {"id": f"chatcmpl-mock-{random.getrandbits(32):x}", "created": int(time.time()),
+                "model": request.get("model", "mock")}
+        time.sleep(mock.latency.sample())
+
+        if request.get("stream"):
+            self._stream(base, content, usage, bool((request.get("stream_options") or {}).get("include_usage")))
+            return
+
+        time.sleep(mock.token_latency * completion_tokens)
+        logprobs = None
+        if request.get("logprobs"):
+            logprobs = {"content": [{"token": token, "logprob": mock.logprob, "bytes": None, "top_logprobs": []}
+                                    for token in content.split()]}
+        self._send(200, {
+            **base,
+            "object": "chat.completion",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop", "logprobs": logprobs}],
+            "usage": usage
+        })
+
+    def _stream(self, base: Dict[str, Any], content: str, usage: Dict[str, int], include_usage: bool):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(choices, usage=None):
+            chunk = {**base, "object": "chat.completion.chunk", "choices": choices, "usage": usage}
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        pieces = re.findall(r"\S+\s*", content)
+        for piece in pieces:
+            time.sleep(self.mock.token_latency)
+            event([{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+        event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if include_usage:
+            event([], usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _embeddings(self, request: Dict[str, Any]):
+        mock = self.mock
+        mock.count("embedding_requests")
+        texts = request.get("input", [])
+        texts = [texts] if isinstance(texts, str) else texts
+        tokens = sum(estimate_tokens(text) for text in texts)
+        if self._reject(tokens):
+            return
+        time.sleep(mock.latency.sample())
+        self._send(200, {
+            "object": "list",
+            "model": request.get("model", "mock"),
+            "data": [{"object": "embedding", "index": i, "embedding": mock.embedding(text)} for i, text in enumerate(texts)],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+        })
+
+class MockHTTPServer(ThreadingHTTPServer):
+    # Der Standard-Backlog von 5 verwirft Verbindungen, sobald viele Clients gleichzeitig anfragen
+    request_queue_size = 1024
+    daemon_threads = True
+
+class MockOpenAIServer:
+    """Startet den Mock in einem Hintergrund-Thread, z.B. für Lasttests im selben Prozess"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **options):
+        self.mock = MockOpenAI(**options)
+        handler = type("BoundMockHandler", (MockHandler,), {"mock": self.mock})
+        self.httpd = MockHTTPServer((host, port), handler)
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockOpenAIServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    """Gemeinsame Optionen für den Server und den Lasttest"""
+    parser.add_argument("--latency", default="lognormal:0.8:0.5", help="Latenzverteilung pro Aufruf")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Sekunden pro Ausgabe-Token")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Anteil zufälliger 429-Antworten")
+    parser.add_argument("--server-error-rate", type=float, default=0.0, help="Anteil zufälliger 500-Antworten")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After der injizierten 429 in Sekunden")
+    parser.add_argument("--rpm", type=int, default=0, help="Requests pro Minute (0: unbegrenzt)")
+    parser.add_argument("--tpm", type=int, default=0, help="Tokens pro Minute (0: unbegrenzt)")
+    parser.add_argument("--completion-tokens", type=int, default=120, help="Ungefähre Länge der Antworten")
+    parser.add_argument("--canned", help="JSON-Datei mit [{\"match\": Teilstring, \"content\": Antwort}]")
+    parser.add_argument("--seed", type=int, help="Seed für reproduzierbare Latenzen und Fehler")
+
+def mock_options(args: argparse.Namespace) -> Dict[str, Any]:
+    canned = None
+    if args.canned:
+        with open(args.canned, encoding="utf-8") as f:
+            canned = json.load(f)
+    return {
+        "latency": args.latency, "token_latency": args.token_latency, "error_rate": args.error_rate,
+        "server_error_rate": args.server_error_rate, "retry_after": args.retry_after, "rpm": args.rpm,
+        "tpm": args.tpm, "completion_tokens": args.completion_tokens, "canned": canned, "seed": args.seed
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-kompatibler Mock-Server für Lasttests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(args.host, args.port, **mock_options(args))
+    print(f"Mock-Server läuft auf {server.base_url} (OPENAI_BASE_URL)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print(f"Zähler: {dict(server.mock.counts)}")
+    finally:
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
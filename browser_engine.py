@@ -0,0 +1,188 @@
+from typing import List, Optional, Union
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from webdriver_manager.chrome import ChromeDriverManager
+from browser_supervisor import DriverSupervisor, processes_rss_mb, register_spawned_browsers
+from config import *
+from logger import logger
+
+def create_chrome_driver() -> webdriver.Chrome:
+    """Startet einen Headless-Chrome mit den Standardoptionen"""
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument(f"user-agent={USER_AGENT}")
+
+    driver = webdriver.Chrome(
+        service=Service(ChromeDriverManager().install()),
+        options=chrome_options
+    )
+    driver.set_page_load_timeout(SELENIUM_TIMEOUT)
+    driver.set_script_timeout(SELENIUM_TIMEOUT)
+    return driver
+
+class BrowserEngine(ABC):
+    """Gemeinsame Schnittstelle aller Rendering-Backends"""
+    # Anzahl der Seiten, die gleichzeitig gerendert werden können
+    max_concurrency = 1
+
+    @abstractmethod
+    def render(self, url: str) -> str:
+        """Lädt eine Seite und gibt das gerenderte HTML zurück"""
+
+    def render_many(self, urls: List[str]) -> List[Union[str, Exception]]:
+        """Rendert mehrere Seiten; Fehler werden pro URL als Exception zurückgegeben"""
+        results = []
+        for url in urls:
+            try:
+                results.append(self.render(url))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def close(self):
+        """Gibt alle Browser-Ressourcen frei"""
+        pass
+
+class SeleniumEngine(BrowserEngine):
+    """Ein überwachter Chrome pro Engine, Seiten werden nacheinander gerendert"""
+
+    def __init__(self):
+        # Der Supervisor serialisiert die Zugriffe, recycelt den Driver und ersetzt abgestürzte Sessions
+        self.supervisor = DriverSupervisor(create_chrome_driver)
+        self.supervisor.get_driver()
+
+    def render(self, url: str) -> str:
+        def load(driver):
+            driver.get(url)
+            return driver.page_source
+        return self.supervisor.run(load)
+
+    def close(self):
+        self.supervisor.close()
+
+class PlaywrightEngine(BrowserEngine):
+    """Rendert viele Seiten gleichzeitig in isolierten Kontexten eines einzigen Chromium-Prozesses"""
+
+    # Ressourcen, die für die Textextraktion nicht gebraucht werden
+    BLOCKED_RESOURCES = {"image", "media", "font"}
+
+    def __init__(self, max_pages: int = BROWSER_MAX_PAGES):
+        self.max_concurrency = max_pages
+        # Eigene Event-Loop in einem Hintergrund-Thread, damit synchrone Aufrufer
+        # aus beliebig vielen Threads parallel rendern können
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self._run(self._start())
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _start(self):
+        # Optionale Abhängigkeit, wird nur für BROWSER_ENGINE=playwright benötigt
+        from playwright.async_api import async_playwright
+
+        self._playwright = await async_playwright().start()
+        # Browser-Prozesse pro Chromium-Instanz, für die RSS-Grenze
+        self._processes = {}
+        self._browser = await self._launch()
+        self._page_count = 0
+        self._active = {}
+        self._retired = set()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._restart_lock = asyncio.Lock()
+
+    async def _launch(self):
+        known = {process.pid for processes in self._processes.values() for process in processes}
+        browser = await self._playwright.chromium.launch(
+            headless=True,
+            args=["--no-sandbox", "--disable-dev-shm-usage"]
+        )
+        # Damit der Reaper den Chromium nach einem Absturz dieses Prozesses findet
+        spawned = register_spawned_browsers()
+        self._processes[browser] = [process for process in spawned if process.pid not in known]
+        return browser
+
+    async def _block_resources(self, route):
+        if route.request.resource_type in self.BLOCKED_RESOURCES:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _current_browser(self):
+        # Abgestürzten Browser transparent ersetzen und nach BROWSER_RECYCLE_PAGES Seiten
+        # oder ab BROWSER_MAX_RSS_MB Arbeitsspeicher aller seiner Prozesse recyceln
+        async with self._restart_lock:
+            recycle_due = BROWSER_RECYCLE_PAGES and self._page_count >= BROWSER_RECYCLE_PAGES
+            rss = processes_rss_mb(self._processes.get(self._browser, [])) if BROWSER_MAX_RSS_MB else 0
+            if BROWSER_MAX_RSS_MB and rss >= BROWSER_MAX_RSS_MB:
+                recycle_due = True
+            if not self._browser.is_connected() or recycle_due:
+                logger.info(f"Starte Chromium neu nach {self._page_count} Seiten ({rss:.0f} MB RSS)")
+                self._retired.add(self._browser)
+                await self._close_if_idle(self._browser)
+                self._browser = await self._launch()
+                self._page_count = 0
+            self._page_count += 1
+            self._active[self._browser] = self._active.get(self._browser, 0) + 1
+            return self._browser
+
+    async def _close_if_idle(self, browser):
+        # Ausgemusterte Browser erst schließen, wenn keine Seite mehr darin rendert
+        if browser in self._retired and not self._active.get(browser):
+            self._retired.discard(browser)
+            self._active.pop(browser, None)
+            self._processes.pop(browser, None)
+            if browser.is_connected():
+                await browser.close()
+
+    async def _render(self, url: str) -> str:
+        async with self._semaphore:
+            browser = await self._current_browser()
+            try:
+                context = await browser.new_context(user_agent=USER_AGENT)
+                try:
+                    await context.route("**/*", self._block_resources)
+                    page = await context.new_page()
+                    await page.goto(url, timeout=SELENIUM_TIMEOUT * 1000, wait_until="domcontentloaded")
+                    return await page.content()
+                finally:
+                    await context.close()
+            finally:
+                self._active[browser] -= 1
+                await self._close_if_idle(browser)
+
+    async def _render_all(self, urls: List[str]) -> List[Union[str, Exception]]:
+        return await asyncio.gather(*(self._render(url) for url in urls), return_exceptions=True)
+
+    async def _shutdown(self):
+        await self._browser.close()
+        await self._playwright.stop()
+
+    def render(self, url: str) -> str:
+        return self._run(self._render(url))
+
+    def render_many(self, urls: List[str]) -> List[Union[str, Exception]]:
+        return self._run(self._render_all(urls))
+
+    def close(self):
+        try:
+            self._run(self._shutdown())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+def create_browser_engine(engine: Optional[str] = None) -> BrowserEngine:
+    """Erstellt das konfigurierte Rendering-Backend"""
+    engine = (engine or BROWSER_ENGINE).lower()
+    if engine == "playwright":
+        return PlaywrightEngine()
+    if engine == "selenium":
+        return SeleniumEngine()
+    raise ValueError(f"Unbekannte Browser-Engine: {engine}")
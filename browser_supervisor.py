@@ -0,0 +1,287 @@
+from typing import Callable, List, Optional, Set, Tuple, TypeVar
+import sqlite3
+import threading
+import weakref
+import psutil
+from selenium import webdriver
+from selenium.common.exceptions import InvalidSessionIdException, NoSuchWindowException, WebDriverException
+from config import *
+from logger import logger
+
+T = TypeVar("T")
+
+# Namen der Prozesse, die von Selenium gestartet werden
+BROWSER_PROCESS_NAMES = ("chrome", "chromium", "chromedriver", "headless_shell")
+
+# Fehlermeldungen, an denen eine abgestürzte Browser-Session erkannt wird
+CRASH_MARKERS = (
+    "chrome not reachable",
+    "disconnected",
+    "session deleted",
+    "tab crashed",
+    "target window already closed",
+    "no such window"
+)
+
+# Alle lebenden Supervisor-Instanzen, damit der Reaper deren Prozesse verschont
+_supervisors = weakref.WeakSet()
+
+class BrowserRegistry:
+    """Merkt sich die Browser-Prozesse, die diese Anwendung gestartet hat.
+
+    Pro Prozess werden PID und Startzeit, PID und Startzeit des startenden
+    Python-Prozesses (owner) und die Quelle ("selenium" oder "playwright")
+    gespeichert; die Startzeit schützt vor wiederverwendeten PIDs. Die
+    SQLite-Datei wird von allen Instanzen auf dem Host geteilt, damit ein neuer
+    Lauf die Prozesse eines abgestürzten findet.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS browser_processes (
+                pid INTEGER NOT NULL,
+                create_time REAL NOT NULL,
+                owner_pid INTEGER NOT NULL,
+                owner_create_time REAL NOT NULL,
+                source TEXT NOT NULL,
+                PRIMARY KEY (pid, create_time)
+            )
+        """)
+        self._conn.commit()
+        self._owner = psutil.Process()
+
+    def register(self, processes: List[psutil.Process], source: str = "selenium"):
+        """Speichert gerade gestartete Browser-Prozesse dieses Python-Prozesses"""
+        rows = []
+        for process in processes:
+            try:
+                rows.append((process.pid, process.create_time(), self._owner.pid, self._owner.create_time(), source))
+            except psutil.Error:
+                continue
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO browser_processes VALUES (?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def forget(self, entries: List[Tuple[int, float]]):
+        """Entfernt Einträge als (pid, Startzeit)"""
+        with self._lock:
+            self._conn.executemany("DELETE FROM browser_processes WHERE pid = ? AND create_time = ?", entries)
+            self._conn.commit()
+
+    def entries(self) -> List[Tuple[int, float, int, float, str]]:
+        """Alle Einträge als (pid, Startzeit, owner_pid, owner-Startzeit, Quelle)"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT pid, create_time, owner_pid, owner_create_time, source FROM browser_processes"
+            ).fetchall()
+
+# Prozessweite Instanz
+_registry = None
+
+def get_browser_registry() -> BrowserRegistry:
+    """Gibt die Singleton-Instanz der Browser-Prozessliste zurück."""
+    global _registry
+    if _registry is None:
+        _registry = BrowserRegistry(BROWSER_PROCESS_DB)
+    return _registry
+
+def _running(pid: int, create_time: float) -> Optional[psutil.Process]:
+    """Gibt den Prozess zurück, wenn er noch läuft und nicht nur seine PID wiederverwendet wurde"""
+    try:
+        process = psutil.Process(pid)
+        if abs(process.create_time() - create_time) < 0.01 and process.status() != psutil.STATUS_ZOMBIE:
+            return process
+    except psutil.Error:
+        pass
+    return None
+
+def register_spawned_browsers() -> List[psutil.Process]:
+    """Speichert alle Browser-Prozesse unterhalb dieses Python-Prozesses, z.B. nach dem Start von Playwright"""
+    try:
+        processes = [
+            process for process in psutil.Process().children(recursive=True)
+            if (process.name() or "").lower().startswith(BROWSER_PROCESS_NAMES)
+        ]
+    except psutil.Error:
+        return []
+    get_browser_registry().register(processes, source="playwright")
+    return processes
+
+def processes_rss_mb(processes: List[psutil.Process]) -> float:
+    """Summe des Arbeitsspeichers (RSS) der Prozesse und aller ihrer Kindprozesse in MB"""
+    seen = {}
+    for process in processes:
+        try:
+            for member in [process] + process.children(recursive=True):
+                seen.setdefault(member.pid, member)
+        except psutil.Error:
+            continue
+    total = 0
+    for process in seen.values():
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            continue
+    return total / (1024 * 1024)
+
+class DriverSupervisor:
+    """Überwacht einen WebDriver und ersetzt ihn bei Absturz oder zu hohem Ressourcenverbrauch"""
+
+    def __init__(self, factory: Callable[[], webdriver.Chrome],
+                 max_pages: int = BROWSER_RECYCLE_PAGES,
+                 max_rss_mb: int = BROWSER_MAX_RSS_MB):
+        self.factory = factory
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.driver: Optional[webdriver.Chrome] = None
+        self.page_count = 0
+        self.recycle_count = 0
+        self.restart_count = 0
+        self._lock = threading.RLock()
+        _supervisors.add(self)
+
+    def get_driver(self) -> webdriver.Chrome:
+        """Gibt den aktiven Driver zurück und startet bei Bedarf einen neuen"""
+        with self._lock:
+            if self.driver is None:
+                self.driver = self.factory()
+                self.page_count = 0
+                # Nur selbst gestartete Prozesse darf der Reaper später beenden
+                get_browser_registry().register(self.processes())
+            return self.driver
+
+    def run(self, action: Callable[[webdriver.Chrome], T]) -> T:
+        """Führt eine Aktion mit dem Driver aus und startet abgestürzte Sessions einmal neu"""
+        with self._lock:
+            try:
+                result = action(self.get_driver())
+            except WebDriverException as e:
+                if not self._is_crash(e):
+                    raise
+                logger.warning(f"Browser-Session abgestürzt, starte neu: {str(e).splitlines()[0]}")
+                self.restart_count += 1
+                self._quit_driver()
+                result = action(self.get_driver())
+
+            self.page_count += 1
+            self._check_limits()
+            return result
+
+    def processes(self) -> List[psutil.Process]:
+        """Gibt chromedriver und alle Chrome-Kindprozesse des Drivers zurück"""
+        if self.driver is None:
+            return []
+        try:
+            root = psutil.Process(self.driver.service.process.pid)
+            return [root] + root.children(recursive=True)
+        except (psutil.Error, AttributeError):
+            return []
+
+    def rss_mb(self) -> float:
+        """Summe des Arbeitsspeichers (RSS) aller Prozesse des Drivers in MB"""
+        return processes_rss_mb(self.processes())
+
+    def recycle(self, reason: str):
+        """Beendet den aktuellen Driver; der nächste Aufruf startet einen frischen"""
+        with self._lock:
+            logger.info(f"Recycle Browser nach {self.page_count} Seiten ({reason})")
+            self.recycle_count += 1
+            self._quit_driver()
+
+    def close(self):
+        """Beendet den Driver endgültig"""
+        with self._lock:
+            self._quit_driver()
+
+    def _check_limits(self):
+        if self.max_pages and self.page_count >= self.max_pages:
+            self.recycle("Seitenlimit erreicht")
+            return
+        if self.max_rss_mb:
+            rss = self.rss_mb()
+            if rss >= self.max_rss_mb:
+                self.recycle(f"RSS {rss:.0f} MB")
+
+    def _quit_driver(self):
+        if self.driver is None:
+            return
+        processes = self.processes()
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.warning(f"Fehler beim Beenden des Browsers: {str(e)}")
+        finally:
+            self.driver = None
+            # Prozesse, die quit() überlebt haben, hart beenden
+            _kill(processes)
+            _forget(processes)
+
+    @staticmethod
+    def _is_crash(error: WebDriverException) -> bool:
+        if isinstance(error, (InvalidSessionIdException, NoSuchWindowException)):
+            return True
+        message = (error.msg or str(error)).lower()
+        return any(marker in message for marker in CRASH_MARKERS)
+
+def _kill(processes: List[psutil.Process]):
+    # psutil prüft vor dem Signal die Startzeit und schützt so vor wiederverwendeten PIDs
+    for process in processes:
+        try:
+            process.kill()
+        except psutil.Error:
+            continue
+
+def _forget(processes: List[psutil.Process]):
+    entries = []
+    for process in processes:
+        try:
+            entries.append((process.pid, process.create_time()))
+        except psutil.Error:
+            continue
+    try:
+        get_browser_registry().forget(entries)
+    except sqlite3.Error as e:
+        logger.warning(f"Fehler beim Austragen der Browser-Prozesse: {str(e)}")
+
+def reap_orphaned_browsers() -> int:
+    """Beendet verwaiste Browser-Prozesse, die diese Anwendung gestartet hat, und gibt deren Anzahl zurück.
+
+    Verwaist ist ein eingetragener Prozess, dessen startender Python-Prozess
+    nicht mehr läuft, oder ein Selenium-Prozess dieses Python-Prozesses, der
+    keinem Supervisor mehr gehört. Fremde Browser (z.B. der Chrome eines
+    Nutzers) werden nie angefasst.
+    """
+    supervised: Set[int] = set()
+    for supervisor in list(_supervisors):
+        supervised |= {process.pid for process in supervisor.processes()}
+
+    registry = get_browser_registry()
+    me = psutil.Process()
+    stale, orphans = [], {}
+    for pid, create_time, owner_pid, owner_create_time, source in registry.entries():
+        process = _running(pid, create_time)
+        if process is None:
+            stale.append((pid, create_time))
+            continue
+        if owner_pid == me.pid and abs(owner_create_time - me.create_time()) < 0.01:
+            # Playwright-Browser gehören der laufenden Engine und haben keinen Supervisor
+            if source != "selenium" or pid in supervised:
+                continue
+        elif _running(owner_pid, owner_create_time) is not None:
+            # Gehört einer anderen, noch laufenden Instanz
+            continue
+        try:
+            for orphan in [process] + process.children(recursive=True):
+                orphans[orphan.pid] = orphan
+        except psutil.Error:
+            continue
+        stale.append((pid, create_time))
+
+    _kill(list(orphans.values()))
+    registry.forget(stale)
+    if orphans:
+        logger.info(f"{len(orphans)} verwaiste Browser-Prozesse beendet")
+    return len(orphans)
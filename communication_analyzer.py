@@ -1,78 +1,199 @@
-from typing import Dict
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema import StrOutputParser
-import json
+from typing import Any, Dict, List, Optional
 from config import *
+from llm_client import get_llm_client
+from model_router import get_model_router
+from prompt_serializer import compact_lead, serialize_compact, serialize_lead
+from prompt_packing import PackedRunner, pack_items, packed_instructions
+from prompt_registry import get_prompt
+from prompts import ANALYSIS_SCHEMA, FUSED_ANALYSIS_FORMAT, FUSED_ANALYSIS_SCHEMA, INTEREST_SCHEMA, PERSONALIZATION_SCHEMA
+from structured_output import JSON_MODE
+from style_classifier import get_style_classifier
+
+# Rückfallwerte für Felder, die auch nach Reparatur und Nachfrage fehlen
+DEFAULT_ANALYSIS = {
+    "style": "unbekannt",
+    "tone": "neutral",
+    "interests": [],
+    "pain_points": [],
+    "approach": "standard"
+}
+DEFAULT_PERSONALIZATION = {
+    "positive_observation": "Ihrem Unternehmen und Ihrem Profil",
+    "value_proposition": "unserer Lösung",
+    "follow_up": "unserem Angebot",
+    "final_offer": "unserem Service"
+}
+
+# Empfohlene Ansprache für die Analyse des lokalen Stil-Klassifikators
+APPROACHES = {
+    ("formell", "direkt"): "Förmliche Ansprache mit Sie, kurz und auf den Punkt",
+    ("formell", "indirekt"): "Förmliche Ansprache mit Sie, Mehrwert behutsam herleiten",
+    ("informell", "direkt"): "Lockere Ansprache, kurz und auf den Punkt",
+    ("informell", "indirekt"): "Lockere, persönliche Ansprache mit Bezug zum Profil"
+}
+
+def _analysis_from_prediction(prediction: Dict) -> Dict:
+    """Stil, Tonfall und Ansprache aus den Labels des Klassifikators; Interessen und Schmerzpunkte liefert das LLM"""
+    return {
+        **DEFAULT_ANALYSIS,
+        "style": f"{prediction['formality']}, {prediction['directness']}",
+        "tone": prediction["tone"],
+        "approach": APPROACHES.get((prediction["formality"], prediction["directness"]), DEFAULT_ANALYSIS["approach"])
+    }
+
+def _has_fused_keys(result) -> bool:
+    """Ein fusioniertes Ergebnis muss alle Analyse- und Personalisierungsschlüssel enthalten"""
+    return not FUSED_ANALYSIS_SCHEMA.check(result)[1]
 
 class CommunicationAnalyzer:
-    def __init__(self):
-        self.llm = ChatOpenAI(api_key=OPENAI_API_KEY)
+    def __init__(self, fused: bool = FUSED_ANALYSIS, pack_size: int = LLM_PACK_SIZE):
+        self.llm_client = get_llm_client()
+        self.router = get_model_router()
+        # Lokaler Stil-Klassifikator; None, wenn deaktiviert oder noch nicht trainiert
+        self.style_classifier = get_style_classifier()
+        # Fusionierter Modus: Analyse und Personalisierung in einem Aufruf statt zwei
+        self.fused = fused
+        # Gepackter Modus für analyze_many: mehrere Leads pro Aufruf (0 oder 1 deaktiviert)
+        self.packer = PackedRunner(self.llm_client, self._packed_request, _has_fused_keys, pack_size=pack_size) if pack_size > 1 else None
         
-    def analyze_style(self, lead_data: Dict) -> Dict:
-        """Analysiert den Kommunikationsstil basierend auf den Lead-Daten"""
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """Du bist ein Experte für Kommunikationsanalyse. 
-            Analysiere die folgenden Informationen und bestimme:
-            1. Den Kommunikationsstil (formell/informell, direkt/indirekt, etc.)
-            2. Die bevorzugte Kommunikationsweise
-            3. Mögliche Interessengebiete
-            4. Potenzielle Schmerzpunkte
-            5. Passende Ansprache
+    def _request(self, prompt: str, inputs: Dict, **params) -> Dict:
+        """Rendert einen Prompt aus der Registry und bündelt die Parameter für den LLM-Client"""
+        return self.router.request(get_prompt(prompt), inputs, LLM_TEMPERATURE, **params)
+        
+    def _lead_data(self, lead_data: Dict, prompt: str) -> str:
+        """Kompakte Lead-Daten, gezählt mit dem Tokenizer des Modells der Stufe"""
+        return serialize_lead(lead_data, prompt, self.router.model_for(prompt), PROMPT_TOKEN_BUDGET)
+        
+    def _style_request(self, lead_data: Dict) -> Dict:
+        inputs = {"lead_data": self._lead_data(lead_data, "communication_analysis")}
+        # Ähnliche Profile (gleiche Headline, Branche) teilen sich die Stilanalyse über den semantischen Cache
+        return self._request("communication_analysis", inputs, semantic_input=inputs["lead_data"])
             
-            Formatiere die Antwort als JSON mit den folgenden Schlüsseln:
-            - style: Hauptkommunikationsstil
-            - tone: Tonfall
-            - interests: Liste von Interessengebieten
-            - pain_points: Liste von möglichen Schmerzpunkten
-            - approach: Empfohlene Ansprache
-            """),
-            ("user", "{lead_data}")
-        ])
+    def _interest_request(self, lead_data: Dict) -> Dict:
+        inputs = {"lead_data": self._lead_data(lead_data, "interest_analysis")}
+        return self._request("interest_analysis", inputs)
+            
+    def _local_analyses(self, leads: List[Dict]) -> List[Optional[Dict]]:
+        """Analysen des lokalen Klassifikators in einem Batch, None für Leads mit geringer Konfidenz"""
+        if self.style_classifier is None:
+            return [None] * len(leads)
+        texts = [self._lead_data(lead_data, "communication_analysis") for lead_data in leads]
+        return [_analysis_from_prediction(p) if p else None for p in self.style_classifier.classify(texts)]
+            
+    def analyze_style(self, lead_data: Dict) -> Dict:
+        """Analysiert den Kommunikationsstil basierend auf den Lead-Daten.
+        
+        Bestimmt der lokale Klassifikator den Stil, fragt ein kürzerer Prompt nur
+        noch Interessen und Schmerzpunkte ab, die in die Personalisierung eingehen.
+        """
+        local = self._local_analyses([lead_data])[0]
+        if local is not None:
+            return {**local, **self.llm_client.complete_json(INTEREST_SCHEMA, **self._interest_request(lead_data))}
+        result = self.llm_client.complete_json(ANALYSIS_SCHEMA, **self._style_request(lead_data))
+        return {**DEFAULT_ANALYSIS, **result}
+        
+    async def aanalyze_style(self, lead_data: Dict) -> Dict:
+        """Asynchrone Variante von analyze_style"""
+        local = self._local_analyses([lead_data])[0]
+        if local is not None:
+            return {**local, **await self.llm_client.acomplete_json(INTEREST_SCHEMA, **self._interest_request(lead_data))}
+        result = await self.llm_client.acomplete_json(ANALYSIS_SCHEMA, **self._style_request(lead_data))
+        return {**DEFAULT_ANALYSIS, **result}
         
-        chain = prompt | self.llm | StrOutputParser()
-        result = chain.invoke({"lead_data": json.dumps(lead_data, indent=2)})
-        
-        try:
-            return json.loads(result)
-        except:
-            return {
-                "style": "unbekannt",
-                "tone": "neutral",
-                "interests": [],
-                "pain_points": [],
-                "approach": "standard"
-            }
+    async def aanalyze_styles(self, leads: List[Dict]) -> List[Dict]:
+        """Analysiert mehrere Leads: den Stil lokal in einem Batch, unsichere Leads vollständig über das LLM.
+        
+        Für lokal klassifizierte Leads holt der kürzere Interessen-Prompt nur Interessen und Schmerzpunkte.
+        """
+        analyses = self._local_analyses(leads)
+        requests = [
+            self.llm_client.acomplete_json(ANALYSIS_SCHEMA, **self._style_request(lead_data)) if analysis is None
+            else self.llm_client.acomplete_json(INTEREST_SCHEMA, **self._interest_request(lead_data))
+            for lead_data, analysis in zip(leads, analyses)
+        ]
+        results = await self.llm_client.gather(requests)
+        return [{**(analysis or DEFAULT_ANALYSIS), **result} for analysis, result in zip(analyses, results)]
             
+    def _personalization_request(self, lead_data: Dict, analysis: Dict) -> Dict:
+        inputs = {
+            "lead_data": self._lead_data(lead_data, "personalization"),
+            "analysis": serialize_compact(analysis)
+        }
+        return self._request("personalization", inputs)
+                
     def generate_personalization(self, lead_data: Dict, analysis: Dict) -> Dict:
         """Generiert personalisierte Inhalte basierend auf der Analyse"""
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """Generiere personalisierte Inhalte für die E-Mail basierend auf:
-            1. Lead-Daten
-            2. Kommunikationsanalyse
-            3. Unternehmen und Position
-            
-            Formatiere die Antwort als JSON mit den folgenden Schlüsseln:
-            - positive_observation: Positive Beobachtung über das Unternehmen/Profil
-            - value_proposition: Personalisierter Wertversprechen
-            - follow_up: Personalisierter Follow-Up Text
-            - final_offer: Personalisiertes finales Angebot
-            """),
-            ("user", "Lead-Daten: {lead_data}\nAnalyse: {analysis}")
-        ])
+        result = self.llm_client.complete_json(PERSONALIZATION_SCHEMA, **self._personalization_request(lead_data, analysis))
+        return {**DEFAULT_PERSONALIZATION, **result}
+        
+    async def agenerate_personalization(self, lead_data: Dict, analysis: Dict) -> Dict:
+        """Asynchrone Variante von generate_personalization"""
+        result = await self.llm_client.acomplete_json(PERSONALIZATION_SCHEMA, **self._personalization_request(lead_data, analysis))
+        return {**DEFAULT_PERSONALIZATION, **result}
+        
+    def _fused_request(self, lead_data: Dict) -> Dict:
+        inputs = {"lead_data": self._lead_data(lead_data, "fused_analysis")}
+        return self._request("fused_analysis", inputs)
+        
+    def _packed_request(self, pack: Dict[str, Dict]) -> Dict:
+        """Ein Prompt für mehrere Leads: Systemprompt und Formatanweisung werden nur einmal gesendet"""
+        prompt = get_prompt(
+            "packed_analysis",
+            packed_instructions=packed_instructions("JSON-Objekt mit den folgenden Schlüsseln:" + FUSED_ANALYSIS_FORMAT)
+        )
+        return self.router.request(prompt, {"leads": pack_items(pack)}, LLM_TEMPERATURE, cache_inputs=pack,
+                                   response_format=JSON_MODE)
         
-        chain = prompt | self.llm | StrOutputParser()
-        result = chain.invoke({
-            "lead_data": json.dumps(lead_data, indent=2),
-            "analysis": json.dumps(analysis, indent=2)
+    @staticmethod
+    def _fused_parts(data: Dict) -> Dict[str, Dict]:
+        """Teilt ein fusioniertes Ergebnis in Analyse und Personalisierung auf"""
+        data, _ = FUSED_ANALYSIS_SCHEMA.check(data)
+        return {
+            "analysis": {key: data.get(key, default) for key, default in DEFAULT_ANALYSIS.items()},
+            "personalization": {key: data.get(key, default) for key, default in DEFAULT_PERSONALIZATION.items()}
+        }
+        
+    def analyze_and_personalize(self, lead_data: Dict) -> Dict[str, Dict]:
+        """Liefert Analyse und Personalisierung, je nach Modus mit einem oder zwei LLM-Aufrufen"""
+        if self.fused:
+            return self._fused_parts(self.llm_client.complete_json(FUSED_ANALYSIS_SCHEMA, **self._fused_request(lead_data)))
+        analysis = self.analyze_style(lead_data)
+        return {"analysis": analysis, "personalization": self.generate_personalization(lead_data, analysis)}
+        
+    async def aanalyze_and_personalize(self, lead_data: Dict) -> Dict[str, Dict]:
+        """Asynchrone Variante von analyze_and_personalize"""
+        if self.fused:
+            return self._fused_parts(await self.llm_client.acomplete_json(FUSED_ANALYSIS_SCHEMA, **self._fused_request(lead_data)))
+        analysis = await self.aanalyze_style(lead_data)
+        return {"analysis": analysis, "personalization": await self.agenerate_personalization(lead_data, analysis)}
+        
+    async def _aanalyze_packed(self, leads: List[Dict]) -> List[Dict[str, Any]]:
+        results = await self.packer.arun({
+            str(i): compact_lead(lead_data, "packed_analysis", self.router.model_for("packed_analysis"), PROMPT_TOKEN_BUDGET)
+            for i, lead_data in enumerate(leads)
         })
+        missing = [i for i in range(len(leads)) if str(i) not in results]
+        # Leads ohne gültige Ausgabe einzeln nachholen
+        fallback = await self.llm_client.gather([self.aanalyze_and_personalize(leads[i]) for i in missing])
+        singles = dict(zip(missing, fallback))
+        return [singles[i] if i in singles else self._fused_parts(results[str(i)]) for i in range(len(leads))]
         
-        try:
-            return json.loads(result)
-        except:
-            return {
-                "positive_observation": "Ihrem Unternehmen und Ihrem Profil",
-                "value_proposition": "unserer Lösung",
-                "follow_up": "unserem Angebot",
-                "final_offer": "unserem Service"
-            } 
\ No newline at end of file
+    def analyze_many(self, leads: List[Dict]) -> List[Dict[str, Any]]:
+        """Analysiert und personalisiert mehrere Leads gleichzeitig unter dem gemeinsamen Rate-Limit.
+        
+        Im gepackten Modus teilen sich mehrere Leads eine Completion mit id-basierter Ausgabe.
+        """
+        if self.packer is not None:
+            return self.llm_client.run(self._aanalyze_packed(leads))
+        if self.fused:
+            return self.llm_client.run(
+                self.llm_client.gather([self.aanalyze_and_personalize(lead_data) for lead_data in leads])
+            )
+        return self.llm_client.run(self._aanalyze_separate(leads))
+        
+    async def _aanalyze_separate(self, leads: List[Dict]) -> List[Dict[str, Any]]:
+        analyses = await self.aanalyze_styles(leads)
+        personalizations = await self.llm_client.gather([
+            self.agenerate_personalization(lead_data, analysis) for lead_data, analysis in zip(leads, analyses)
+        ])
+        return [{"analysis": a, "personalization": p} for a, p in zip(analyses, personalizations)]
\ No newline at end of file
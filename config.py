@@ -21,6 +21,10 @@ SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 EMAIL_USERNAME = os.getenv("EMAIL_USERNAME")
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
+# Signatur der E-Mails
+SENDER_NAME = os.getenv("SENDER_NAME", "")
+SENDER_POSITION = os.getenv("SENDER_POSITION", "")
+SENDER_COMPANY = os.getenv("SENDER_COMPANY", "")
 
 # Scraping Konfiguration
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
@@ -28,6 +32,29 @@ USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTM
 # Timeout Konfiguration
 SELENIUM_TIMEOUT = int(os.getenv("SELENIUM_TIMEOUT", "30"))
 API_TIMEOUT = int(os.getenv("API_TIMEOUT", "60"))
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "15"))  # Websites per requests; danach übernimmt der Browser
+
+# Browser-Engine Konfiguration ("selenium" oder "playwright")
+BROWSER_ENGINE = os.getenv("BROWSER_ENGINE", "selenium")
+BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "8"))
+
+# Browser-Recycling für langlaufende Worker (0 deaktiviert das jeweilige Limit)
+BROWSER_RECYCLE_PAGES = int(os.getenv("BROWSER_RECYCLE_PAGES", "200"))
+BROWSER_MAX_RSS_MB = int(os.getenv("BROWSER_MAX_RSS_MB", "1500"))
+# Von dieser Anwendung gestartete Browser-Prozesse; nur diese beendet der Reaper
+BROWSER_PROCESS_DB = os.getenv("BROWSER_PROCESS_DB", "browser_processes.sqlite3")
+
+# LLM Konfiguration; Modelle pro Stufe über LLM_SMALL_MODEL, LLM_LARGE_MODEL und LLM_STAGE_MODELS (model_router.py)
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.7"))
+
+# Analyse und Personalisierung in einem LLM-Aufruf statt zwei ("true"/"false")
+FUSED_ANALYSIS = os.getenv("FUSED_ANALYSIS", "false").lower() == "true"
+
+# Token-Budget für die Lead-Daten in einem Prompt
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1200"))
+
+# Leads pro gepackter Completion bei Massenverarbeitung (0 deaktiviert das Packen)
+LLM_PACK_SIZE = int(os.getenv("LLM_PACK_SIZE", "0"))
 
 # Retry Konfiguration
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
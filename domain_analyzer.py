@@ -1,36 +1,66 @@
-from typing import Dict
+from typing import Dict, List, Optional
 from bs4 import BeautifulSoup
 import requests
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+from browser_engine import BrowserEngine, create_browser_engine
 from config import *
+from hedging import get_hedger
 
 class DomainAnalyzer:
-    def __init__(self):
-        self.setup_selenium()
+    def __init__(self, browser: Optional[BrowserEngine] = None):
+        # Der Browser wird erst beim ersten Fallback gestartet
+        self._browser = browser
+        # Ein übergebener Browser gehört dem Aufrufer und wird hier nicht geschlossen
+        self._owns_browser = browser is None
+        self.hedger = get_hedger()
         
-    def setup_selenium(self):
-        """Richtet Selenium für das Web-Scraping ein"""
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument(f"user-agent={USER_AGENT}")
-        self.driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()),
-            options=chrome_options
-        )
+    @property
+    def browser(self) -> BrowserEngine:
+        """Gibt das Rendering-Backend zurück und startet es bei Bedarf"""
+        if self._browser is None:
+            self._browser = create_browser_engine()
+        return self._browser
         
-    def analyze_domain(self, domain: str) -> Dict:
-        """Analysiert eine Unternehmenswebsite"""
+    def _fetch_html(self, domain: str) -> Optional[str]:
+        """Holt das HTML per requests, None wenn ein Browser nötig ist"""
+        fetch = lambda: requests.get(f"https://{domain}", headers={"User-Agent": USER_AGENT}, timeout=REQUEST_TIMEOUT)
         try:
-            # Versuche zuerst mit requests
-            response = requests.get(f"https://{domain}", headers={"User-Agent": USER_AGENT})
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # GET ist idempotent; ein hängender Server wird bei Freigabe ein zweites Mal angefragt
+            response = self.hedger.call("domain_fetch", fetch)
+            return response.text
         except:
-            # Fallback auf Selenium
-            self.driver.get(f"https://{domain}")
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+            return None
+        
+    def analyze_domain(self, domain: str) -> Dict:
+        """Analysiert eine Unternehmenswebsite"""
+        # Versuche zuerst mit requests, Fallback auf den Browser
+        html = self._fetch_html(domain)
+        if html is None:
+            html = self.browser.render(f"https://{domain}")
+            
+        return self.parse_html(html, domain)
+        
+    def analyze_domains(self, domains: List[str]) -> List[Dict]:
+        """Analysiert mehrere Websites; Browser-Fallbacks werden gemeinsam gerendert"""
+        pages = {domain: self._fetch_html(domain) for domain in domains}
+        
+        fallback = [domain for domain, html in pages.items() if html is None]
+        if fallback:
+            rendered = self.browser.render_many([f"https://{domain}" for domain in fallback])
+            for domain, html in zip(fallback, rendered):
+                pages[domain] = html
+                
+        results = []
+        for domain in domains:
+            html = pages[domain]
+            if isinstance(html, Exception):
+                results.append({"error": str(html), "url": domain})
+            else:
+                results.append(self.parse_html(html, domain))
+        return results
+        
+    def parse_html(self, html: str, domain: str) -> Dict:
+        """Extrahiert die Unternehmensinformationen aus dem HTML"""
+        soup = BeautifulSoup(html, 'html.parser')
             
         # Extrahiere grundlegende Informationen
         title = soup.title.string if soup.title else ""
@@ -79,7 +109,7 @@ class DomainAnalyzer:
             for element in elements:
                 services.extend([li.get_text(strip=True) for li in element.find_all("li")])
                 
-        return list(set(services))  # Entferne Duplikate
+        return list(dict.fromkeys(services))  # Entferne Duplikate, Reihenfolge bleibt stabil
         
     def _find_contact_info(self, soup: BeautifulSoup) -> Dict:
         """Findet Kontaktinformationen"""
@@ -108,5 +138,5 @@ class DomainAnalyzer:
         
     def __del__(self):
         """Cleanup beim Beenden"""
-        if hasattr(self, 'driver'):
-            self.driver.quit() 
\ No newline at end of file
+        if self._owns_browser and self._browser is not None:
+            self._browser.close() 
\ No newline at end of file
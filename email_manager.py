@@ -1,11 +1,11 @@
-from typing import Dict
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import json
 from config import *
 from logger import logger
+from email_templates import get_template_engine
+from mail_queue import get_mail_queue
+from smtp_pool import build_message, get_smtp_pool
 
 class EmailManager:
     def __init__(self):
@@ -13,22 +13,22 @@ class EmailManager:
         self.smtp_port = SMTP_PORT
         self.username = EMAIL_USERNAME
         self.password = EMAIL_PASSWORD
+        # Angemeldete SMTP-Sitzungen, geteilt mit dem LeadProcessor
+        self.pool = get_smtp_pool()
+        # Versand im Hintergrund unter den Provider-Limits
+        self.queue = get_mail_queue()
+        # Beim Import kompilierte Vorlagen mit Render-Cache
+        self.templates = get_template_engine()
+        self.sender = {
+            "sender_name": SENDER_NAME,
+            "sender_position": SENDER_POSITION,
+            "sender_company": SENDER_COMPANY
+        }
         
     def send_email(self, to_email: str, subject: str, body: str) -> bool:
         """Sendet eine E-Mail"""
         try:
-            msg = MIMEMultipart()
-            msg['From'] = self.username
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            msg.attach(MIMEText(body, 'plain'))
-            
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.username, self.password)
-                server.send_message(msg)
-                
+            self.pool.send(build_message(self.username, to_email, subject, body))
             logger.info(f"E-Mail erfolgreich gesendet an {to_email}")
             return True
             
@@ -36,66 +36,76 @@ class EmailManager:
             logger.error(f"Fehler beim Senden der E-Mail an {to_email}: {str(e)}")
             return False
             
+    def send_many(self, emails: List[Tuple[str, str, str]]) -> List[bool]:
+        """Sendet mehrere E-Mails (Empfänger, Betreff, Text) über die offenen SMTP-Sitzungen"""
+        messages = [build_message(self.username, to_email, subject, body) for to_email, subject, body in emails]
+        results = [result is True for result in self.pool.send_many(messages)]
+        logger.info(f"{sum(results)} von {len(results)} E-Mails erfolgreich gesendet")
+        return results
+            
+    def queue_email(self, email: Tuple[str, str, str], key: Optional[str] = None,
+                    on_sent: Optional[Callable[[], Any]] = None,
+                    on_failed: Optional[Callable[[Exception], Any]] = None) -> bool:
+        """Reiht eine E-Mail (Empfänger, Betreff, Text) in die Versandwarteschlange ein"""
+        to_email, subject, body = email
+        return self.queue.enqueue(build_message(self.username, to_email, subject, body), key, on_sent, on_failed)
+        
     def send_initial_email(self, lead_data: Dict, personalization: Dict) -> bool:
         """Sendet die initiale E-Mail"""
-        subject = f"Personalisiertes Angebot für {lead_data.get('name', '')}"
-        
-        # Hole die E-Mail-Vorlage
-        from email_templates import EmailTemplates
-        template = EmailTemplates.get_initial_email_template(lead_data, "")
-        
-        # Fülle die Vorlage
-        body = template.format(
-            name=lead_data.get('name', ''),
-            company=lead_data.get('company', ''),
-            position=lead_data.get('position', ''),
-            positive_observation=personalization.get('positive_observation', ''),
-            personalized_value_proposition=personalization.get('value_proposition', ''),
-            Ihr Name="Ihr Name",  # Diese Werte sollten aus der Konfiguration kommen
-            Position="Position",
-            Unternehmen="Unternehmen"
-        )
-        
-        return self.send_email(lead_data.get('email', ''), subject, body)
+        return self.send_email(*self.compose_initial_email(lead_data, personalization))
         
     def send_follow_up(self, lead_data: Dict, personalization: Dict, days: int) -> bool:
         """Sendet eine Follow-Up E-Mail"""
-        subject = f"Nachfrage: Personalisiertes Angebot für {lead_data.get('name', '')}"
+        return self.send_email(*self.compose_follow_up(lead_data, personalization, days))
         
-        # Hole die E-Mail-Vorlage
-        from email_templates import EmailTemplates
-        template = EmailTemplates.get_follow_up_template(lead_data, "", days)
+    def send_final_email(self, lead_data: Dict, personalization: Dict) -> bool:
+        """Sendet die finale E-Mail"""
+        return self.send_email(*self.compose_final_email(lead_data, personalization))
         
-        # Fülle die Vorlage
-        body = template.format(
-            name=lead_data.get('name', ''),
-            days=days,
-            personalized_reminder=personalization.get('follow_up', ''),
-            Ihr Name="Ihr Name",
-            Position="Position",
-            Unternehmen="Unternehmen"
-        )
+    def template_values(self, kind: str, lead_data: Dict, personalization: Dict, days: Optional[int] = None) -> Dict:
+        """Werte für die Platzhalter der Vorlage kind (initial, follow_up, final)"""
+        values = {"name": lead_data.get('name', ''), **self.sender}
+        if kind == "initial":
+            values.update(
+                company=lead_data.get('company', ''),
+                position=lead_data.get('position', ''),
+                positive_observation=personalization.get('positive_observation', ''),
+                personalized_value_proposition=personalization.get('value_proposition', '')
+            )
+        elif kind == "follow_up":
+            values.update(days=days, personalized_reminder=personalization.get('follow_up', ''))
+        elif kind == "final":
+            values.update(final_offer=personalization.get('final_offer', ''))
+        return values
         
-        return self.send_email(lead_data.get('email', ''), subject, body)
+    def compose(self, kind: str, lead_data: Dict, personalization: Dict, days: Optional[int] = None) -> Tuple[str, str, str]:
+        """Gibt Empfänger, Betreff und Text einer E-Mail der Vorlage kind zurück"""
+        subject, body = self.templates.render(kind, self.template_values(kind, lead_data, personalization, days))
+        return lead_data.get('email', ''), subject, body
         
-    def send_final_email(self, lead_data: Dict, personalization: Dict) -> bool:
-        """Sendet die finale E-Mail"""
-        subject = f"Letzte Nachricht: Personalisiertes Angebot für {lead_data.get('name', '')}"
+    def compose_many(self, emails: List[Tuple[str, Dict, Dict, Optional[int]]]) -> List[Tuple[str, str, str]]:
+        """Rendert viele E-Mails (Vorlage, Lead, Personalisierung, Tage) gesammelt pro Vorlage"""
+        groups = {}
+        for index, (kind, lead_data, personalization, days) in enumerate(emails):
+            groups.setdefault(kind, []).append((index, lead_data, self.template_values(kind, lead_data, personalization, days)))
+        results = [None] * len(emails)
+        for kind, items in groups.items():
+            rendered = self.templates.render_many(kind, [values for _, _, values in items])
+            for (index, lead_data, _), (subject, body) in zip(items, rendered):
+                results[index] = (lead_data.get('email', ''), subject, body)
+        return results
         
-        # Hole die E-Mail-Vorlage
-        from email_templates import EmailTemplates
-        template = EmailTemplates.get_final_template(lead_data, "")
+    def compose_initial_email(self, lead_data: Dict, personalization: Dict) -> Tuple[str, str, str]:
+        """Gibt Empfänger, Betreff und Text der initialen E-Mail zurück"""
+        return self.compose("initial", lead_data, personalization)
         
-        # Fülle die Vorlage
-        body = template.format(
-            name=lead_data.get('name', ''),
-            final_offer=personalization.get('final_offer', ''),
-            Ihr Name="Ihr Name",
-            Position="Position",
-            Unternehmen="Unternehmen"
-        )
+    def compose_follow_up(self, lead_data: Dict, personalization: Dict, days: int) -> Tuple[str, str, str]:
+        """Gibt Empfänger, Betreff und Text einer Follow-Up E-Mail zurück"""
+        return self.compose("follow_up", lead_data, personalization, days)
         
-        return self.send_email(lead_data.get('email', ''), subject, body)
+    def compose_final_email(self, lead_data: Dict, personalization: Dict) -> Tuple[str, str, str]:
+        """Gibt Empfänger, Betreff und Text der finalen E-Mail zurück"""
+        return self.compose("final", lead_data, personalization)
         
     def schedule_follow_ups(self, lead_data: Dict, personalization: Dict) -> Dict:
         """Plant Follow-Up E-Mails"""
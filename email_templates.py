@@ -1,11 +1,13 @@
-from typing import Dict
-import json
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+import string
+import threading
+from collections import Counter, OrderedDict
 
-class EmailTemplates:
-    @staticmethod
-    def get_initial_email_template(lead_data: Dict, communication_style: str) -> str:
-        """Generiert die initiale E-Mail basierend auf dem Lead und Kommunikationsstil"""
-        template = """
+# Signatur des Absenders, in allen Vorlagen verfügbar
+SENDER_FIELDS = ("sender_name", "sender_position", "sender_company")
+
+INITIAL_SUBJECT = "Personalisiertes Angebot für {name}"
+INITIAL_BODY = """
 Sehr geehrte(r) {name},
 
 ich habe Ihr LinkedIn-Profil und die Website von {company} besucht und war beeindruckt von {positive_observation}.
@@ -17,16 +19,13 @@ Als {position} bei {company} verstehe ich die Herausforderungen, vor denen Sie s
 Ich würde gerne einen kurzen Anruf mit Ihnen vereinbaren, um zu besprechen, wie wir Ihnen helfen können.
 
 Beste Grüße,
-{Ihr Name}
-{Position}
-{Unternehmen}
+{sender_name}
+{sender_position}
+{sender_company}
 """
-        return template
 
-    @staticmethod
-    def get_follow_up_template(lead_data: Dict, communication_style: str, days: int) -> str:
-        """Generiert eine Follow-Up E-Mail"""
-        template = """
+FOLLOW_UP_SUBJECT = "Nachfrage: Personalisiertes Angebot für {name}"
+FOLLOW_UP_BODY = """
 Sehr geehrte(r) {name},
 
 ich habe mich vor {days} Tagen bei Ihnen gemeldet und wollte nachfragen, ob Sie Interesse an einem kurzen Gespräch haben.
@@ -36,16 +35,13 @@ ich habe mich vor {days} Tagen bei Ihnen gemeldet und wollte nachfragen, ob Sie
 Ich stehe Ihnen gerne für weitere Informationen zur Verfügung.
 
 Beste Grüße,
-{Ihr Name}
-{Position}
-{Unternehmen}
+{sender_name}
+{sender_position}
+{sender_company}
 """
-        return template
 
-    @staticmethod
-    def get_final_template(lead_data: Dict, communication_style: str) -> str:
-        """Generiert eine finale E-Mail"""
-        template = """
+FINAL_SUBJECT = "Letzte Nachricht: Personalisiertes Angebot für {name}"
+FINAL_BODY = """
 Sehr geehrte(r) {name},
 
 da ich bisher keine Rückmeldung von Ihnen erhalten habe, möchte ich Ihnen eine letzte Nachricht senden.
@@ -55,8 +51,150 @@ da ich bisher keine Rückmeldung von Ihnen erhalten habe, möchte ich Ihnen eine
 Falls Sie in Zukunft Interesse haben, können Sie sich jederzeit bei mir melden.
 
 Beste Grüße,
-{Ihr Name}
-{Position}
-{Unternehmen}
+{sender_name}
+{sender_position}
+{sender_company}
 """
-        return template 
\ No newline at end of file
+
+# Vorlagen mit Betreff, Text und den erlaubten Platzhaltern
+TEMPLATES = {
+    "initial": (INITIAL_SUBJECT, INITIAL_BODY,
+                ("name", "company", "position", "positive_observation", "personalized_value_proposition") + SENDER_FIELDS),
+    "follow_up": (FOLLOW_UP_SUBJECT, FOLLOW_UP_BODY, ("name", "days", "personalized_reminder") + SENDER_FIELDS),
+    "final": (FINAL_SUBJECT, FINAL_BODY, ("name", "final_offer") + SENDER_FIELDS)
+}
+
+class TemplateError(ValueError):
+    """Eine Vorlage enthält einen ungültigen oder unbekannten Platzhalter"""
+    pass
+
+class CompiledTemplate:
+    """Einmal zerlegte Vorlage: feste Textstücke und die Platzhalter dazwischen.
+
+    Erlaubt sind nur benannte Platzhalter aus fields, ohne Formatangabe;
+    Fehler fallen beim Kompilieren auf statt beim Versand. Fehlende Werte
+    werden als leerer Text eingesetzt.
+    """
+
+    def __init__(self, name: str, source: str, fields: Iterable[str]):
+        self.name = name
+        self.source = source
+        allowed = set(fields)
+        literals, placeholders = [""], []
+        try:
+            parsed = list(string.Formatter().parse(source))
+        except ValueError as e:
+            raise TemplateError(f"Vorlage {name}: {str(e)}")
+        for literal, field, spec, conversion in parsed:
+            literals[-1] += literal
+            if field is None:
+                continue
+            if not field.isidentifier():
+                raise TemplateError(f"Vorlage {name}: ungültiger Platzhalter {{{field}}}")
+            if field not in allowed:
+                raise TemplateError(f"Vorlage {name}: unbekannter Platzhalter {{{field}}}")
+            if spec or conversion:
+                raise TemplateError(f"Vorlage {name}: Formatangaben werden nicht unterstützt ({{{field}}})")
+            placeholders.append(field)
+            literals.append("")
+        self._literals = literals
+        self.placeholders = tuple(placeholders)
+        # Jeder Platzhalter einmal, in Reihenfolge; bestimmt den Cache-Schlüssel
+        self.fields = tuple(dict.fromkeys(placeholders))
+
+    def key(self, values: Mapping[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(values.get(field, "")) for field in self.fields)
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        """Setzt die Werte ein"""
+        return self._join(dict(zip(self.fields, self.key(values))))
+
+    def _join(self, values: Dict[str, str]) -> str:
+        parts = [self._literals[0]]
+        for field, literal in zip(self.placeholders, self._literals[1:]):
+            parts.append(values[field])
+            parts.append(literal)
+        return "".join(parts)
+
+class TemplateEngine:
+    """Kompiliert alle E-Mail-Vorlagen beim Laden und rendert Betreff und Text mit Cache.
+
+    Der Cache hält gerenderte Texte pro Vorlage und Werten (also pro Lead);
+    wiederholte Follow-up-Läufe rendern denselben Lead nicht erneut.
+    render_many rendert viele Leads in einem Aufruf, gleiche Werte nur einmal.
+    """
+
+    def __init__(self, templates: Dict[str, Tuple[str, str, Tuple[str, ...]]] = TEMPLATES, cache_size: int = 10000):
+        self.templates = {
+            name: (CompiledTemplate(f"{name}.subject", subject, fields), CompiledTemplate(f"{name}.body", body, fields))
+            for name, (subject, body, fields) in templates.items()
+        }
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.counts = Counter()
+
+    def template(self, name: str) -> Tuple[CompiledTemplate, CompiledTemplate]:
+        if name not in self.templates:
+            raise TemplateError(f"Unbekannte Vorlage: {name}")
+        return self.templates[name]
+
+    def _render(self, template: CompiledTemplate, values: Mapping[str, Any]) -> str:
+        key = (template.name, template.key(values))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.counts["cache_hits"] += 1
+                return self._cache[key]
+        text = template._join(dict(zip(template.fields, key[1])))
+        with self._lock:
+            self.counts["rendered"] += 1
+            self._cache[key] = text
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return text
+
+    def render(self, name: str, values: Mapping[str, Any]) -> Tuple[str, str]:
+        """Gibt (Betreff, Text) der Vorlage name zurück"""
+        subject, body = self.template(name)
+        return self._render(subject, values), self._render(body, values)
+
+    def render_many(self, name: str, rows: List[Mapping[str, Any]]) -> List[Tuple[str, str]]:
+        """Rendert (Betreff, Text) für viele Werte-Sätze derselben Vorlage"""
+        subject, body = self.template(name)
+        rendered = {}
+        results = []
+        for values in rows:
+            key = body.key(values), subject.key(values)
+            if key not in rendered:
+                rendered[key] = self._render(subject, values), self._render(body, values)
+            results.append(rendered[key])
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        """Gerenderte Texte und Cache-Treffer"""
+        with self._lock:
+            return {**self.counts, "cached": len(self._cache)}
+
+class EmailTemplates:
+    @staticmethod
+    def get_initial_email_template(lead_data: Dict, communication_style: str) -> str:
+        """Generiert die initiale E-Mail basierend auf dem Lead und Kommunikationsstil"""
+        return INITIAL_BODY
+
+    @staticmethod
+    def get_follow_up_template(lead_data: Dict, communication_style: str, days: int) -> str:
+        """Generiert eine Follow-Up E-Mail"""
+        return FOLLOW_UP_BODY
+
+    @staticmethod
+    def get_final_template(lead_data: Dict, communication_style: str) -> str:
+        """Generiert eine finale E-Mail"""
+        return FINAL_BODY
+
+# Beim Import kompiliert, damit fehlerhafte Vorlagen sofort auffallen
+_engine = TemplateEngine()
+
+def get_template_engine() -> TemplateEngine:
+    """Gibt die Singleton-Instanz der Template-Engine zurück."""
+    return _engine
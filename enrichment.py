@@ -0,0 +1,97 @@
+from typing import Any, Dict, Optional
+from collections import Counter
+from logger import logger
+
+# Anreicherungsstufen in der Reihenfolge von process_lead
+STAGES = ("domain", "linkedin", "communication_style", "email")
+
+# Mögliche Fundstellen der Felder in Apify-Datensätzen (flach oder Apollo-verschachtelt)
+FIELD_PATHS = {
+    "name": ("name", "full_name"),
+    "headline": ("headline", "linkedin_info.headline"),
+    "title": ("title", "position"),
+    "company": ("company", "organization_name", "organization.name"),
+    "website": ("organization_website_url", "organization.website_url", "website"),
+    "domain": ("domain", "organization.primary_domain"),
+    "industry": ("industry", "organization_industry", "organization.industry"),
+    "size": ("estimated_num_employees", "organization.estimated_num_employees", "company_size"),
+    "company_description": ("organization.short_description", "organization_short_description", "domain_info.description")
+}
+
+def get_field(lead: Dict, field: str) -> Any:
+    """Gibt den ersten nicht-leeren Wert eines Feldes aus dem Datensatz zurück"""
+    for path in FIELD_PATHS[field]:
+        value = lead
+        for key in path.split("."):
+            value = value.get(key) if isinstance(value, dict) else None
+        if value not in (None, "", [], {}):
+            return value
+    return None
+
+def domain_of(lead: Dict) -> str:
+    """Gibt die Domain des Unternehmens ohne Schema und Pfad zurück"""
+    domain = get_field(lead, "domain") or get_field(lead, "website") or ""
+    domain = domain.split("://", 1)[-1]
+    return domain.split("/", 1)[0]
+
+def linkedin_info_from_record(lead: Dict) -> Optional[Dict]:
+    """Baut die LinkedIn-Informationen aus dem Datensatz, falls die Headline enthalten ist"""
+    headline = get_field(lead, "headline")
+    if not headline:
+        return None
+    return {
+        "name": get_field(lead, "name") or "",
+        "headline": headline,
+        "url": lead.get("linkedin_url", ""),
+        "source": "apify"
+    }
+
+def domain_info_from_record(lead: Dict) -> Optional[Dict]:
+    """Baut die Domain-Informationen aus dem Datensatz, falls Website und Firmenprofil enthalten sind"""
+    website = get_field(lead, "website") or get_field(lead, "domain")
+    industry = get_field(lead, "industry")
+    description = get_field(lead, "company_description")
+    if not website or not (industry or description):
+        return None
+    return {
+        "title": get_field(lead, "company") or "",
+        "description": description or industry,
+        "industry": industry or "",
+        "size": get_field(lead, "size") or "",
+        "url": website,
+        "source": "apify"
+    }
+
+class EnrichmentPlanner:
+    """Entscheidet pro Lead, welche Anreicherungsstufen wirklich ausgeführt werden müssen"""
+
+    def __init__(self):
+        self.executed = Counter()
+        self.skipped = Counter()
+
+    def plan(self, lead: Dict) -> Dict[str, bool]:
+        """Gibt pro Stufe zurück, ob sie ausgeführt werden muss"""
+        plan = {
+            "domain": bool(domain_of(lead)) and domain_info_from_record(lead) is None,
+            "linkedin": bool(lead.get("linkedin_url")) and linkedin_info_from_record(lead) is None,
+            "communication_style": not lead.get("communication_style"),
+            "email": not lead.get("email_content")
+        }
+
+        for stage, needed in plan.items():
+            if needed:
+                self.executed[stage] += 1
+            else:
+                self.skipped[stage] += 1
+
+        skipped = [stage for stage in STAGES if not plan[stage]]
+        if skipped:
+            logger.info(f"Überspringe Stufen für {lead.get('email', '')}: {', '.join(skipped)}")
+        return plan
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Gibt die Zähler für ausgeführte und übersprungene Stufen zurück"""
+        return {
+            stage: {"executed": self.executed[stage], "skipped": self.skipped[stage]}
+            for stage in STAGES
+        }
@@ -1,20 +1,31 @@
 import os
+import sys
 import json
+import asyncio
 import time
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
 import requests
 from bs4 import BeautifulSoup
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 import streamlit as st
 
+# Mindestabstand zwischen zwei Live-Updates beim Streaming, damit die UI nicht bei jedem Token neu rendert
+STREAM_UPDATE_INTERVAL = 0.1
+
 # Lade Umgebungsvariablen
 load_dotenv()
 
+# Gemeinsame Module aus dem Hauptverzeichnis (LLM-Client, Prompt-Registry)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_client import LLMClient, get_llm_client
+from model_router import get_model_router
+from summarizer import get_summarizer
+from prompt_registry import get_prompt
+from structured_output import JSON_MODE, Schema, parse_json, repair_json
+
 # Definiere die Ausgabestruktur für den AI-Agenten
 class LeadAnalysis(BaseModel):
     name: str = Field(description="Name des Leads")
@@ -32,16 +43,27 @@ class AIAgent:
         if not self.api_key:
             raise ValueError("OpenAI API-Key nicht gefunden. Bitte als Umgebungsvariable OPENAI_API_KEY setzen.")
         
-        self.llm = ChatOpenAI(
-            model="gpt-4o",
-            temperature=0.7,
-            api_key=self.api_key
-        )
+        # Die Lead-Analyse erzeugt die finale Nachricht und läuft daher auf dem großen Modell
+        self.router = get_model_router()
+        self.temperature = 0.7
+        
+        # Kompaktes Schema statt der vollständigen Pydantic-Formatanweisungen im Prompt
+        self.schema = Schema.from_pydantic(LeadAnalysis)
         
-        self.parser = PydanticOutputParser(pydantic_object=LeadAnalysis)
+        # Prompt aus der Registry, mit fest gebundenen Formatanweisungen
+        self.prompt = get_prompt("lead_analysis", format_instructions=self.schema.describe())
         
         # Cache für Analysen
         self.analysis_cache = {}
+        
+        # LLM-Client mit persistentem Cache und Rate-Limit, gemeinsam mit den übrigen Agenten;
+        # der Summarizer verdichtet lange Seiten, statt sie nach 4000 Zeichen abzuschneiden
+        if self.api_key == os.getenv("OPENAI_API_KEY"):
+            self.llm_client = get_llm_client()
+            self.summarizer = get_summarizer()
+        else:
+            self.llm_client = LLMClient(api_key=self.api_key)
+            self.summarizer = get_summarizer(self.llm_client)
     
     def scrape_website(self, url: str) -> str:
         """Scrapt eine Website und extrahiert den Text."""
@@ -52,117 +74,196 @@ class AIAgent:
             response = requests.get(url, headers=headers, timeout=10)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Entferne Skripte, Styles und andere nicht-relevante Elemente
-            for script in soup(["script", "style", "meta", "link"]):
-                script.decompose()
-            
-            # Extrahiere Text
-            text = soup.get_text(separator=' ', strip=True)
-            
-            # Bereinige Text
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
-            
-            return text[:4000]  # Begrenze auf 4000 Zeichen
+            return self.extract_text(response.text)
         except Exception as e:
             return f"Fehler beim Scrapen der Website: {str(e)}"
     
-    def analyze_lead(self, lead: Dict) -> Dict:
-        """Analysiert einen Lead mit LangChain und OpenAI."""
-        # Prüfe Cache
-        cache_key = f"{lead.get('name', '')}_{lead.get('company', '')}"
-        if cache_key in self.analysis_cache:
-            return self.analysis_cache[cache_key]
+    @staticmethod
+    def extract_text(html: str) -> str:
+        """Extrahiert den bereinigten Text aus dem HTML einer Seite."""
+        soup = BeautifulSoup(html, 'html.parser')
         
-        # Scrape Website
-        website_url = lead.get('organization_website_url', '')
-        website_content = self.scrape_website(website_url) if website_url else "Keine Website verfügbar"
+        # Entferne Skripte, Styles und andere nicht-relevante Elemente
+        for script in soup(["script", "style", "meta", "link"]):
+            script.decompose()
         
-        # Scrape LinkedIn
-        linkedin_url = lead.get('linkedin_url', '')
-        linkedin_content = self.scrape_website(linkedin_url) if linkedin_url else "Kein LinkedIn-Profil verfügbar"
+        # Extrahiere Text
+        text = soup.get_text(separator=' ', strip=True)
         
-        # Erstelle Prompt für den LLM
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """Du bist ein erfahrener Sales- und Marketing-Experte, der Leads analysiert und personalisierte Nachrichten erstellt.
-            
-            Analysiere die folgenden Informationen über einen Lead und erstelle eine personalisierte Nachricht.
-            
-            {format_instructions}
-            """),
-            ("human", """
-            Name: {name}
-            Unternehmen: {company}
-            E-Mail: {email}
-            Website-Inhalt: {website_content}
-            LinkedIn-Inhalt: {linkedin_content}
-            
-            Bitte analysiere diese Informationen und erstelle eine personalisierte Nachricht.
-            """)
-        ])
-        
-        # Formatiere den Prompt
-        formatted_prompt = prompt.format_messages(
-            name=lead.get('name', 'Unbekannt'),
-            company=lead.get('company', 'Unbekannt'),
-            email=lead.get('email', 'Unbekannt'),
-            website_content=website_content,
-            linkedin_content=linkedin_content,
-            format_instructions=self.parser.get_format_instructions()
-        )
+        # Bereinige Text
+        lines = (line.strip() for line in text.splitlines())
+        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+        return ' '.join(chunk for chunk in chunks if chunk)
+    
+    def _cache_key(self, lead: Dict) -> str:
+        return f"{lead.get('name', '')}_{lead.get('company', '')}"
+    
+    @staticmethod
+    def _scrape_targets(lead: Dict) -> Dict[str, tuple]:
+        """URLs, Platzhalter und Quellenbezeichnung der beiden unabhängigen Scraping-Zweige eines Leads."""
+        return {
+            'website_content': (lead.get('organization_website_url', ''), "Keine Website verfügbar", "Website"),
+            'linkedin_content': (lead.get('linkedin_url', ''), "Kein LinkedIn-Profil verfügbar", "LinkedIn-Profil")
+        }
+    
+    def _scrape_and_condense(self, url: str, source: str) -> str:
+        """Scrapt eine Seite und verdichtet sie, falls sie zu lang für den Prompt ist."""
+        return self.summarizer.condense(self.scrape_website(url), source)
+    
+    def _scrape_lead(self, lead: Dict) -> Dict[str, str]:
+        """Scrapt Website und LinkedIn-Profil eines Leads parallel."""
+        targets = self._scrape_targets(lead)
+        with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+            futures = {
+                key: executor.submit(self._scrape_and_condense, url, source) if url else None
+                for key, (url, fallback, source) in targets.items()
+            }
+            return {
+                key: futures[key].result() if futures[key] else fallback
+                for key, (url, fallback, source) in targets.items()
+            }
+    
+    async def _ascrape_lead(self, lead: Dict) -> Dict[str, str]:
+        """Asynchrone Variante von _scrape_lead; jeder Zweig läuft in einem eigenen Worker-Thread."""
+        async def branch(url: str, fallback: str, source: str) -> str:
+            if not url:
+                return fallback
+            return await self.summarizer.acondense(await asyncio.to_thread(self.scrape_website, url), source)
         
-        # Rufe das LLM auf
-        response = self.llm.invoke(formatted_prompt)
+        targets = self._scrape_targets(lead)
+        contents = await asyncio.gather(*(branch(*target) for target in targets.values()))
+        return dict(zip(targets, contents))
+    
+    def _analysis_request(self, lead: Dict, content: Dict[str, str]) -> Dict:
+        """Bündelt die Eingaben des Leads mit dem Prompt zu den Parametern für den LLM-Client."""
+        inputs = {
+            'name': lead.get('name', 'Unbekannt'),
+            'company': lead.get('company', 'Unbekannt'),
+            'email': lead.get('email', 'Unbekannt'),
+            **content
+        }
         
-        # Parse die Antwort
-        try:
-            analysis = self.parser.parse(response.content)
-            result = analysis.dict()
-            
-            # Füge Original-Lead-Daten hinzu
-            result.update({
-                'email': lead.get('email', ''),
-                'website': lead.get('organization_website_url', ''),
-                'linkedin': lead.get('linkedin_url', ''),
-                'timestamp': datetime.now().isoformat()
-            })
-            
+        # Identische Anfragen kommen aus dem Cache
+        return self.router.request(self.prompt, inputs, self.temperature, response_format=JSON_MODE)
+    
+    def _parse_analysis(self, lead: Dict, analysis: Dict) -> Dict:
+        """Ergänzt die gültigen Felder der Analyse um die Original-Lead-Daten.
+        
+        Nur Felder, die auch nach Reparatur und Nachfrage fehlen, erhalten Rückfallwerte.
+        """
+        fallback = {
+            'name': lead.get('name', 'Unbekannt'),
+            'company': lead.get('company', 'Unbekannt'),
+            'website_summary': "Fehler bei der Analyse",
+            'linkedin_summary': "Fehler bei der Analyse",
+            'communication_style': "formal",
+            'personalized_message': "Fehler bei der Analyse",
+            'status': "inaktiv"
+        }
+        missing = [field for field in fallback if field not in analysis]
+        result = {**fallback, **analysis}
+        
+        # Füge Original-Lead-Daten hinzu
+        result.update({
+            'email': lead.get('email', ''),
+            'website': lead.get('organization_website_url', ''),
+            'linkedin': lead.get('linkedin_url', ''),
+            'timestamp': datetime.now().isoformat()
+        })
+        
+        if missing:
+            st.error(f"Fehler bei der Analyse: Felder {', '.join(missing)} fehlen")
+        else:
             # Speichere im Cache
-            self.analysis_cache[cache_key] = result
-            
-            return result
-        except Exception as e:
-            st.error(f"Fehler bei der Analyse: {str(e)}")
-            return {
-                'name': lead.get('name', 'Unbekannt'),
-                'company': lead.get('company', 'Unbekannt'),
-                'website_summary': "Fehler bei der Analyse",
-                'linkedin_summary': "Fehler bei der Analyse",
-                'communication_style': "formal",
-                'personalized_message': "Fehler bei der Analyse",
-                'status': "inaktiv",
-                'email': lead.get('email', ''),
-                'website': lead.get('organization_website_url', ''),
-                'linkedin': lead.get('linkedin_url', ''),
-                'timestamp': datetime.now().isoformat()
-            }
+            self.analysis_cache[self._cache_key(lead)] = result
+        
+        return result
+    
+    @staticmethod
+    def _streaming_request(request: Dict, on_update: Optional[Callable[[str, Dict], None]]) -> Dict:
+        """Streamt die Antwort und meldet die bereits lesbaren Felder als Teilanalyse.
+        
+        Das unvollständige JSON wird mit repair_json gelesen; Updates kommen
+        höchstens alle STREAM_UPDATE_INTERVAL Sekunden.
+        """
+        if on_update is None:
+            return request
+        on_update("analyzing", {})
+        last_update = [0.0]
+        
+        def on_partial(text: str):
+            now = time.monotonic()
+            if now - last_update[0] < STREAM_UPDATE_INTERVAL:
+                return
+            last_update[0] = now
+            partial = repair_json(text)
+            if isinstance(partial, dict):
+                on_update("analyzing", partial)
+        
+        return {**request, "on_partial": on_partial}
+    
+    def analyze_lead(self, lead: Dict, on_update: Optional[Callable[[str, Dict], None]] = None) -> Dict:
+        """Analysiert einen Lead mit LangChain und OpenAI.
+        
+        on_update(stage, analysis) wird mit stage "scraping", "analyzing" (Teilanalyse
+        während des Streamings) und "done" (fertige Analyse) aufgerufen.
+        """
+        # Prüfe Cache
+        cache_key = self._cache_key(lead)
+        if cache_key in self.analysis_cache:
+            analysis = self.analysis_cache[cache_key]
+        else:
+            if on_update:
+                on_update("scraping", {})
+            content = self._scrape_lead(lead)
+            request = self._streaming_request(self._analysis_request(lead, content), on_update)
+            analysis = self._parse_analysis(lead, self.llm_client.complete_json(self.schema, **request))
+        
+        if on_update:
+            on_update("done", analysis)
+        return analysis
+    
+    async def aanalyze_lead(self, lead: Dict, on_update: Optional[Callable[[str, Dict], None]] = None) -> Dict:
+        """Asynchrone Variante von analyze_lead; die Scraping-Zweige laufen in Worker-Threads."""
+        cache_key = self._cache_key(lead)
+        if cache_key in self.analysis_cache:
+            analysis = self.analysis_cache[cache_key]
+        else:
+            if on_update:
+                on_update("scraping", {})
+            content = await self._ascrape_lead(lead)
+            request = self._streaming_request(self._analysis_request(lead, content), on_update)
+            analysis = self._parse_analysis(lead, await self.llm_client.acomplete_json(self.schema, **request))
+        
+        if on_update:
+            on_update("done", analysis)
+        return analysis
+    
+    def prepare_requests(self, leads: List[Dict]) -> List[Dict]:
+        """Scrapt alle Leads gleichzeitig und gibt die fertigen LLM-Anfragen zurück, z.B. für den Batch-Modus."""
+        async def prepare(lead):
+            return self._analysis_request(lead, await self._ascrape_lead(lead))
+        
+        return self.llm_client.run(self.llm_client.gather([prepare(lead) for lead in leads]))
+    
+    def analysis_from_response(self, lead: Dict, content: str) -> Dict:
+        """Wertet eine anderweitig beschaffte LLM-Antwort (z.B. aus einem Batch-Job) wie analyze_lead aus."""
+        analysis, _ = self.schema.check(parse_json(content))
+        return self._parse_analysis(lead, analysis)
+    
+    def _is_valid_analysis(self, content: str) -> bool:
+        """Prüft, ob eine LLM-Antwort dem Ausgabeformat entspricht."""
+        return self.schema.is_complete(content)
     
     def process_leads(self, leads: List[Dict], max_leads: int = 50) -> List[Dict]:
         """Verarbeitet eine Liste von Leads und gibt Analysen zurück."""
         # Begrenze die Anzahl der Leads
         leads_to_process = leads[:max_leads]
         
-        results = []
-        for lead in leads_to_process:
-            analysis = self.analyze_lead(lead)
-            results.append(analysis)
-            # Kurze Pause zwischen Anfragen
-            time.sleep(1)
-        
-        return results
+        # Gleichzeitig verarbeiten; der gemeinsame Rate-Limiter ersetzt die feste Pause zwischen Anfragen
+        return self.llm_client.run(
+            self.llm_client.gather([self.aanalyze_lead(lead) for lead in leads_to_process])
+        )
 
 # Funktion zum Abrufen von Leads von Apify
 def get_leads_from_apify(api_key: Optional[str] = None, dataset_id: Optional[str] = None) -> List[Dict]:
@@ -171,7 +272,7 @@ def get_leads_from_apify(api_key: Optional[str] = None, dataset_id: Optional[str
         # Verwende die direkte Dataset-URL
         url = "https://api.apify.com/v2/datasets/AGXiSRbH72qL6OFGs/items?token=apify_api_NOVzYHdbHojPZaa8HlulffsrqBE7Ka1M3y8G"
         
-        response = requests.get(url)
+        response = requests.get(url, timeout=30)
         response.raise_for_status()
         leads = response.json()
         
@@ -54,6 +54,27 @@ def run_ai_analysis():
         logger.error(f"Fehler bei der AI-Analyse: {str(e)}")
         return []
 
+# Statuszeile im Live-Bereich je Verarbeitungsschritt des AI-Agenten
+LIVE_STAGES = {
+    "scraping": "🌐 Lade Website und LinkedIn-Profil...",
+    "analyzing": "✍️ Analyse wird geschrieben...",
+    "done": ""
+}
+
+def render_live_analysis(container, lead, stage, analysis):
+    """Zeigt die (teilweise gestreamte) Analyse des aktuellen Leads im Detailbereich an."""
+    stage_text = LIVE_STAGES.get(stage, "")
+    with container.container():
+        st.markdown(f"""
+            <div style="background: var(--neutral-gray); padding: 1rem; border-radius: 10px; margin-bottom: 1rem;">
+                <h4>🎯 Aktuelle Analyse für {analysis.get('name') or lead.get('name', 'Unbekannt')}</h4>
+                {f'<p><em>{stage_text}</em></p>' if stage_text else ''}
+                <p><strong>Website-Analyse:</strong><br>{analysis.get('website_summary') or 'Wird analysiert...'}</p>
+                <p><strong>LinkedIn-Analyse:</strong><br>{analysis.get('linkedin_summary') or 'Wird analysiert...'}</p>
+                <p><strong>Generierte Nachricht:</strong><br>{analysis.get('personalized_message') or 'Wird generiert...'}</p>
+            </div>
+        """, unsafe_allow_html=True)
+
 def save_analyses(analyses):
     """Speichert die Analysen in einer JSON-Datei."""
     try:
@@ -350,21 +371,13 @@ with st.sidebar:
                         # Update Status
                         status_container.info(f"🔄 Analysiere Lead {idx + 1} von {total_leads}: {lead.get('name', 'Unbekannt')}")
                         
-                        # Führe Analyse durch
-                        analysis = agent.analyze_lead(lead)
+                        # Führe Analyse durch; Zwischenstände erscheinen live im Detailbereich
+                        analysis = agent.analyze_lead(
+                            lead,
+                            on_update=lambda stage, partial, lead=lead: render_live_analysis(detail_container, lead, stage, partial)
+                        )
                         analyses.append(analysis)
                         
-                        # Zeige Details der aktuellen Analyse
-                        with detail_container.container():
-                            st.markdown(f"""
-                                <div style="background: var(--neutral-gray); padding: 1rem; border-radius: 10px; margin-bottom: 1rem;">
-                                    <h4>🎯 Aktuelle Analyse für {analysis.get('name', 'Unbekannt')}</h4>
-                                    <p><strong>Website-Analyse:</strong><br>{analysis.get('website_summary', 'Wird analysiert...')}</p>
-                                    <p><strong>LinkedIn-Analyse:</strong><br>{analysis.get('linkedin_summary', 'Wird analysiert...')}</p>
-                                    <p><strong>Generierte Nachricht:</strong><br>{analysis.get('personalized_message', 'Wird generiert...')}</p>
-                                </div>
-                            """, unsafe_allow_html=True)
-                        
                         # Update Progress
                         progress_bar.progress((idx + 1) / total_leads)
                     
@@ -774,21 +787,13 @@ elif page == "🤖 AI-Aktivitäten":
                         # Update Status
                         status_container.info(f"🔄 Analysiere Lead {idx + 1} von {total_leads}: {lead.get('name', 'Unbekannt')}")
                         
-                        # Führe Analyse durch
-                        analysis = agent.analyze_lead(lead)
+                        # Führe Analyse durch; Zwischenstände erscheinen live im Detailbereich
+                        analysis = agent.analyze_lead(
+                            lead,
+                            on_update=lambda stage, partial, lead=lead: render_live_analysis(detail_container, lead, stage, partial)
+                        )
                         analyses.append(analysis)
                         
-                        # Zeige Details der aktuellen Analyse
-                        with detail_container.container():
-                            st.markdown(f"""
-                                <div style="background: var(--neutral-gray); padding: 1rem; border-radius: 10px; margin-bottom: 1rem;">
-                                    <h4>🎯 Aktuelle Analyse für {analysis.get('name', 'Unbekannt')}</h4>
-                                    <p><strong>Website-Analyse:</strong><br>{analysis.get('website_summary', 'Wird analysiert...')}</p>
-                                    <p><strong>LinkedIn-Analyse:</strong><br>{analysis.get('linkedin_summary', 'Wird analysiert...')}</p>
-                                    <p><strong>Generierte Nachricht:</strong><br>{analysis.get('personalized_message', 'Wird generiert...')}</p>
-                                </div>
-                            """, unsafe_allow_html=True)
-                        
                         # Update Progress
                         progress_bar.progress((idx + 1) / total_leads)
                     
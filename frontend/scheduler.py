@@ -1,5 +1,7 @@
 import os
+import sys
 import json
+import logging
 import time
 import schedule
 import threading
@@ -7,10 +9,23 @@ from datetime import datetime
 import streamlit as st
 from ai_agent import AIAgent, get_leads_from_apify, save_analyses, load_analyses
 
+# Gemeinsame Module aus dem Hauptverzeichnis (Batch-Jobs)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_batch import FINAL_STATUSES, get_batch_manager
+
+logger = logging.getLogger(__name__)
+
 class LeadScheduler:
-    def __init__(self, max_leads_per_day=50):
-        """Initialisiert den Scheduler für die tägliche Lead-Verarbeitung."""
+    def __init__(self, max_leads_per_day=50, batch_mode=None):
+        """Initialisiert den Scheduler für die tägliche Lead-Verarbeitung.
+        
+        Im Batch-Modus werden die Analysen als Batch-Job eingereicht und beim
+        nächsten Lauf eingesammelt, statt interaktiv angefragt zu werden.
+        """
         self.max_leads_per_day = max_leads_per_day
+        if batch_mode is None:
+            batch_mode = os.getenv("LLM_BATCH_MODE", "false").lower() == "true"
+        self.batch_mode = batch_mode
         self.ai_agent = None
         self.is_running = False
         self.last_run = None
@@ -41,6 +56,72 @@ class LeadScheduler:
             st.error(f"Fehler beim Speichern der verarbeiteten Leads: {str(e)}")
             return False
     
+    @staticmethod
+    def _lead_id(lead):
+        return f"{lead.get('name', '')}_{lead.get('company', '')}_{lead.get('email', '')}"
+    
+    def _store_results(self, leads, analyses):
+        """Speichert neue Analysen und markiert die Leads als verarbeitet."""
+        # Lade bestehende Analysen
+        existing_analyses = load_analyses(self.analyses_file)
+        
+        # Füge neue Analysen hinzu
+        all_analyses = existing_analyses + analyses
+        
+        # Speichere alle Analysen
+        save_analyses(all_analyses, self.analyses_file)
+        
+        # Aktualisiere die verarbeiteten Leads
+        for lead in leads:
+            self.processed_leads.append(self._lead_id(lead))
+        
+        # Speichere die verarbeiteten Leads
+        self._save_processed_leads()
+    
+    def _open_batch_jobs(self):
+        return [job for job in get_batch_manager().open_jobs()
+                if (job["metadata"] or {}).get("kind") == "lead_analysis"]
+    
+    def _submit_batch(self, leads):
+        """Reicht die Analysen der Leads als Batch-Job ein."""
+        requests = self.ai_agent.prepare_requests(leads)
+        return get_batch_manager().submit(
+            {self._lead_id(lead): request for lead, request in zip(leads, requests)},
+            metadata={"kind": "lead_analysis", "leads": {self._lead_id(lead): lead for lead in leads}}
+        )
+    
+    def collect_batches(self):
+        """Sammelt abgeschlossene Batch-Jobs ein und übernimmt ihre Analysen.
+        
+        Leads ohne gültige Antwort bleiben unverarbeitet und werden beim nächsten Lauf erneut eingereicht.
+        """
+        manager = get_batch_manager()
+        collected = 0
+        for job in self._open_batch_jobs():
+            if manager.refresh(job["job_id"]) not in FINAL_STATUSES:
+                continue
+            responses = manager.collect(job["job_id"], validate=self.ai_agent._is_valid_analysis)
+            # Fehlende und ungültige Antworten nicht mit Rückfallwerten speichern
+            valid = {
+                lead_id: lead for lead_id, lead in job["metadata"]["leads"].items()
+                if responses.get(lead_id) is not None and self.ai_agent._is_valid_analysis(responses[lead_id])
+            }
+            skipped = len(job["metadata"]["leads"]) - len(valid)
+            if skipped:
+                logger.warning(f"Batch-Job {job['job_id']}: {skipped} Leads ohne gültige Analyse, werden erneut eingereicht")
+            analyses = [self.ai_agent.analysis_from_response(lead, responses[lead_id]) for lead_id, lead in valid.items()]
+            self._store_results(list(valid.values()), analyses)
+            collected += len(valid)
+        return collected
+    
+    def get_batch_status(self):
+        """Gibt die offenen Batch-Jobs mit ihrem Status zurück."""
+        manager = get_batch_manager()
+        return [
+            {"job_id": job["job_id"], "status": manager.refresh(job["job_id"]), "leads": len(job["metadata"]["leads"])}
+            for job in self._open_batch_jobs()
+        ]
+    
     def process_daily_leads(self):
         """Verarbeitet die täglichen Leads."""
         if self.is_running:
@@ -54,6 +135,15 @@ class LeadScheduler:
             # Initialisiere den AI-Agenten
             self.ai_agent = AIAgent()
             
+            # Übernimm die Ergebnisse abgeschlossener Batch-Jobs
+            pending_lead_ids = set()
+            if self.batch_mode:
+                collected = self.collect_batches()
+                if collected:
+                    st.success(f"{collected} Analysen aus Batch-Jobs übernommen.")
+                for job in self._open_batch_jobs():
+                    pending_lead_ids.update(job["metadata"]["leads"])
+            
             # Hole Leads von Apify
             leads = get_leads_from_apify()
             
@@ -62,11 +152,11 @@ class LeadScheduler:
                 self.is_running = False
                 return
             
-            # Filtere bereits verarbeitete Leads
+            # Filtere bereits verarbeitete und noch im Batch befindliche Leads
             new_leads = []
             for lead in leads:
-                lead_id = f"{lead.get('name', '')}_{lead.get('company', '')}_{lead.get('email', '')}"
-                if lead_id not in self.processed_leads:
+                lead_id = self._lead_id(lead)
+                if lead_id not in self.processed_leads and lead_id not in pending_lead_ids:
                     new_leads.append(lead)
             
             if not new_leads:
@@ -77,29 +167,19 @@ class LeadScheduler:
             # Begrenze die Anzahl der Leads
             leads_to_process = new_leads[:self.max_leads_per_day]
             
-            # Verarbeite die Leads
-            analyses = self.ai_agent.process_leads(leads_to_process)
-            
-            # Lade bestehende Analysen
-            existing_analyses = load_analyses(self.analyses_file)
-            
-            # Füge neue Analysen hinzu
-            all_analyses = existing_analyses + analyses
-            
-            # Speichere alle Analysen
-            save_analyses(all_analyses, self.analyses_file)
-            
-            # Aktualisiere die verarbeiteten Leads
-            for lead in leads_to_process:
-                lead_id = f"{lead.get('name', '')}_{lead.get('company', '')}_{lead.get('email', '')}"
-                self.processed_leads.append(lead_id)
-            
-            # Speichere die verarbeiteten Leads
-            self._save_processed_leads()
-            
             # Aktualisiere den Zeitstempel der letzten Ausführung
             self.last_run = datetime.now()
             
+            if self.batch_mode:
+                # Reiche die Analysen ein; die Ergebnisse werden beim nächsten Lauf eingesammelt
+                job_id = self._submit_batch(leads_to_process)
+                st.success(f"{len(leads_to_process)} Leads als Batch-Job {job_id} eingereicht.")
+                return
+            
+            # Verarbeite die Leads
+            analyses = self.ai_agent.process_leads(leads_to_process)
+            self._store_results(leads_to_process, analyses)
+            
             st.success(f"{len(leads_to_process)} Leads erfolgreich verarbeitet.")
         except Exception as e:
             st.error(f"Fehler bei der Lead-Verarbeitung: {str(e)}")
@@ -0,0 +1,240 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+class HedgePolicy:
+    """Hedging für eine Aufrufklasse (z.B. eine LLM-Stufe oder das Laden von Websites).
+
+    Ist ein Aufruf nach dem Perzentil percentile der bisherigen Latenzen noch
+    offen, wird er ein zweites Mal gestartet; die erste erfolgreiche Antwort
+    gewinnt. budget begrenzt die zusätzlichen Aufrufe auf diesen Anteil aller
+    Aufrufe. Die Schwelle lernt nur aus den Latenzen erfolgreicher erster
+    Versuche, damit das Hedging seine eigene Schwelle nicht senkt und schnelle
+    Fehler sie nicht drücken. Unterlegene Coroutinen werden abgebrochen; ein
+    unterlegener Thread läuft zu Ende (Threads lassen sich nicht abbrechen) und
+    seine Latenz zeigt, was ohne Hedging passiert wäre.
+    """
+
+    def __init__(self, name: str, percentile: float = 0.95, budget: float = 0.05,
+                 min_samples: int = 20, window: int = 500):
+        self.name = name
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self._primary = deque(maxlen=window)
+        self._effective = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.wins = 0
+        # Latenzen der ersten Versuche, bei denen der zweite gewonnen hat
+        self._won_primary = deque(maxlen=window)
+
+    def _delay(self) -> Optional[float]:
+        """Wartezeit bis zum zweiten Versuch, None ohne genug Messwerte"""
+        with self._lock:
+            self.calls += 1
+            if len(self._primary) < self.min_samples:
+                return None
+            return _percentile(list(self._primary), self.percentile)
+
+    def _take_budget(self) -> bool:
+        with self._lock:
+            if self.hedged + 1 > self.budget * self.calls:
+                return False
+            self.hedged += 1
+            return True
+
+    def _record_primary(self, latency: float, hedge_won: bool = False):
+        with self._lock:
+            self._primary.append(latency)
+            if hedge_won:
+                self._won_primary.append(latency)
+
+    def _record(self, latency: float, hedge_won: bool = False):
+        with self._lock:
+            self._effective.append(latency)
+            if hedge_won:
+                self.wins += 1
+
+    def call(self, primary: Callable[[], Any], backup: Optional[Callable[[], Any]] = None,
+             executor: Optional[ThreadPoolExecutor] = None) -> Any:
+        """Führt primary aus und startet nach der Schwelle backup (Standard: primary) ein zweites Mal"""
+        delay = self._delay()
+        started = time.monotonic()
+        if delay is None or executor is None:
+            result = primary()
+            self._record_unhedged(time.monotonic() - started)
+            return result
+
+        first = executor.submit(primary)
+        done, _ = wait([first], timeout=delay)
+        if done or not self._take_budget():
+            result = first.result()
+            self._record_unhedged(time.monotonic() - started)
+            return result
+
+        second = executor.submit(backup or primary)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self._finish(future is second, first, pending, started)
+                    return future.result()
+                error = error or future.exception()
+        self._finish(False, first, pending, started)
+        raise error
+
+    def _record_unhedged(self, latency: float):
+        self._record_primary(latency)
+        self._record(latency)
+
+    def _finish(self, hedge_won: bool, first: Future, pending: set, started: float):
+        self._record(time.monotonic() - started, hedge_won)
+        # Nur noch nicht gestartete Aufrufe lassen sich abbrechen, laufende Threads enden von selbst
+        for future in pending:
+            future.cancel()
+
+        def record(future: Future):
+            if not future.cancelled() and future.exception() is None:
+                self._record_primary(time.monotonic() - started, hedge_won)
+
+        first.add_done_callback(record)
+
+    async def acall(self, primary: Callable[[], Awaitable], backup: Optional[Callable[[], Awaitable]] = None) -> Any:
+        """Asynchrone Variante von call; primary und backup erzeugen jeweils eine neue Coroutine"""
+        delay = self._delay()
+        started = time.monotonic()
+        if delay is None:
+            result = await primary()
+            self._record_unhedged(time.monotonic() - started)
+            return result
+
+        first = asyncio.ensure_future(primary())
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done or not self._take_budget():
+            result = await first
+            self._record_unhedged(time.monotonic() - started)
+            return result
+
+        second = asyncio.ensure_future((backup or primary)())
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    self._afinish(task is second, first, pending, started)
+                    return task.result()
+                error = error or task.exception()
+        self._afinish(False, first, pending, started)
+        raise error
+
+    def _afinish(self, hedge_won: bool, first: asyncio.Future, pending: set, started: float):
+        latency = time.monotonic() - started
+        self._record(latency, hedge_won)
+        if not hedge_won and first.done() and first.exception() is None:
+            self._record_primary(latency)
+        elif hedge_won and first in pending:
+            # Der abgebrochene erste Versuch hätte mindestens so lange gebraucht; in die Schwelle geht er nicht ein
+            with self._lock:
+                self._won_primary.append(latency)
+        # Verlierer abbrechen und ihre Fehler abholen, damit asyncio keine Warnung loggt
+        for task in pending:
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """p99 mit und ohne Hedging und wie oft ein zweiter Versuch einen Ausreißer abgefangen hat"""
+        with self._lock:
+            primary, effective = list(self._primary), list(self._effective)
+            p99_with = _percentile(effective, 0.99) if effective else 0.0
+            return {
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_wins": self.wins,
+                "threshold_s": round(_percentile(primary, self.percentile), 3) if len(primary) >= self.min_samples else None,
+                "p99_without_s": round(_percentile(primary, 0.99), 3) if primary else 0.0,
+                "p99_with_s": round(p99_with, 3),
+                # Gewonnene Hedges, deren erster Versuch über dem p99 mit Hedging lag
+                "p99_cuts": sum(1 for latency in self._won_primary if latency > p99_with)
+            }
+
+class Hedger:
+    """Hält die Hedging-Policies der freigegebenen Aufrufklassen"""
+
+    def __init__(self, classes: List[str], percentile: float = 0.95, budget: float = 0.05,
+                 min_samples: int = 20, max_workers: int = 64):
+        self.classes = set(classes)
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self._policies = {}
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def policy(self, call_class: str) -> Optional[HedgePolicy]:
+        """Policy der Klasse, None wenn sie nicht gehedgt wird"""
+        if call_class not in self.classes and "*" not in self.classes:
+            return None
+        with self._lock:
+            if call_class not in self._policies:
+                self._policies[call_class] = HedgePolicy(call_class, self.percentile, self.budget, self.min_samples)
+            return self._policies[call_class]
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hedge")
+            return self._executor
+
+    def call(self, call_class: str, primary: Callable[[], Any], backup: Optional[Callable[[], Any]] = None) -> Any:
+        """Führt einen blockierenden, idempotenten Aufruf aus, mit Hedging falls die Klasse freigegeben ist"""
+        policy = self.policy(call_class)
+        if policy is None:
+            return primary()
+        return policy.call(primary, backup, self.executor)
+
+    async def acall(self, call_class: str, primary: Callable[[], Awaitable],
+                    backup: Optional[Callable[[], Awaitable]] = None) -> Any:
+        """Asynchrone Variante von call"""
+        policy = self.policy(call_class)
+        if policy is None:
+            return await primary()
+        return await policy.acall(primary, backup)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            policies = dict(self._policies)
+        return {name: policy.stats() for name, policy in policies.items()}
+
+# Prozessweite Instanz; ohne HEDGE_CALL_CLASSES wird nichts gehedgt
+_hedger = None
+
+def get_hedger() -> Hedger:
+    """Gibt die Singleton-Instanz zurück (Klassen kommagetrennt in HEDGE_CALL_CLASSES, "*" für alle)."""
+    global _hedger
+    if _hedger is None:
+        _hedger = Hedger(
+            classes=[name.strip() for name in os.getenv("HEDGE_CALL_CLASSES", "").split(",") if name.strip()],
+            percentile=float(os.getenv("HEDGE_PERCENTILE", "0.95")),
+            budget=float(os.getenv("HEDGE_BUDGET", "0.05")),
+            min_samples=int(os.getenv("HEDGE_MIN_SAMPLES", "20")),
+            max_workers=int(os.getenv("HEDGE_MAX_WORKERS", "64"))
+        )
+    return _hedger
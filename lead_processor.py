@@ -1,34 +1,48 @@
-from typing import Dict, List, Any
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema import StrOutputParser
+from typing import Any, Callable, Dict, List
 from langgraph.graph import Graph, StateGraph
 from apify_client import ApifyClient
 from bs4 import BeautifulSoup
 import requests
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import json
+import asyncio
 from config import *
 import logging
 from time import sleep
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from browser_engine import create_browser_engine
+from llm_client import get_llm_client
+from model_router import get_model_router
+from prompt_serializer import serialize_lead
+from prompt_registry import get_prompt
+from prompts import STYLE_EMAIL_SCHEMA
+from style_classifier import describe_style, get_style_classifier
+from mail_queue import get_mail_queue
+from smtp_pool import build_message, get_smtp_pool
+from enrichment import EnrichmentPlanner, domain_info_from_record, linkedin_info_from_record, domain_of
 
 class ApifyError(Exception):
     pass
 
 class LeadProcessor:
-    def __init__(self):
+    def __init__(self, sheets_manager: Optional[Any] = None):
         self._validate_config()
-        self.llm = ChatOpenAI(api_key=OPENAI_API_KEY)
+        # Setzt nach dem Versand der initialen E-Mail den Status des Leads in Google Sheets
+        self.sheets_manager = sheets_manager
+        self.llm_client = get_llm_client()
+        self.router = get_model_router()
+        # Lokaler Stil-Klassifikator; None, wenn deaktiviert oder noch nicht trainiert
+        self.style_classifier = get_style_classifier()
+        # Angemeldete SMTP-Sitzungen statt Verbindungsaufbau pro E-Mail
+        self.smtp_pool = get_smtp_pool()
+        # Versand im Hintergrund, damit ein langsamer SMTP-Server die Verarbeitung nicht aufhält
+        self.mail_queue = get_mail_queue()
+        # Fusionierter Modus: Kommunikationsstil und E-Mail in einem LLM-Aufruf
+        self.fused = FUSED_ANALYSIS
         self.apify_client = ApifyClient(APIFY_API_KEY)
-        self.setup_selenium()
         self.setup_logging()
+        self.setup_browser()
+        self.enrichment = EnrichmentPlanner()
         
     def _validate_config(self):
         """Überprüft, ob alle erforderlichen Konfigurationen vorhanden sind"""
@@ -51,23 +65,12 @@ class LeadProcessor:
         )
         self.logger = logging.getLogger(__name__)
         
-    def setup_selenium(self):
-        """Richtet Selenium mit verbesserten Optionen ein"""
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument(f"user-agent={USER_AGENT}")
-        
+    def setup_browser(self):
+        """Richtet das konfigurierte Rendering-Backend ein"""
         try:
-            self.driver = webdriver.Chrome(
-                service=Service(ChromeDriverManager().install()),
-                options=chrome_options
-            )
-            self.driver.set_page_load_timeout(30)
-            self.driver.set_script_timeout(30)
+            self.browser = create_browser_engine()
         except Exception as e:
-            self.logger.error(f"Fehler beim Einrichten von Selenium: {str(e)}")
+            self.logger.error(f"Fehler beim Einrichten des Browsers: {str(e)}")
             raise
         
     def fetch_leads_from_apify(self, max_retries: int = 3) -> List[Dict]:
@@ -116,8 +119,8 @@ class LeadProcessor:
             try:
                 self.logger.info(f"Versuche Domain-Info zu holen für {domain} (Versuch {attempt + 1}/{max_retries})")
                 
-                self.driver.get(f"https://{domain}")
-                soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+                html = self.browser.render(f"https://{domain}")
+                soup = BeautifulSoup(html, 'html.parser')
                 
                 title = soup.title.string if soup.title else ""
                 meta_description = soup.find("meta", {"name": "description"})
@@ -140,8 +143,8 @@ class LeadProcessor:
             try:
                 self.logger.info(f"Versuche LinkedIn-Info zu holen für {linkedin_url} (Versuch {attempt + 1}/{max_retries})")
                 
-                self.driver.get(linkedin_url)
-                soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+                html = self.browser.render(linkedin_url)
+                soup = BeautifulSoup(html, 'html.parser')
                 
                 name = soup.find("h1", {"class": "text-heading-xlarge"})
                 name = name.text.strip() if name else ""
@@ -160,78 +163,241 @@ class LeadProcessor:
                     return {"error": str(e)}
                 sleep(2 ** attempt)
             
+    def _llm_request(self, prompt: str, inputs: Dict, **params) -> Dict:
+        """Rendert einen Prompt aus der Registry und bündelt die Parameter für den LLM-Client"""
+        return self.router.request(get_prompt(prompt), inputs, LLM_TEMPERATURE, **params)
+        
+    def _lead_prompt_data(self, lead_data: Dict, prompt: str) -> str:
+        """Kompakte, auf das Token-Budget gekürzte Lead-Daten für einen Prompt"""
+        return serialize_lead(lead_data, prompt, self.router.model_for(prompt), PROMPT_TOKEN_BUDGET)
+        
+    def _communication_style_request(self, lead_data: Dict) -> Dict:
+        inputs = {"lead_data": self._lead_prompt_data(lead_data, "communication_style")}
+        return self._llm_request("communication_style", inputs, semantic_input=inputs["lead_data"])
+        
+    def _personalized_email_request(self, lead_data: Dict, communication_style: str) -> Dict:
+        inputs = {
+            "lead_data": self._lead_prompt_data(lead_data, "personalized_email"),
+            "communication_style": communication_style
+        }
+        return self._llm_request("personalized_email", inputs)
+        
+    def _fused_request(self, lead_data: Dict) -> Dict:
+        inputs = {"lead_data": self._lead_prompt_data(lead_data, "fused_style_email")}
+        return self._llm_request("fused_style_email", inputs)
+        
+    @staticmethod
+    def _fused_result(data: Dict) -> Optional[tuple]:
+        """Gibt (Kommunikationsstil, E-Mail) zurück oder None, wenn ein Feld auch nach der Nachfrage fehlt"""
+        if "communication_style" in data and "email" in data:
+            return data["communication_style"], data["email"]
+        return None
+        
+    def _local_style(self, lead_data: Dict) -> Optional[str]:
+        """Kommunikationsstil vom lokalen Klassifikator, None bei geringer Konfidenz"""
+        if self.style_classifier is None:
+            return None
+        prediction = self.style_classifier.classify([self._lead_prompt_data(lead_data, "communication_style")])[0]
+        return describe_style(prediction) if prediction else None
+        
     def analyze_communication_style(self, lead_data: Dict) -> str:
         """Analysiert den Kommunikationsstil basierend auf den gesammelten Daten"""
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "Du bist ein Experte für Kommunikationsanalyse. Analysiere die folgenden Informationen und bestimme den wahrscheinlichen Kommunikationsstil der Person."),
-            ("user", "{lead_data}")
-        ])
+        local = self._local_style(lead_data)
+        if local is not None:
+            return local
+        return self.llm_client.complete(**self._communication_style_request(lead_data))
         
-        chain = prompt | self.llm | StrOutputParser()
-        return chain.invoke({"lead_data": json.dumps(lead_data, indent=2)})
+    async def aanalyze_communication_style(self, lead_data: Dict) -> str:
+        """Asynchrone Variante von analyze_communication_style"""
+        local = self._local_style(lead_data)
+        if local is not None:
+            return local
+        return await self.llm_client.acomplete(**self._communication_style_request(lead_data))
         
     def generate_personalized_email(self, lead_data: Dict, communication_style: str) -> str:
         """Generiert eine personalisierte E-Mail basierend auf den Lead-Daten"""
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "Du bist ein erfahrener Sales Copywriter. Schreibe eine hochpersonalisierte E-Mail basierend auf den Lead-Daten und dem Kommunikationsstil."),
-            ("user", "Lead-Daten: {lead_data}\nKommunikationsstil: {communication_style}")
-        ])
-        
-        chain = prompt | self.llm | StrOutputParser()
-        return chain.invoke({
-            "lead_data": json.dumps(lead_data, indent=2),
-            "communication_style": communication_style
-        })
+        return self.llm_client.complete(**self._personalized_email_request(lead_data, communication_style))
+        
+    async def agenerate_personalized_email(self, lead_data: Dict, communication_style: str) -> str:
+        """Asynchrone Variante von generate_personalized_email"""
+        return await self.llm_client.acomplete(**self._personalized_email_request(lead_data, communication_style))
         
     def send_email(self, to_email: str, subject: str, body: str):
         """Sendet die generierte E-Mail"""
-        msg = MIMEMultipart()
-        msg['From'] = EMAIL_USERNAME
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        
-        msg.attach(MIMEText(body, 'plain'))
+        self.smtp_pool.send(build_message(EMAIL_USERNAME, to_email, subject, body))
         
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(EMAIL_USERNAME, EMAIL_PASSWORD)
-            server.send_message(msg)
+    def queue_email(self, to_email: str, subject: str, body: str,
+                    on_sent: Optional[Callable[[], Any]] = None,
+                    on_failed: Optional[Callable[[Exception], Any]] = None) -> bool:
+        """Reiht die generierte E-Mail in die Versandwarteschlange ein; False, wenn sie dort bereits wartet"""
+        return self.mail_queue.enqueue(
+            build_message(EMAIL_USERNAME, to_email, subject, body),
+            key=f"{to_email}:initial",
+            on_sent=on_sent,
+            on_failed=on_failed
+        )
             
-    def process_lead(self, lead: Dict) -> Dict:
-        """Verarbeitet einen einzelnen Lead durch den gesamten Workflow"""
-        # Hole Domain-Informationen
-        domain_info = self.get_domain_info(lead.get("domain", ""))
+    def enrich_lead(self, lead: Dict, plan: Dict) -> Dict:
+        """Sammelt Domain- und LinkedIn-Informationen und kombiniert sie mit dem Lead"""
+        # Hole Domain- und LinkedIn-Informationen, parallel wenn die Engine mehrere Seiten rendern kann
+        with ThreadPoolExecutor(max_workers=min(2, self.browser.max_concurrency)) as executor:
+            domain_future = executor.submit(self.get_domain_info, domain_of(lead)) if plan["domain"] else None
+            linkedin_future = executor.submit(self.get_linkedin_info, lead.get("linkedin_url", "")) if plan["linkedin"] else None
+            domain_info = domain_future.result() if domain_future else (domain_info_from_record(lead) or {})
+            linkedin_info = linkedin_future.result() if linkedin_future else (linkedin_info_from_record(lead) or {})
         
-        # Hole LinkedIn-Informationen
-        linkedin_info = self.get_linkedin_info(lead.get("linkedin_url", ""))
-        
-        # Kombiniere alle Informationen
-        lead_data = {
+        return {
             **lead,
             "domain_info": domain_info,
             "linkedin_info": linkedin_info
         }
         
-        # Analysiere Kommunikationsstil
-        communication_style = self.analyze_communication_style(lead_data)
+    def _lead_result(self, lead_data: Dict, communication_style: str, email_content: str) -> Dict:
+        """Ergebnis eines Leads; die Lead-Felder stehen auch oben, für Google Sheets und den Zeitplan"""
+        return {
+            **lead_data,
+            "lead_data": lead_data,
+            "communication_style": communication_style,
+            "email_content": email_content,
+            # Versendet wird erst mit deliver im Hintergrund; bis dahin steht der Lead auf "Pending"
+            "email_sent": False,
+            "email_queued": False
+        }
         
-        # Generiere E-Mail
-        email_content = self.generate_personalized_email(lead_data, communication_style)
+    def deliver(self, processed_lead: Dict) -> bool:
+        """Reiht die E-Mail eines verarbeiteten Leads zum Versand ein.
         
-        # Sende E-Mail
-        self.send_email(
-            lead.get("email", ""),
+        Erst aufrufen, nachdem der Lead in Google Sheets steht: nach dem Versand
+        bzw. einem Fehlschlag wird seine Zeile aktualisiert. Eine bereits
+        verschickte E-Mail geht nicht erneut raus.
+        """
+        to_email = processed_lead.get("email", "")
+        queued = self.queue_email(
+            to_email,
             "Personalisiertes Angebot für Sie",
-            email_content
+            processed_lead["email_content"],
+            on_sent=lambda: self._update_status(to_email, "Sent"),
+            on_failed=lambda error: self._on_failed(to_email, error)
         )
+        processed_lead["email_queued"] = queued
+        return queued
         
-        return {
-            "lead_data": lead_data,
-            "communication_style": communication_style,
-            "email_sent": True
-        }
+    def _on_failed(self, to_email: str, error: Exception):
+        """Vermerkt einen fehlgeschlagenen Versand; die Ausgangsbox versucht es bis MAIL_MAX_ATTEMPTS erneut"""
+        outbox = self.mail_queue.outbox
+        if outbox is not None and outbox.state(f"{to_email}:initial") == "pending":
+            self._update_status(to_email, f"Versand wird wiederholt: {str(error)}")
+        else:
+            self._update_status(to_email, f"Versand fehlgeschlagen: {str(error)}")
+            
+    def _update_status(self, to_email: str, status: str):
+        if self.sheets_manager is None:
+            return
+        try:
+            if not self.sheets_manager.update_lead_status(to_email, status):
+                self.logger.warning(f"Lead {to_email} nicht in Google Sheets, Status {status} nicht gesetzt")
+        except Exception as e:
+            self.logger.error(f"Fehler beim Aktualisieren des Status von {to_email}: {str(e)}")
+        
+    def generate_content(self, lead: Dict, lead_data: Dict, plan: Dict) -> tuple:
+        """Bestimmt Kommunikationsstil und E-Mail, im fusionierten Modus mit einem einzigen Aufruf"""
+        if self.fused and plan["communication_style"] and plan["email"]:
+            fused = self._fused_result(self.llm_client.complete_json(STYLE_EMAIL_SCHEMA, **self._fused_request(lead_data)))
+            if fused is not None:
+                return fused
+            self.logger.warning("Fusionierte Antwort unbrauchbar, verwende getrennte Aufrufe")
+        
+        # Analysiere Kommunikationsstil
+        if plan["communication_style"]:
+            communication_style = self.analyze_communication_style(lead_data)
+        else:
+            communication_style = lead["communication_style"]
+        
+        # Generiere E-Mail
+        if plan["email"]:
+            email_content = self.generate_personalized_email(lead_data, communication_style)
+        else:
+            email_content = lead["email_content"]
+        
+        return communication_style, email_content
+        
+    async def agenerate_content(self, lead: Dict, lead_data: Dict, plan: Dict) -> tuple:
+        """Asynchrone Variante von generate_content"""
+        if self.fused and plan["communication_style"] and plan["email"]:
+            fused = self._fused_result(await self.llm_client.acomplete_json(STYLE_EMAIL_SCHEMA, **self._fused_request(lead_data)))
+            if fused is not None:
+                return fused
+            self.logger.warning("Fusionierte Antwort unbrauchbar, verwende getrennte Aufrufe")
+        
+        if plan["communication_style"]:
+            communication_style = await self.aanalyze_communication_style(lead_data)
+        else:
+            communication_style = lead["communication_style"]
+        
+        if plan["email"]:
+            email_content = await self.agenerate_personalized_email(lead_data, communication_style)
+        else:
+            email_content = lead["email_content"]
         
+        return communication_style, email_content
+        
+    def process_lead(self, lead: Dict) -> Dict:
+        """Verarbeitet einen einzelnen Lead durch den gesamten Workflow"""
+        # Prüfe, welche Stufen der Apify-Datensatz bereits abdeckt
+        plan = self.enrichment.plan(lead)
+        lead_data = self.enrich_lead(lead, plan)
+        communication_style, email_content = self.generate_content(lead, lead_data, plan)
+        return self._lead_result(lead_data, communication_style, email_content)
+        
+    async def aprocess_lead(self, lead: Dict, browser_slots: asyncio.Semaphore) -> Dict:
+        """Asynchrone Variante von process_lead; die LLM-Aufrufe laufen über den gemeinsamen Limiter"""
+        plan = self.enrichment.plan(lead)
+        async with browser_slots:
+            lead_data = await asyncio.to_thread(self.enrich_lead, lead, plan)
+        
+        communication_style, email_content = await self.agenerate_content(lead, lead_data, plan)
+        return self._lead_result(lead_data, communication_style, email_content)
+        
+    def process_leads(self, leads: List[Dict],
+                      on_result: Optional[Callable[[Dict, Any], None]] = None) -> List[Any]:
+        """Verarbeitet mehrere Leads gleichzeitig.
+        
+        Gibt pro Lead das Ergebnis oder die aufgetretene Exception zurück, damit
+        ein fehlerhafter Lead den Rest des Batches nicht abbricht. on_result(lead,
+        ergebnis) läuft für jeden Lead, sobald er fertig ist, nacheinander und in
+        einem eigenen Thread; so ist bei einem Abbruch jeder fertige Lead bereits
+        gespeichert.
+        """
+        async def run_one(index, lead, browser_slots):
+            try:
+                return index, await self.aprocess_lead(lead, browser_slots)
+            except Exception as e:
+                return index, e
+        
+        async def run_all():
+            # Nicht mehr Leads gleichzeitig scrapen, als die Browser-Engine Seiten rendern kann
+            browser_slots = asyncio.Semaphore(self.browser.max_concurrency)
+            results = [None] * len(leads)
+            async for index, result in self.llm_client.as_completed(
+                [run_one(index, lead, browser_slots) for index, lead in enumerate(leads)]
+            ):
+                results[index] = result
+                if on_result is not None:
+                    try:
+                        await asyncio.to_thread(on_result, leads[index], result)
+                    except Exception as e:
+                        self.logger.error(f"Fehler beim Speichern des Leads {leads[index].get('email', '')}: {str(e)}")
+            return results
+        
+        return self.llm_client.run(run_all())
+        
+    def close(self):
+        """Gibt den Browser explizit frei"""
+        browser = getattr(self, 'browser', None)
+        if browser is not None:
+            self.browser = None
+            browser.close()
+            
     def __del__(self):
         """Cleanup beim Beenden"""
-        if hasattr(self, 'driver'):
-            self.driver.quit() 
\ No newline at end of file
+        self.close() 
\ No newline at end of file
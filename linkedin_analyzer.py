@@ -1,12 +1,10 @@
 from typing import Dict
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from browser_engine import create_chrome_driver
+from browser_supervisor import DriverSupervisor
 from config import *
 
 class LinkedInAnalyzer:
@@ -14,44 +12,23 @@ class LinkedInAnalyzer:
         self.setup_selenium()
         
     def setup_selenium(self):
-        """Richtet Selenium für das LinkedIn-Scraping ein"""
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument(f"user-agent={USER_AGENT}")
-        self.driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()),
-            options=chrome_options
+        """Richtet einen überwachten Selenium-Driver für das LinkedIn-Scraping ein"""
+        self.supervisor = DriverSupervisor(create_chrome_driver)
+        
+    def _load_profile(self, driver, linkedin_url: str) -> str:
+        """Lädt das Profil und wartet auf die wichtigsten Elemente"""
+        driver.get(linkedin_url)
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.CLASS_NAME, "text-heading-xlarge"))
         )
+        return driver.page_source
         
     def analyze_profile(self, linkedin_url: str) -> Dict:
         """Analysiert ein LinkedIn-Profil"""
         try:
-            self.driver.get(linkedin_url)
-            
-            # Warte auf das Laden der wichtigsten Elemente
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "text-heading-xlarge"))
-            )
-            
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+            html = self.supervisor.run(lambda driver: self._load_profile(driver, linkedin_url))
             
-            # Extrahiere grundlegende Informationen
-            name = self._get_name(soup)
-            headline = self._get_headline(soup)
-            about = self._get_about(soup)
-            experience = self._get_experience(soup)
-            education = self._get_education(soup)
-            skills = self._get_skills(soup)
-            
-            return {
-                "name": name,
-                "headline": headline,
-                "about": about,
-                "experience": experience,
-                "education": education,
-                "skills": skills,
-                "url": linkedin_url
-            }
+            return self.parse_html(html, linkedin_url)
             
         except Exception as e:
             return {
@@ -59,6 +36,20 @@ class LinkedInAnalyzer:
                 "url": linkedin_url
             }
             
+    def parse_html(self, html: str, linkedin_url: str) -> Dict:
+        """Extrahiert die Profilinformationen aus dem HTML"""
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        return {
+            "name": self._get_name(soup),
+            "headline": self._get_headline(soup),
+            "about": self._get_about(soup),
+            "experience": self._get_experience(soup),
+            "education": self._get_education(soup),
+            "skills": self._get_skills(soup),
+            "url": linkedin_url
+        }
+            
     def _get_name(self, soup: BeautifulSoup) -> str:
         """Extrahiert den Namen"""
         name_element = soup.find("h1", {"class": "text-heading-xlarge"})
@@ -127,5 +118,5 @@ class LinkedInAnalyzer:
         
     def __del__(self):
         """Cleanup beim Beenden"""
-        if hasattr(self, 'driver'):
-            self.driver.quit() 
\ No newline at end of file
+        if hasattr(self, 'supervisor'):
+            self.supervisor.close() 
\ No newline at end of file
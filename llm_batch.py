@@ -0,0 +1,324 @@
+from typing import Any, Callable, Dict, List, Optional
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from llm_cache import get_llm_cache
+from llm_client import to_openai_messages
+
+logger = logging.getLogger(__name__)
+
+# Endzustände eines Batch-Jobs (Benennung wie in der OpenAI Batch API)
+FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+# Parameter einer Anfrage, die nur für den LLM-Client gelten und nicht an die API gehen
+CLIENT_PARAMS = {"messages", "namespace", "version", "cache_inputs", "validate", "escalate_to", "min_confidence",
+                 "semantic_input", "on_partial"}
+
+def request_body(request: Dict) -> Dict:
+    """Wandelt die Parameter für LLMClient.complete in den Body einer Chat-Completion um"""
+    body = {key: value for key, value in request.items() if key not in CLIENT_PARAMS}
+    body["messages"] = to_openai_messages(request["messages"])
+    return body
+
+def response_content(line: Dict) -> Optional[str]:
+    """Antworttext einer Zeile der Batch-Ausgabe oder None bei Fehlern"""
+    response = line.get("response") or {}
+    if response.get("status_code") != 200:
+        return None
+    try:
+        return response["body"]["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+class BatchBackend(ABC):
+    """Schnittstelle für Batch-Backends: JSONL-Datei einreichen, Status abfragen, Ergebnisse holen"""
+
+    name = "base"
+
+    @abstractmethod
+    def submit(self, input_path: str) -> str:
+        """Reicht die Eingabedatei ein und gibt die Job-ID zurück"""
+
+    @abstractmethod
+    def status(self, job_id: str) -> str:
+        """Status des Jobs, benannt wie in der OpenAI Batch API"""
+
+    @abstractmethod
+    def results(self, job_id: str) -> Dict[str, Optional[str]]:
+        """Antworten als custom_id -> Antworttext oder None bei Fehlern"""
+
+class OpenAIBatchBackend(BatchBackend):
+    """Reicht Jobs bei der OpenAI Batch API ein (Ergebnis innerhalb von 24 Stunden, halber Preis)"""
+
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str] = None):
+        from openai import OpenAI
+        self.client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"), base_url=os.getenv("OPENAI_BASE_URL") or None)
+
+    def submit(self, input_path: str) -> str:
+        with open(input_path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        return batch.id
+
+    def status(self, job_id: str) -> str:
+        return self.client.batches.retrieve(job_id).status
+
+    def results(self, job_id: str) -> Dict[str, Optional[str]]:
+        batch = self.client.batches.retrieve(job_id)
+        results = {}
+        if batch.output_file_id:
+            for raw in self.client.files.content(batch.output_file_id).text.splitlines():
+                if raw.strip():
+                    line = json.loads(raw)
+                    results[line["custom_id"]] = response_content(line)
+        return results
+
+class LocalBatchBackend(BatchBackend):
+    """Dateibasierter Ersatz für die Batch API, z.B. für Tests.
+
+    Die Anfragen werden beim ersten Statusabruf mit responder beantwortet und
+    im Ausgabeformat der Batch API neben die Eingabedatei geschrieben.
+    responder erhält den Body einer Chat-Completion und gibt den Antworttext
+    zurück; ohne responder laufen die Anfragen über den gemeinsamen LLM-Client.
+    """
+
+    name = "local"
+
+    def __init__(self, directory: str, responder: Optional[Callable[[Dict], str]] = None):
+        self.directory = directory
+        self.responder = responder
+
+    def _paths(self, job_id: str):
+        return (os.path.join(self.directory, f"{job_id}.input.jsonl"),
+                os.path.join(self.directory, f"{job_id}.output.jsonl"))
+
+    def _respond(self, body: Dict) -> str:
+        if self.responder is not None:
+            return self.responder(body)
+        from llm_client import get_llm_client
+        return get_llm_client().complete(**body)
+
+    def submit(self, input_path: str) -> str:
+        job_id = f"local_{uuid.uuid4().hex[:12]}"
+        os.makedirs(self.directory, exist_ok=True)
+        job_input, _ = self._paths(job_id)
+        with open(input_path, "r", encoding="utf-8") as src, open(job_input, "w", encoding="utf-8") as dst:
+            dst.write(src.read())
+        return job_id
+
+    def status(self, job_id: str) -> str:
+        job_input, job_output = self._paths(job_id)
+        if not os.path.exists(job_input):
+            return "failed"
+        if not os.path.exists(job_output):
+            self._process(job_input, job_output)
+        return "completed"
+
+    def _process(self, job_input: str, job_output: str):
+        lines = []
+        with open(job_input, "r", encoding="utf-8") as f:
+            for raw in f:
+                if not raw.strip():
+                    continue
+                request = json.loads(raw)
+                try:
+                    content = self._respond(request["body"])
+                    response = {"status_code": 200, "body": {"choices": [{"message": {"role": "assistant", "content": content}}]}}
+                    error = None
+                except Exception as e:
+                    response = None
+                    error = {"message": str(e)}
+                lines.append({"custom_id": request["custom_id"], "response": response, "error": error})
+        # Erst vollständig schreiben, dann umbenennen, damit ein Abbruch keine halbe Ausgabe hinterlässt
+        with open(job_output + ".tmp", "w", encoding="utf-8") as f:
+            for line in lines:
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+        os.replace(job_output + ".tmp", job_output)
+
+    def results(self, job_id: str) -> Dict[str, Optional[str]]:
+        _, job_output = self._paths(job_id)
+        results = {}
+        if os.path.exists(job_output):
+            with open(job_output, "r", encoding="utf-8") as f:
+                for raw in f:
+                    if raw.strip():
+                        line = json.loads(raw)
+                        results[line["custom_id"]] = response_content(line)
+        return results
+
+class BatchManager:
+    """Sammelt LLM-Anfragen in Batch-Jobs, verfolgt deren Status und liefert die Ergebnisse zurück.
+
+    Anfragen mit Treffer im LLM-Cache werden nicht eingereicht. Eingesammelte
+    Antworten landen im LLM-Cache, sodass spätere interaktive Aufrufe mit
+    denselben Eingaben sie wiederverwenden.
+    """
+
+    def __init__(self, backend: BatchBackend, directory: str):
+        self.backend = backend
+        self.directory = directory
+        self.cache = get_llm_cache()
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, "jobs.sqlite3"), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS batch_jobs (
+                job_id TEXT PRIMARY KEY,
+                backend TEXT NOT NULL,
+                status TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS batch_requests (
+                job_id TEXT NOT NULL,
+                custom_id TEXT NOT NULL,
+                cache_key TEXT,
+                namespace TEXT NOT NULL,
+                inputs TEXT NOT NULL,
+                response TEXT,
+                PRIMARY KEY (job_id, custom_id)
+            )
+        """)
+        self._conn.commit()
+
+    def submit(self, requests: Dict[str, Dict], metadata: Any = None) -> str:
+        """Reicht die Anfragen (custom_id -> Parameter für LLMClient.complete) als Batch-Job ein"""
+        rows = []
+        lines = []
+        for custom_id, request in requests.items():
+            cache_inputs = request.get("cache_inputs")
+            cache_key = None
+            response = None
+            if cache_inputs is not None:
+                cache_key = self.cache.make_key(request["model"], request["temperature"], request.get("version", ""), cache_inputs)
+                response = self.cache.get(cache_key)
+            rows.append((custom_id, cache_key, request.get("namespace", ""), json.dumps(cache_inputs, ensure_ascii=False), response))
+            if response is None:
+                lines.append({"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": request_body(request)})
+
+        if lines:
+            input_path = os.path.join(self.directory, f"batch_{int(time.time())}_{uuid.uuid4().hex[:8]}.jsonl")
+            with open(input_path, "w", encoding="utf-8") as f:
+                for line in lines:
+                    f.write(json.dumps(line, ensure_ascii=False) + "\n")
+            job_id = self.backend.submit(input_path)
+            status = "submitted"
+        else:
+            # Alles aus dem Cache beantwortet, es muss nichts eingereicht werden
+            job_id = f"cached_{uuid.uuid4().hex[:12]}"
+            status = "completed"
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO batch_jobs VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, self.backend.name, status, json.dumps(metadata, ensure_ascii=False), now, now)
+            )
+            self._conn.executemany(
+                "INSERT INTO batch_requests VALUES (?, ?, ?, ?, ?, ?)",
+                [(job_id, *row) for row in rows]
+            )
+            self._conn.commit()
+        logger.info(f"Batch-Job {job_id}: {len(lines)} Anfragen eingereicht, {len(rows) - len(lines)} aus dem Cache")
+        return job_id
+
+    def _set_status(self, job_id: str, status: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE batch_jobs SET status = ?, updated_at = ? WHERE job_id = ?",
+                (status, time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def refresh(self, job_id: str) -> str:
+        """Fragt den aktuellen Status beim Backend ab und speichert ihn"""
+        job = self.job(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if job["status"] in FINAL_STATUSES or job["status"] == "collected":
+            return job["status"]
+        status = self.backend.status(job_id)
+        if status != job["status"]:
+            self._set_status(job_id, status)
+        return status
+
+    def job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, backend, status, metadata, created_at, updated_at FROM batch_jobs WHERE job_id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row[0], "backend": row[1], "status": row[2],
+            "metadata": json.loads(row[3]), "created_at": row[4], "updated_at": row[5]
+        }
+
+    def open_jobs(self) -> List[Dict[str, Any]]:
+        """Alle Jobs, deren Ergebnisse noch nicht eingesammelt wurden"""
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute(
+                "SELECT job_id FROM batch_jobs WHERE status != 'collected' ORDER BY created_at"
+            )]
+        return [self.job(job_id) for job_id in ids]
+
+    def collect(self, job_id: str, validate: Optional[Callable[[str], bool]] = None) -> Dict[str, Optional[str]]:
+        """Sammelt die Ergebnisse eines abgeschlossenen Jobs ein (custom_id -> Antwort oder None).
+
+        Gültige Antworten werden im LLM-Cache abgelegt; der Job gilt danach als erledigt.
+        validate entscheidet nur über den Cache, ungültige Antworten werden trotzdem
+        zurückgegeben und müssen vom Aufrufer geprüft werden.
+        """
+        status = self.refresh(job_id)
+        if status not in FINAL_STATUSES:
+            raise RuntimeError(f"Batch-Job {job_id} ist noch nicht abgeschlossen ({status})")
+
+        fetched = self.backend.results(job_id) if status == "completed" and not job_id.startswith("cached_") else {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT custom_id, cache_key, namespace, inputs, response FROM batch_requests WHERE job_id = ?",
+                (job_id,)
+            ).fetchall()
+
+        results = {}
+        for custom_id, cache_key, namespace, inputs, response in rows:
+            if response is None:
+                response = fetched.get(custom_id)
+                if response is not None and cache_key is not None and (validate is None or validate(response)):
+                    self.cache.set(cache_key, response, namespace, json.loads(inputs))
+            results[custom_id] = response
+
+        self._set_status(job_id, "collected")
+        failed = sum(1 for response in results.values() if response is None)
+        logger.info(f"Batch-Job {job_id} eingesammelt: {len(results) - failed} Antworten, {failed} fehlgeschlagen")
+        return results
+
+# Prozessweite Instanz
+_manager = None
+
+def get_batch_manager() -> BatchManager:
+    """Gibt die Singleton-Instanz des Batch-Managers zurück."""
+    global _manager
+    if _manager is None:
+        directory = os.getenv("LLM_BATCH_DIR", "llm_batches")
+        if os.getenv("LLM_BATCH_BACKEND", "openai") == "local":
+            backend = LocalBatchBackend(os.path.join(directory, "local"))
+        else:
+            backend = OpenAIBatchBackend()
+        _manager = BatchManager(backend, directory)
+    return _manager
@@ -0,0 +1,154 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+def normalize_inputs(inputs: Any) -> Any:
+    """Vereinheitlicht Whitespace in allen Strings, damit Formatierungsunterschiede den Cache nicht umgehen"""
+    if isinstance(inputs, str):
+        return " ".join(inputs.split())
+    if isinstance(inputs, dict):
+        return {str(key): normalize_inputs(value) for key, value in inputs.items()}
+    if isinstance(inputs, (list, tuple)):
+        return [normalize_inputs(value) for value in inputs]
+    return inputs
+
+def prompt_version(messages: Any) -> str:
+    """Kurzer Hash der Prompt-Vorlage; ändert sich der Prompt, ändern sich die Cache-Schlüssel"""
+    text = json.dumps(messages, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+class LLMCache:
+    """Persistenter Cache für LLM-Antworten mit TTL, Größenbegrenzung und Trefferstatistik"""
+
+    def __init__(self, path: str, ttl_seconds: int, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                request TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, temperature: float, version: str, inputs: Any) -> str:
+        """Schlüssel aus Modell, Temperatur, Prompt-Version und normalisierten Eingaben"""
+        payload = json.dumps(
+            [model, temperature, version, normalize_inputs(inputs)],
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Gibt eine gültige Antwort zurück oder None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, response: str, namespace: str = "", inputs: Any = None):
+        """Speichert eine Antwort und verdrängt bei Bedarf die am längsten ungenutzten Einträge"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, namespace, json.dumps(inputs, ensure_ascii=False), response, now, now)
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            overflow = count - self.max_entries
+            if self.max_entries and overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,)
+                )
+                self.evictions += overflow
+            self._conn.commit()
+
+    def get_or_compute(self, namespace: str, model: str, temperature: float, version: str,
+                       inputs: Any, compute: Callable[[], str],
+                       validate: Optional[Callable[[str], bool]] = None) -> str:
+        """Gibt die gecachte Antwort zurück oder ruft das LLM auf und speichert das Ergebnis.
+        
+        Mit validate werden nur verwertbare Antworten gespeichert, damit eine
+        fehlerhafte Antwort beim nächsten Lauf erneut angefragt wird.
+        """
+        key = self.make_key(model, temperature, version, inputs)
+        cached = self.get(key)
+        if cached is not None:
+            logger.debug(f"LLM-Cache-Treffer für {namespace}")
+            return cached
+
+        response = compute()
+        if validate is None or validate(response):
+            self.set(key, response, namespace, inputs)
+        return response
+
+    def entries(self, namespaces: Iterable[str]) -> List[Tuple[str, Any, str]]:
+        """Alle gespeicherten (Namespace, Eingaben, Antwort) der Namespaces, z.B. als Trainingsdaten"""
+        namespaces = list(namespaces)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT namespace, request, response FROM llm_cache WHERE namespace IN ({','.join('?' * len(namespaces))})",
+                namespaces
+            ).fetchall()
+        return [(namespace, json.loads(request), response) for namespace, request, response in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        """Trefferquote und Größe des Caches"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries
+        }
+
+# Prozessweite Instanz, die sich alle Agenten teilen
+_cache = None
+
+def get_llm_cache() -> LLMCache:
+    """Gibt die Singleton-Instanz des LLM-Caches zurück."""
+    global _cache
+    if _cache is None:
+        _cache = LLMCache(
+            path=os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3"),
+            ttl_seconds=int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+        )
+    return _cache
@@ -0,0 +1,253 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+logger = logging.getLogger(__name__)
+
+# Parameter, die nur die Übertragung betreffen; gestreamte und normale Aufrufe teilen sich eine Aufnahme
+TRANSPORT_PARAMS = {"stream", "stream_options", "timeout"}
+
+# Zeichen pro Chunk, wenn eine Aufnahme als Stream abgespielt wird
+REPLAY_CHUNK_CHARS = 16
+
+class CassetteMissError(Exception):
+    """Im Replay-Modus gibt es zu einer Anfrage keine Aufnahme"""
+    pass
+
+def _namespace(value: Any) -> Any:
+    """Baut aus gespeicherten Dicts Objekte mit denselben Attributen wie die OpenAI-Antworten"""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: _namespace(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [_namespace(item) for item in value]
+    return value
+
+def _usage(usage: Any) -> Optional[Dict[str, int]]:
+    if usage is None:
+        return None
+    return {key: getattr(usage, key, None) for key in ("prompt_tokens", "completion_tokens", "total_tokens")}
+
+def chat_record(response: Any) -> Dict[str, Any]:
+    """Speicherbare Form einer Chat-Completion: Text, Verbrauch und ggf. Logprobs"""
+    choice = response.choices[0]
+    logprobs = getattr(getattr(choice, "logprobs", None), "content", None)
+    return {
+        "content": choice.message.content,
+        "usage": _usage(getattr(response, "usage", None)),
+        "logprobs": [token.logprob for token in logprobs] if logprobs else None
+    }
+
+def chat_response(record: Dict[str, Any]) -> Any:
+    logprobs = {"content": [{"logprob": value} for value in record["logprobs"]]} if record.get("logprobs") else None
+    return _namespace({
+        "choices": [{"message": {"content": record["content"]}, "logprobs": logprobs}],
+        "usage": record.get("usage")
+    })
+
+def chat_chunks(record: Dict[str, Any]) -> List[Any]:
+    """Spielt eine Aufnahme als Stream ab: Text in kleinen Deltas, Verbrauch im letzten Chunk"""
+    content = record["content"] or ""
+    chunks = [
+        _namespace({"choices": [{"delta": {"content": content[i:i + REPLAY_CHUNK_CHARS]}}], "usage": None})
+        for i in range(0, len(content), REPLAY_CHUNK_CHARS)
+    ]
+    chunks.append(_namespace({"choices": [], "usage": record.get("usage")}))
+    return chunks
+
+def embeddings_record(response: Any) -> Dict[str, Any]:
+    return {"embeddings": [item.embedding for item in response.data], "usage": _usage(getattr(response, "usage", None))}
+
+def embeddings_response(record: Dict[str, Any]) -> Any:
+    return _namespace({"data": [{"embedding": vector} for vector in record["embeddings"]], "usage": record.get("usage")})
+
+class Cassette:
+    """Aufnahmen von OpenAI-Aufrufen in einer JSONL-Datei, eine Zeile pro Anfrage und Antwort.
+
+    Im Modus "record" werden Aufrufe an die API durchgereicht und mit ihrer
+    Latenz angehängt, im Modus "replay" ausschließlich aus der Datei beantwortet.
+    Wiederholte gleiche Anfragen erhalten die Antworten in der aufgenommenen
+    Reihenfolge. latency ist eine feste Verzögerung in Sekunden oder "recorded"
+    für die aufgenommene Latenz; 0 spielt mit voller Geschwindigkeit ab.
+    """
+
+    def __init__(self, path: str, mode: str = "replay", latency: Any = 0.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unbekannter Cassette-Modus: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._played = Counter()
+        self.counts = Counter()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], []).append(entry)
+        elif mode == "replay":
+            logger.warning(f"Cassette {path} existiert nicht, jeder Aufruf schlägt fehl")
+
+    @staticmethod
+    def make_key(kind: str, params: Dict[str, Any]) -> str:
+        request = {key: value for key, value in params.items() if key not in TRANSPORT_PARAMS}
+        payload = json.dumps([kind, request], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def play(self, kind: str, params: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
+        """Gibt (Antwort, Verzögerung) der nächsten Aufnahme zur Anfrage zurück"""
+        key = self.make_key(kind, params)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.counts["missing"] += 1
+                raise CassetteMissError(f"Keine Aufnahme für {kind}-Aufruf mit {params.get('model')} in {self.path}")
+            entry = entries[min(self._played[key], len(entries) - 1)]
+            self._played[key] += 1
+            self.counts["replayed"] += 1
+        delay = entry["latency"] if self.latency == "recorded" else float(self.latency)
+        return entry["response"], delay
+
+    def record(self, kind: str, params: Dict[str, Any], response: Dict[str, Any], latency: float):
+        key = self.make_key(kind, params)
+        request = {key: value for key, value in params.items() if key not in TRANSPORT_PARAMS}
+        entry = {"key": key, "kind": kind, "request": request, "response": response, "latency": round(latency, 3)}
+        with self._lock:
+            self._entries.setdefault(key, []).append(entry)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+            self.counts["recorded"] += 1
+
+    def wrap(self, factory: Callable[[], Any]) -> "CassetteClient":
+        """Umhüllt einen OpenAI-Client; factory wird erst beim ersten echten API-Aufruf ausgeführt"""
+        return CassetteClient(self, factory)
+
+    def wrap_async(self, factory: Callable[[], Any]) -> "AsyncCassetteClient":
+        return AsyncCassetteClient(self, factory)
+
+    def stats(self) -> Dict[str, Any]:
+        """Abgespielte, aufgenommene und fehlende Aufrufe"""
+        with self._lock:
+            return {"mode": self.mode, "entries": sum(len(e) for e in self._entries.values()), **self.counts}
+
+class CassetteClient:
+    """Bietet chat.completions.create und embeddings.create wie der OpenAI-Client an.
+
+    Alle übrigen Attribute werden an den echten Client durchgereicht.
+    """
+
+    def __init__(self, cassette: Cassette, factory: Callable[[], Any]):
+        self._cassette = cassette
+        self._factory = factory
+        self._client = None
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+        self.embeddings = SimpleNamespace(create=self._embeddings)
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    def _chat(self, **params) -> Any:
+        if self._cassette.mode == "replay":
+            record, delay = self._cassette.play("chat", params)
+            time.sleep(delay)
+            return iter(chat_chunks(record)) if params.get("stream") else chat_response(record)
+
+        started = time.monotonic()
+        response = self.client.chat.completions.create(**params)
+        if params.get("stream"):
+            return self._record_stream(params, response, started)
+        self._cassette.record("chat", params, chat_record(response), time.monotonic() - started)
+        return response
+
+    def _record_stream(self, params: Dict[str, Any], stream: Any, started: float) -> Iterator[Any]:
+        content, usage = "", None
+        for chunk in stream:
+            usage = chunk.usage or usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                content += chunk.choices[0].delta.content
+            yield chunk
+        record = {"content": content, "usage": _usage(usage), "logprobs": None}
+        self._cassette.record("chat", params, record, time.monotonic() - started)
+
+    def _embeddings(self, **params) -> Any:
+        if self._cassette.mode == "replay":
+            record, delay = self._cassette.play("embeddings", params)
+            time.sleep(delay)
+            return embeddings_response(record)
+
+        started = time.monotonic()
+        response = self.client.embeddings.create(**params)
+        self._cassette.record("embeddings", params, embeddings_record(response), time.monotonic() - started)
+        return response
+
+class AsyncCassetteClient(CassetteClient):
+    """Asynchrone Variante von CassetteClient für AsyncOpenAI"""
+
+    async def _chat(self, **params) -> Any:
+        if self._cassette.mode == "replay":
+            record, delay = self._cassette.play("chat", params)
+            await asyncio.sleep(delay)
+            return self._replay_stream(record) if params.get("stream") else chat_response(record)
+
+        started = time.monotonic()
+        response = await self.client.chat.completions.create(**params)
+        if params.get("stream"):
+            return self._arecord_stream(params, response, started)
+        self._cassette.record("chat", params, chat_record(response), time.monotonic() - started)
+        return response
+
+    @staticmethod
+    async def _replay_stream(record: Dict[str, Any]):
+        for chunk in chat_chunks(record):
+            yield chunk
+
+    async def _arecord_stream(self, params: Dict[str, Any], stream: Any, started: float):
+        content, usage = "", None
+        async for chunk in stream:
+            usage = chunk.usage or usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                content += chunk.choices[0].delta.content
+            yield chunk
+        record = {"content": content, "usage": _usage(usage), "logprobs": None}
+        self._cassette.record("chat", params, record, time.monotonic() - started)
+
+    async def _embeddings(self, **params) -> Any:
+        if self._cassette.mode == "replay":
+            record, delay = self._cassette.play("embeddings", params)
+            await asyncio.sleep(delay)
+            return embeddings_response(record)
+
+        started = time.monotonic()
+        response = await self.client.embeddings.create(**params)
+        self._cassette.record("embeddings", params, embeddings_record(response), time.monotonic() - started)
+        return response
+
+# Prozessweite Instanz; None ohne LLM_CASSETTE_MODE
+_cassette = None
+
+def get_cassette() -> Optional[Cassette]:
+    """Gibt die Singleton-Instanz zurück (None, wenn LLM_CASSETTE_MODE nicht gesetzt ist)."""
+    global _cassette
+    mode = os.getenv("LLM_CASSETTE_MODE", "").lower()
+    if _cassette is None and mode in ("record", "replay"):
+        latency = os.getenv("LLM_CASSETTE_LATENCY", "0")
+        _cassette = Cassette(
+            path=os.getenv("LLM_CASSETTE_PATH", "llm_cassette.jsonl"),
+            mode=mode,
+            latency=latency if latency == "recorded" else float(latency)
+        )
+    return _cassette
@@ -0,0 +1,543 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from collections import Counter
+from types import SimpleNamespace
+import openai
+from openai import OpenAI, AsyncOpenAI
+from llm_cache import get_llm_cache
+from hedging import Hedger, get_hedger
+from llm_cassette import Cassette, get_cassette
+from model_router import estimate_cost, response_confidence
+from prompt_registry import get_prompt
+from rate_limiter import RateLimiter, get_rate_limiter
+from semantic_cache import get_semantic_cache
+from structured_output import JSON_MODE, Schema, parse_json
+from token_counter import count_message_tokens, count_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Rollen der LangChain-Nachrichten im OpenAI-Format
+MESSAGE_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+# Maximale Eingabelänge der Embedding-Modelle in Tokens
+EMBEDDING_MAX_TOKENS = 8000
+
+# Fehler, nach denen ein Aufruf wiederholt wird
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError
+)
+
+def to_openai_messages(messages: List[Any]) -> List[Dict[str, str]]:
+    """Wandelt LangChain-Nachrichten oder Dicts in das OpenAI-Nachrichtenformat um"""
+    converted = []
+    for message in messages:
+        if isinstance(message, dict):
+            converted.append(message)
+        else:
+            converted.append({"role": MESSAGE_ROLES.get(message.type, "user"), "content": message.content})
+    return converted
+
+def estimate_tokens(messages: List[Dict[str, str]], model: str, completion_tokens: int = 500) -> int:
+    """Tokens eines Aufrufs für den Limiter: gezählte Eingabe plus erwartete Antwort"""
+    return count_message_tokens(messages, model) + completion_tokens
+
+def streamed_response(content: str, usage: Any) -> Any:
+    """Antwortobjekt eines gestreamten Aufrufs mit denselben Attributen wie eine ChatCompletion"""
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message, logprobs=None)], usage=usage)
+
+def retry_after(error: Exception, attempt: int) -> float:
+    """Wartezeit nach einem Fehler: Retry-After des Servers, sonst exponentielles Backoff mit Jitter"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    if headers.get("retry-after-ms"):
+        return float(headers["retry-after-ms"]) / 1000
+    if headers.get("retry-after"):
+        try:
+            return float(headers["retry-after"])
+        except ValueError:
+            pass
+    return min(60.0, 2 ** attempt) * (0.5 + random.random() / 2)
+
+class LLMClient:
+    """Gemeinsame Schicht für alle OpenAI-Aufrufe: sync und async, mit geteiltem Limiter, Cache und Retries"""
+
+    def __init__(self, api_key: Optional[str] = None, limiter: Optional[RateLimiter] = None,
+                 max_concurrency: int = 8, max_retries: int = 5, cassette: Optional[Cassette] = None,
+                 base_url: Optional[str] = None, timeout: Optional[float] = None,
+                 hedger: Optional[Hedger] = None):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        # Andere OpenAI-kompatible Endpunkte, z.B. der Mock-Server für Lasttests
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL") or None
+        # Obergrenze pro Versuch; ein hängender Aufruf wird als APITimeoutError wiederholt
+        self.timeout = timeout or float(os.getenv("LLM_TIMEOUT", "60"))
+        # Zweiter Versuch für langsame, nicht gestreamte Aufrufe der freigegebenen Stufen
+        self.hedger = hedger or get_hedger()
+        # Aufnahme/Wiedergabe unter allen API-Aufrufen; im Replay-Modus entsteht kein echter Client
+        self.cassette = cassette or get_cassette()
+        self.client = self._wrap(self._openai)
+        self.limiter = limiter or get_rate_limiter()
+        self.cache = get_llm_cache()
+        self.semantic_cache = get_semantic_cache()
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        # httpx bindet den Async-Client an seine Event-Loop, daher ein Client pro Loop
+        self._async_clients = weakref.WeakKeyDictionary()
+        # Token-Verbrauch pro Namespace
+        self._usage_lock = threading.Lock()
+        self.calls = Counter()
+        self.prompt_tokens = Counter()
+        self.completion_tokens = Counter()
+        self.cost = Counter()
+        self.latencies = {}
+        self.models = {}
+        self.escalated = Counter()
+        # Strukturierte Antworten: lokal reparierte, nachgefragte und unvollständige
+        self.structured = Counter()
+
+    def _openai(self) -> OpenAI:
+        # Retries übernimmt diese Schicht, damit Retry-After beim gemeinsamen Limiter ankommt
+        return OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0, timeout=self.timeout)
+
+    def _async_openai(self) -> AsyncOpenAI:
+        return AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0, timeout=self.timeout)
+
+    def _wrap(self, factory: Callable[[], Any], asynchronous: bool = False) -> Any:
+        if self.cassette is None:
+            return factory()
+        return self.cassette.wrap_async(factory) if asynchronous else self.cassette.wrap(factory)
+
+    def _async_client(self) -> AsyncOpenAI:
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_clients:
+            self._async_clients[loop] = self._wrap(self._async_openai, asynchronous=True)
+        return self._async_clients[loop]
+
+    def _cache_key(self, model: str, temperature: float, version: str, cache_inputs: Any) -> Optional[str]:
+        if cache_inputs is None:
+            return None
+        return self.cache.make_key(model, temperature, version, cache_inputs)
+
+    def _store(self, key: Optional[str], content: str, namespace: str, cache_inputs: Any,
+               validate: Optional[Callable[[str], bool]]):
+        if key is not None and (validate is None or validate(content)):
+            self.cache.set(key, content, namespace, cache_inputs)
+
+    def complete(self, messages: List[Any], model: str, temperature: float,
+                 namespace: str = "", version: str = "", cache_inputs: Any = None,
+                 validate: Optional[Callable[[str], bool]] = None, **params) -> str:
+        """Führt eine Chat-Completion blockierend aus.
+
+        Mit cache_inputs wird die Antwort im gemeinsamen LLM-Cache unter Modell,
+        Temperatur, Prompt-Version und Eingaben abgelegt. Mit escalate_to wird eine
+        Antwort unter min_confidence auf diesem Modell wiederholt. Mit semantic_input
+        wird bei einem Fehlschlag des exakten Caches der semantische Cache befragt.
+        Mit on_partial wird die Antwort gestreamt; der Callback erhält nach jedem
+        Token den bisher empfangenen Text (bei einem Cache-Treffer einmal den ganzen).
+        """
+        escalate_to = params.pop("escalate_to", None)
+        min_confidence = params.pop("min_confidence", 0.0)
+        semantic_input = params.pop("semantic_input", None)
+        on_partial = params.pop("on_partial", None)
+        key = self._cache_key(model, temperature, version, cache_inputs)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return self._emit(cached, on_partial)
+
+        semantic = None
+        if semantic_input is not None and self.semantic_cache is not None:
+            semantic = self._semantic_entry(namespace, model, version, semantic_input, self._embed_safely(semantic_input))
+            if semantic is not None and semantic[2] is not None and (validate is None or validate(semantic[2])):
+                return self._emit(semantic[2], on_partial)
+
+        messages = to_openai_messages(messages)
+        tokens = estimate_tokens(messages, model, params.get("max_tokens", 500))
+        create_params = {**params, "logprobs": True} if escalate_to else params
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(tokens)
+            try:
+                started = time.monotonic()
+                if on_partial is None:
+                    create = lambda: self.client.chat.completions.create(
+                        model=model, temperature=temperature, messages=messages, **create_params
+                    )
+                    response = self.hedger.call(namespace or "llm", create, self._hedge(create, tokens))
+                else:
+                    response = self._read_stream(self.client.chat.completions.create(
+                        model=model, temperature=temperature, messages=messages, stream=True,
+                        stream_options={"include_usage": True}, **create_params
+                    ), on_partial)
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._handle_retry(e, attempt, namespace))
+
+        self._record_usage(namespace, model, messages, tokens, response, time.monotonic() - started)
+        content = response.choices[0].message.content
+        if self._should_escalate(response, model, escalate_to, min_confidence, namespace):
+            # Die Antwort des großen Modells gehört unter dessen eigenen Cache-Schlüssel
+            return self.complete(messages, escalate_to, temperature, namespace, version, cache_inputs,
+                                 validate, **params)
+        self._store(key, content, namespace, cache_inputs, validate)
+        if semantic is not None and (validate is None or validate(content)):
+            self.semantic_cache.add(semantic[0], semantic_input, semantic[1], content)
+        return content
+
+    async def acomplete(self, messages: List[Any], model: str, temperature: float,
+                        namespace: str = "", version: str = "", cache_inputs: Any = None,
+                        validate: Optional[Callable[[str], bool]] = None, **params) -> str:
+        """Asynchrone Variante von complete für viele gleichzeitige Aufrufe"""
+        escalate_to = params.pop("escalate_to", None)
+        min_confidence = params.pop("min_confidence", 0.0)
+        semantic_input = params.pop("semantic_input", None)
+        on_partial = params.pop("on_partial", None)
+        key = self._cache_key(model, temperature, version, cache_inputs)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return self._emit(cached, on_partial)
+
+        semantic = None
+        if semantic_input is not None and self.semantic_cache is not None:
+            semantic = self._semantic_entry(namespace, model, version, semantic_input, await self._aembed_safely(semantic_input))
+            if semantic is not None and semantic[2] is not None and (validate is None or validate(semantic[2])):
+                return self._emit(semantic[2], on_partial)
+
+        messages = to_openai_messages(messages)
+        tokens = estimate_tokens(messages, model, params.get("max_tokens", 500))
+        create_params = {**params, "logprobs": True} if escalate_to else params
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.aacquire(tokens)
+            try:
+                started = time.monotonic()
+                if on_partial is None:
+                    create = lambda: self._async_client().chat.completions.create(
+                        model=model, temperature=temperature, messages=messages, **create_params
+                    )
+                    response = await self.hedger.acall(namespace or "llm", create, self._ahedge(create, tokens))
+                else:
+                    response = await self._aread_stream(await self._async_client().chat.completions.create(
+                        model=model, temperature=temperature, messages=messages, stream=True,
+                        stream_options={"include_usage": True}, **create_params
+                    ), on_partial)
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self._handle_retry(e, attempt, namespace))
+
+        self._record_usage(namespace, model, messages, tokens, response, time.monotonic() - started)
+        content = response.choices[0].message.content
+        if self._should_escalate(response, model, escalate_to, min_confidence, namespace):
+            # Die Antwort des großen Modells gehört unter dessen eigenen Cache-Schlüssel
+            return await self.acomplete(messages, escalate_to, temperature, namespace, version, cache_inputs,
+                                        validate, **params)
+        self._store(key, content, namespace, cache_inputs, validate)
+        if semantic is not None and (validate is None or validate(content)):
+            self.semantic_cache.add(semantic[0], semantic_input, semantic[1], content)
+        return content
+
+    def _hedge(self, create: Callable[[], Any], tokens: int) -> Callable[[], Any]:
+        """Zweiter Versuch eines Aufrufs; er belastet das Token-Budget wie der erste"""
+        def backup():
+            self.limiter.acquire(tokens)
+            return create()
+        return backup
+
+    def _ahedge(self, create: Callable[[], Awaitable], tokens: int) -> Callable[[], Awaitable]:
+        async def backup():
+            await self.limiter.aacquire(tokens)
+            return await create()
+        return backup
+
+    @staticmethod
+    def _emit(content: str, on_partial: Optional[Callable[[str], None]]) -> str:
+        if on_partial is not None:
+            on_partial(content)
+        return content
+
+    @staticmethod
+    def _read_stream(stream: Any, on_partial: Callable[[str], None]) -> Any:
+        """Liest einen Stream und meldet nach jedem Token den bisherigen Text"""
+        content, usage = "", None
+        for chunk in stream:
+            usage = chunk.usage or usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                content += chunk.choices[0].delta.content
+                on_partial(content)
+        return streamed_response(content, usage)
+
+    @staticmethod
+    async def _aread_stream(stream: Any, on_partial: Callable[[str], None]) -> Any:
+        """Asynchrone Variante von _read_stream"""
+        content, usage = "", None
+        async for chunk in stream:
+            usage = chunk.usage or usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                content += chunk.choices[0].delta.content
+                on_partial(content)
+        return streamed_response(content, usage)
+
+    def _semantic_entry(self, namespace: str, model: str, version: str, text: str,
+                        embedding: Optional[List[float]]) -> Optional[tuple]:
+        """Gibt (Partition, Embedding, Treffer oder None) zurück, None ohne Embedding"""
+        if embedding is None:
+            return None
+        partition = self.semantic_cache.partition(namespace, model, version)
+        return partition, embedding, self.semantic_cache.lookup(namespace, partition, embedding)
+
+    def _embed_safely(self, text: str) -> Optional[List[float]]:
+        """Ein fehlgeschlagenes Embedding soll den eigentlichen Aufruf nicht verhindern"""
+        try:
+            return self.embed([text], self.semantic_cache.embedding_model)[0]
+        except Exception as e:
+            logger.warning(f"Embedding für den semantischen Cache fehlgeschlagen: {str(e)}")
+            return None
+
+    async def _aembed_safely(self, text: str) -> Optional[List[float]]:
+        try:
+            return (await self.aembed([text], self.semantic_cache.embedding_model))[0]
+        except Exception as e:
+            logger.warning(f"Embedding für den semantischen Cache fehlgeschlagen: {str(e)}")
+            return None
+
+    def _embedding_inputs(self, texts: List[str], model: str) -> tuple:
+        texts = [truncate_tokens(" ".join(text.split()), EMBEDDING_MAX_TOKENS, model) or " " for text in texts]
+        return texts, sum(count_tokens(text, model) for text in texts)
+
+    def embed(self, texts: List[str], model: str = "text-embedding-3-small") -> List[List[float]]:
+        """Embeddings mehrerer Texte in einem Aufruf, unter dem gemeinsamen Limiter"""
+        texts, tokens = self._embedding_inputs(texts, model)
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(tokens)
+            try:
+                started = time.monotonic()
+                create = lambda: self.client.embeddings.create(model=model, input=texts)
+                response = self.hedger.call("embeddings", create, self._hedge(create, tokens))
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._handle_retry(e, attempt, "embeddings"))
+        self._record_usage("embeddings", model, [], tokens, response, time.monotonic() - started)
+        return [item.embedding for item in response.data]
+
+    async def aembed(self, texts: List[str], model: str = "text-embedding-3-small") -> List[List[float]]:
+        """Asynchrone Variante von embed"""
+        texts, tokens = self._embedding_inputs(texts, model)
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.aacquire(tokens)
+            try:
+                started = time.monotonic()
+                create = lambda: self._async_client().embeddings.create(model=model, input=texts)
+                response = await self.hedger.acall("embeddings", create, self._ahedge(create, tokens))
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self._handle_retry(e, attempt, "embeddings"))
+        self._record_usage("embeddings", model, [], tokens, response, time.monotonic() - started)
+        return [item.embedding for item in response.data]
+
+    def _should_escalate(self, response: Any, model: str, escalate_to: Optional[str],
+                         min_confidence: float, namespace: str) -> bool:
+        """True, wenn die Antwort des kleinen Modells zu unsicher ist und das große Modell übernehmen soll"""
+        if not escalate_to or escalate_to == model:
+            return False
+        confidence = response_confidence(response)
+        if confidence is None or confidence >= min_confidence:
+            return False
+        logger.info(f"LLM-Aufruf {namespace}: Konfidenz {confidence:.2f} unter {min_confidence}, wiederhole mit {escalate_to}")
+        with self._usage_lock:
+            self.escalated[namespace] += 1
+        return True
+
+    def _check_json(self, schema: Schema, content: str, namespace: str,
+                    names: Optional[List[str]] = None) -> tuple:
+        """Parst und prüft eine Antwort; gibt (gültige Felder, fehlende Felder) zurück"""
+        data, failed = schema.check(parse_json(content), names)
+        if not failed and not schema.is_complete(content, names):
+            with self._usage_lock:
+                self.structured["repaired_locally"] += 1
+        if failed:
+            logger.info(f"Antwort {namespace}: Felder {', '.join(failed)} fehlen oder sind ungültig")
+        return data, failed
+
+    def _repair_request(self, schema: Schema, messages: List[Any], content: str, failed: List[str],
+                        model: str, temperature: float, namespace: str, params: Dict) -> Dict[str, Any]:
+        """Fragt nur die fehlenden Felder nach; die bisherige Antwort bleibt als Kontext erhalten"""
+        repair = get_prompt("field_repair")
+        inputs = {"fields": ", ".join(failed), "schema": schema.describe(failed)}
+        return {
+            "messages": to_openai_messages(messages) + [{"role": "assistant", "content": content}] + repair.render(**inputs),
+            "model": model,
+            "temperature": temperature,
+            "namespace": f"{namespace}_repair",
+            **{name: value for name, value in params.items() if name != "on_partial"}
+        }
+
+    def _finish_json(self, schema: Schema, content: str, data: Dict[str, Any], failed: List[str],
+                     key: Optional[str], namespace: str, cache_inputs: Any) -> Dict[str, Any]:
+        """Legt die reparierte Antwort im Cache ab; auch eine unvollständige, damit ein
+        späterer Aufruf nur noch die fehlenden Felder nachfragt"""
+        if failed:
+            with self._usage_lock:
+                self.structured["incomplete"] += 1
+            logger.warning(f"Antwort {namespace} bleibt unvollständig: {', '.join(failed)}")
+        if key is not None and data and not schema.is_complete(content):
+            self.cache.set(key, json.dumps(data, ensure_ascii=False), namespace, cache_inputs)
+        return data
+
+    def complete_json(self, schema: Schema, messages: List[Any], model: str, temperature: float,
+                      namespace: str = "", version: str = "", cache_inputs: Any = None,
+                      max_repairs: int = 1, **params) -> Dict[str, Any]:
+        """Chat-Completion im JSON-Modus, geprüft gegen ein Schema.
+
+        Fast gültiges JSON wird lokal repariert. Fehlen danach noch Felder, werden
+        nur diese nachgefragt und mit der ersten Antwort zusammengeführt; eine
+        bezahlte Antwort wird nie verworfen. Zurück kommen die gültigen Felder.
+        """
+        params.setdefault("response_format", JSON_MODE)
+        key = self._cache_key(model, temperature, version, cache_inputs)
+        content = self.complete(messages, model, temperature, namespace, version, cache_inputs,
+                                validate=schema.is_complete, **params)
+        data, failed = self._check_json(schema, content, namespace)
+
+        for _ in range(max_repairs):
+            if not failed:
+                break
+            with self._usage_lock:
+                self.structured["field_requests"] += 1
+            repair = self.complete(**self._repair_request(schema, messages, content, failed, model, temperature, namespace, params))
+            repaired, failed = self._check_json(schema, repair, namespace, failed)
+            data.update(repaired)
+
+        return self._finish_json(schema, content, data, failed, key, namespace, cache_inputs)
+
+    async def acomplete_json(self, schema: Schema, messages: List[Any], model: str, temperature: float,
+                             namespace: str = "", version: str = "", cache_inputs: Any = None,
+                             max_repairs: int = 1, **params) -> Dict[str, Any]:
+        """Asynchrone Variante von complete_json"""
+        params.setdefault("response_format", JSON_MODE)
+        key = self._cache_key(model, temperature, version, cache_inputs)
+        content = await self.acomplete(messages, model, temperature, namespace, version, cache_inputs,
+                                       validate=schema.is_complete, **params)
+        data, failed = self._check_json(schema, content, namespace)
+
+        for _ in range(max_repairs):
+            if not failed:
+                break
+            with self._usage_lock:
+                self.structured["field_requests"] += 1
+            repair = await self.acomplete(**self._repair_request(schema, messages, content, failed, model, temperature, namespace, params))
+            repaired, failed = self._check_json(schema, repair, namespace, failed)
+            data.update(repaired)
+
+        return self._finish_json(schema, content, data, failed, key, namespace, cache_inputs)
+
+    def _record_usage(self, namespace: str, model: str, messages: List[Dict[str, str]],
+                      reserved: int, response: Any, latency: float):
+        """Meldet den tatsächlichen Verbrauch an den Limiter und erfasst Tokens, Kosten und Latenz pro Stufe"""
+        usage = getattr(response, "usage", None)
+        self.limiter.record_usage(reserved, getattr(usage, "total_tokens", None))
+        prompt_tokens = getattr(usage, "prompt_tokens", None) or count_message_tokens(messages, model)
+        completion_tokens = getattr(usage, "completion_tokens", None) or 0
+        with self._usage_lock:
+            self.calls[namespace] += 1
+            self.prompt_tokens[namespace] += prompt_tokens
+            self.completion_tokens[namespace] += completion_tokens
+            self.cost[namespace] += estimate_cost(model, prompt_tokens, completion_tokens)
+            self.latencies.setdefault(namespace, []).append(latency)
+            self.models.setdefault(namespace, Counter())[model] += 1
+        logger.info(f"LLM-Aufruf {namespace or model} ({model}): {prompt_tokens} Eingabe-Tokens, "
+                    f"{completion_tokens} Ausgabe-Tokens, {latency:.2f}s")
+
+    def usage_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Aufrufe, Tokens, Kosten und Latenz pro Stufe (Namespace), zum Abstimmen des Routings"""
+        with self._usage_lock:
+            stats = {}
+            for namespace, calls in self.calls.items():
+                latencies = sorted(self.latencies[namespace])
+                stats[namespace] = {
+                    "calls": calls,
+                    "models": dict(self.models[namespace]),
+                    "prompt_tokens": self.prompt_tokens[namespace],
+                    "completion_tokens": self.completion_tokens[namespace],
+                    "avg_prompt_tokens": round(self.prompt_tokens[namespace] / calls, 1),
+                    "cost_usd": round(self.cost[namespace], 6),
+                    "latency_p50_s": round(latencies[len(latencies) // 2], 3),
+                    "latency_p95_s": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+                    "escalated": self.escalated[namespace]
+                }
+            return stats
+
+    def structured_stats(self) -> Dict[str, int]:
+        """Lokal reparierte Antworten, Nachfragen fehlender Felder und unvollständige Ergebnisse"""
+        with self._usage_lock:
+            return dict(self.structured)
+
+    def _handle_retry(self, error: Exception, attempt: int, namespace: str) -> float:
+        """Gibt die lokale Wartezeit vor dem nächsten Versuch zurück"""
+        logger.warning(f"LLM-Aufruf {namespace} fehlgeschlagen (Versuch {attempt + 1}): {type(error).__name__}")
+        if isinstance(error, openai.RateLimitError):
+            # Ein 429 bremst alle Aufrufer über den gemeinsamen Limiter, der auch diesen Aufruf wartet
+            self.limiter.penalize(retry_after(error, attempt))
+            return 0.0
+        return retry_after(error, attempt)
+
+    async def gather(self, coroutines: List[Awaitable], return_exceptions: bool = False) -> List[Any]:
+        """Führt Coroutinen gleichzeitig aus, höchstens max_concurrency auf einmal"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def bounded(coroutine):
+            async with semaphore:
+                return await coroutine
+
+        return await asyncio.gather(*(bounded(c) for c in coroutines), return_exceptions=return_exceptions)
+
+    async def as_completed(self, coroutines: List[Awaitable]) -> AsyncIterator[Any]:
+        """Wie gather, liefert die Ergebnisse aber in der Reihenfolge ihrer Fertigstellung"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def bounded(coroutine):
+            async with semaphore:
+                return await coroutine
+
+        tasks = [asyncio.ensure_future(bounded(c)) for c in coroutines]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Bricht der Aufrufer ab, laufen keine verwaisten Aufgaben weiter
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def run(coroutine: Awaitable) -> Any:
+        """Führt eine Coroutine aus synchronem Code heraus aus"""
+        return asyncio.run(coroutine)
+
+# Prozessweite Instanz, die sich alle Agenten teilen
+_client = None
+
+def get_llm_client() -> LLMClient:
+    """Gibt die Singleton-Instanz des LLM-Clients zurück."""
+    global _client
+    if _client is None:
+        _client = LLMClient(
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "5"))
+        )
+    return _client
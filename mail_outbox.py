@@ -0,0 +1,124 @@
+from typing import Dict, List, Optional, Tuple
+import email
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from email.message import Message
+
+logger = logging.getLogger(__name__)
+
+def message_id(key: str, sender: Optional[str]) -> str:
+    """Feste Message-ID pro Schlüssel, damit Mailprogramme eine doppelt zugestellte E-Mail erkennen"""
+    domain = (sender or "").rpartition("@")[2] or "localhost"
+    return f"<{hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]}@{domain}>"
+
+class MailOutbox:
+    """Dauerhafte Ausgangsbox: eine Zeile pro E-Mail, eindeutig über ihren Schlüssel (Lead und E-Mail-Typ).
+
+    Zustände: pending → sending → sent. Ein fehlgeschlagener Versand geht zurück
+    auf pending, nach max_attempts Versuchen auf failed. Jeder Übergang wird
+    sofort geschrieben; nach einem Absturz bleiben nur E-Mails in sending, deren
+    Versand unterbrochen wurde. recover() setzt sie wieder auf pending; eine
+    davon kann beim Empfänger doppelt ankommen, trägt dann aber dieselbe
+    Message-ID.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 5):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS mail_outbox (
+                key TEXT PRIMARY KEY,
+                recipient TEXT NOT NULL,
+                message TEXT NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_mail_outbox_state ON mail_outbox (state)")
+        self._conn.commit()
+
+    def add(self, key: str, msg: Message) -> str:
+        """Legt die E-Mail als pending an, falls der Schlüssel neu ist, und gibt ihren Zustand zurück"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO mail_outbox (key, recipient, message, state, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'pending', ?, ?)",
+                (key, msg['To'] or "", msg.as_string(), now, now)
+            )
+            self._conn.commit()
+            return self._conn.execute("SELECT state FROM mail_outbox WHERE key = ?", (key,)).fetchone()[0]
+
+    def _transition(self, key: str, source: str, target: str, error: Optional[str] = None,
+                    attempt: bool = False) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE mail_outbox SET state = ?, last_error = COALESCE(?, last_error), "
+                "attempts = attempts + ?, updated_at = ? WHERE key = ? AND state = ?",
+                (target, error, 1 if attempt else 0, time.time(), key, source)
+            )
+            self._conn.commit()
+            return cursor.rowcount == 1
+
+    def claim(self, key: str) -> bool:
+        """pending → sending; False, wenn die E-Mail schon verschickt wird oder wurde"""
+        return self._transition(key, "pending", "sending", attempt=True)
+
+    def mark_sent(self, key: str):
+        self._transition(key, "sending", "sent")
+
+    def mark_failed(self, key: str, error: str):
+        """sending → pending, nach max_attempts Versuchen → failed"""
+        with self._lock:
+            row = self._conn.execute("SELECT attempts FROM mail_outbox WHERE key = ?", (key,)).fetchone()
+        target = "failed" if row is not None and row[0] >= self.max_attempts else "pending"
+        self._transition(key, "sending", target, error=error)
+
+    def recover(self) -> int:
+        """Setzt beim Start E-Mails zurück, deren Versand ein Absturz unterbrochen hat"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE mail_outbox SET state = 'pending', updated_at = ? WHERE state = 'sending'", (time.time(),)
+            )
+            self._conn.commit()
+        if cursor.rowcount:
+            logger.warning(f"{cursor.rowcount} E-Mails mit unterbrochenem Versand werden erneut gesendet")
+        return cursor.rowcount
+
+    def pending(self) -> List[Tuple[str, Message]]:
+        """Noch nicht verschickte E-Mails als (Schlüssel, Nachricht), älteste zuerst"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, message FROM mail_outbox WHERE state = 'pending' ORDER BY created_at"
+            ).fetchall()
+        return [(key, email.message_from_string(message)) for key, message in rows]
+
+    def state(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM mail_outbox WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def stats(self) -> Dict[str, int]:
+        """Anzahl E-Mails pro Zustand"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT state, COUNT(*) FROM mail_outbox GROUP BY state").fetchall())
+
+# Prozessweite Instanz; None mit leerem MAIL_OUTBOX_PATH
+_outbox = None
+
+def get_mail_outbox() -> Optional[MailOutbox]:
+    """Gibt die Singleton-Instanz der Ausgangsbox zurück (None, wenn MAIL_OUTBOX_PATH leer ist)."""
+    global _outbox
+    path = os.getenv("MAIL_OUTBOX_PATH", "mail_outbox.sqlite3")
+    if _outbox is None and path:
+        _outbox = MailOutbox(path, max_attempts=int(os.getenv("MAIL_MAX_ATTEMPTS", "5")))
+    return _outbox
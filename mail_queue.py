@@ -0,0 +1,315 @@
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import atexit
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from email.message import Message
+from mail_outbox import MailOutbox, get_mail_outbox, message_id
+from smtp_pool import SMTPPool, get_smtp_pool
+
+logger = logging.getLogger(__name__)
+
+MINUTE = 60.0
+DAY = 24 * 60 * 60.0
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))], 3)
+
+class SendBudget:
+    """Versandlimits eines Kontos: pro Minute, pro Tag (gleitend über 24 Stunden) und gleichmäßiger Abstand.
+
+    Statt das Minutenlimit in einem Stoß auszuschöpfen, liegen zwischen zwei
+    E-Mails 60/per_minute Sekunden, um jitter (Anteil) zufällig gestreckt oder
+    gestaucht, damit der Versand nicht maschinell gleichmäßig aussieht.
+    """
+
+    def __init__(self, per_minute: int, per_day: int, jitter: float = 0.3):
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.jitter = jitter
+        self._minute = deque()
+        self._day = deque()
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Reserviert einen Versand und gibt 0 zurück, sonst die Wartezeit in Sekunden"""
+        with self._lock:
+            now = time.monotonic()
+            while self._minute and now - self._minute[0] >= MINUTE:
+                self._minute.popleft()
+            while self._day and now - self._day[0] >= DAY:
+                self._day.popleft()
+
+            if now < self._next:
+                return self._next - now
+            if self.per_minute and len(self._minute) >= self.per_minute:
+                return self._minute[0] + MINUTE - now
+            if self.per_day and len(self._day) >= self.per_day:
+                return self._day[0] + DAY - now
+
+            self._minute.append(now)
+            self._day.append(now)
+            if self.per_minute:
+                self._next = now + MINUTE / self.per_minute * random.uniform(1 - self.jitter, 1 + self.jitter)
+            return 0.0
+
+    def sent_today(self) -> int:
+        with self._lock:
+            return len(self._day)
+
+class MailQueue:
+    """Ausgehende E-Mails, die asynchrone Sender im Hintergrund unter den Provider-Limits verschicken.
+
+    Die Pipeline reiht E-Mails mit enqueue ein und arbeitet sofort weiter. Die
+    Sender laufen in einer eigenen Event-Loop in einem Hintergrund-Thread, damit
+    die Warteschlange mehrere Läufe (und deren Event-Loops) überdauert; der
+    blockierende SMTP-Versand läuft über den gemeinsamen SMTP-Pool. Eine E-Mail
+    mit einem key, der noch in der Warteschlange ist, wird nicht erneut
+    eingereiht. Die Limits gelten pro Absenderkonto.
+
+    Mit outbox wird jede E-Mail mit key vor dem Einreihen dauerhaft abgelegt
+    und höchstens einmal verschickt; resume() reiht nach einem Neustart die
+    noch nicht verschickten wieder ein.
+    """
+
+    def __init__(self, pool: SMTPPool, senders: int = 2, per_minute: int = 20, per_day: int = 500,
+                 jitter: float = 0.3, drain_timeout: float = 60.0, outbox: Optional[MailOutbox] = None):
+        self.pool = pool
+        self.outbox = outbox
+        self._recovered = False
+        self.senders = senders
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.jitter = jitter
+        self.drain_timeout = drain_timeout
+        self._budgets = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._queue = None
+        self._thread = None
+        self._senders = []
+        self.counts = Counter()
+        # Sekunden für den SMTP-Versand und vom Einreihen bis zum Versand
+        self._send_latencies = deque(maxlen=1000)
+        self._queue_latencies = deque(maxlen=1000)
+
+    def _start(self):
+        """Startet Event-Loop und Sender beim ersten enqueue"""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._queue = asyncio.Queue()
+            self._senders = [self._loop.create_task(self._sender()) for _ in range(self.senders)]
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="mail-queue", daemon=True)
+        self._thread.start()
+        ready.wait()
+        # Eingereihte E-Mails beim Beenden noch verschicken, höchstens drain_timeout lang
+        atexit.register(self.close)
+
+    def _budget(self, account: str) -> SendBudget:
+        with self._lock:
+            if account not in self._budgets:
+                self._budgets[account] = SendBudget(self.per_minute, self.per_day, self.jitter)
+            return self._budgets[account]
+
+    def enqueue(self, msg: Message, key: Optional[str] = None,
+                on_sent: Optional[Callable[[], Any]] = None,
+                on_failed: Optional[Callable[[Exception], Any]] = None) -> bool:
+        """Reiht eine E-Mail ein; False, wenn dieselbe (key) bereits wartet oder verschickt ist.
+
+        on_sent bzw. on_failed laufen nach dem Versuch im Hintergrund-Thread.
+        Hat die Ausgangsbox die E-Mail schon verschickt, läuft on_sent sofort.
+        """
+        if self.outbox is not None and key is not None:
+            if msg['Message-ID'] is None:
+                msg['Message-ID'] = message_id(key, msg['From'])
+            state = self.outbox.add(key, msg)
+            if state != "pending" and state != "sending":
+                with self._lock:
+                    self.counts["already_" + state] += 1
+                if state == "sent" and on_sent is not None:
+                    on_sent()
+                return False
+        return self._put(msg, key, on_sent, on_failed)
+
+    def _put(self, msg: Message, key: Optional[str], on_sent: Optional[Callable[[], Any]],
+             on_failed: Optional[Callable[[Exception], Any]]) -> bool:
+        with self._lock:
+            if key is not None and key in self._pending:
+                self.counts["duplicates"] += 1
+                return False
+            if key is not None:
+                self._pending.add(key)
+            if self._thread is None:
+                self._start()
+            self.counts["enqueued"] += 1
+        item = (msg, key, on_sent, on_failed, time.monotonic())
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+        return True
+
+    async def _sender(self):
+        while True:
+            msg, key, on_sent, on_failed, queued_at = await self._queue.get()
+            try:
+                budget = self._budget(msg['From'] or "")
+                while (wait := budget.reserve()) > 0:
+                    await asyncio.sleep(wait)
+                # Erst unmittelbar vor dem Versand auf sending, damit ein Absturz wenig offen lässt
+                if self.outbox is not None and key is not None and not self.outbox.claim(key):
+                    with self._lock:
+                        self.counts["skipped"] += 1
+                    continue
+                started = time.monotonic()
+                try:
+                    await self._blocking(self.pool.send, msg)
+                except Exception as e:
+                    if self.outbox is not None and key is not None:
+                        self.outbox.mark_failed(key, str(e))
+                    with self._lock:
+                        self.counts["failed"] += 1
+                    logger.error(f"Fehler beim Senden der E-Mail an {msg['To']}: {str(e)}")
+                    await self._callback(on_failed, e)
+                else:
+                    if self.outbox is not None and key is not None:
+                        self.outbox.mark_sent(key)
+                    finished = time.monotonic()
+                    with self._lock:
+                        self.counts["sent"] += 1
+                        self._send_latencies.append(finished - started)
+                        self._queue_latencies.append(finished - queued_at)
+                    logger.info(f"E-Mail erfolgreich gesendet an {msg['To']}")
+                    await self._callback(on_sent)
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                self._queue.task_done()
+
+    async def _blocking(self, fn: Callable, *args) -> Any:
+        """Führt fn in einem eigenen Thread aus.
+
+        Nicht über asyncio.to_thread: dessen Executor nimmt beim Beenden des
+        Interpreters keine Aufgaben mehr an, close soll aber noch versenden.
+        """
+        future = self._loop.create_future()
+
+        def run():
+            try:
+                result = fn(*args)
+            except Exception as e:
+                self._loop.call_soon_threadsafe(future.set_exception, e)
+            else:
+                self._loop.call_soon_threadsafe(future.set_result, result)
+
+        threading.Thread(target=run, daemon=True).start()
+        return await future
+
+    async def _callback(self, callback: Optional[Callable], *args):
+        if callback is None:
+            return
+        try:
+            await self._blocking(callback, *args)
+        except Exception as e:
+            logger.error(f"Fehler im Versand-Callback: {str(e)}")
+
+    def depth(self) -> int:
+        """Eingereihte, noch nicht abgeschlossene E-Mails"""
+        with self._lock:
+            return self.counts["enqueued"] - self.counts["sent"] - self.counts["failed"] - self.counts["skipped"]
+
+    def resume(self) -> int:
+        """Reiht die noch nicht verschickten E-Mails der Ausgangsbox ein, z.B. nach einem Neustart.
+
+        Beim ersten Aufruf werden auch unterbrochene Versuche (sending) zurückgesetzt.
+        Callbacks gehen über einen Neustart verloren; wer erneut einreiht, erhält on_sent sofort.
+        """
+        if self.outbox is None:
+            return 0
+        if not self._recovered:
+            self.outbox.recover()
+            self._recovered = True
+        with self._lock:
+            waiting = set(self._pending)
+        resumed = [self._put(msg, key, None, None) for key, msg in self.outbox.pending() if key not in waiting]
+        if resumed:
+            logger.info(f"{len(resumed)} E-Mails aus der Ausgangsbox wieder eingereiht")
+        return len(resumed)
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wartet, bis alle eingereihten E-Mails verschickt sind; False nach Ablauf von timeout"""
+        if self._thread is None:
+            return True
+        future = asyncio.run_coroutine_threadsafe(self._queue.join(), self._loop)
+        try:
+            future.result(timeout)
+            return True
+        except FutureTimeoutError:
+            future.cancel()
+            return False
+
+    def close(self):
+        """Verschickt die verbliebenen E-Mails (höchstens drain_timeout Sekunden) und stoppt die Sender"""
+        if self._thread is None:
+            return
+        if not self.join(self.drain_timeout):
+            logger.warning(f"{self.depth()} E-Mails beim Beenden nicht verschickt")
+        asyncio.run_coroutine_threadsafe(self._stop_senders(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        if not self._thread.is_alive():
+            self._loop.close()
+        self._thread = None
+
+    async def _stop_senders(self):
+        # Wartende Sender beenden, sonst meldet asyncio beim Aufräumen zerstörte Tasks
+        for task in self._senders:
+            task.cancel()
+        await asyncio.gather(*self._senders, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Warteschlangentiefe, Zähler und Latenzen (SMTP-Versand und Wartezeit in der Schlange)"""
+        depth = self.depth()
+        with self._lock:
+            send, waited = list(self._send_latencies), list(self._queue_latencies)
+            return {
+                **self.counts,
+                "depth": depth,
+                "outbox": self.outbox.stats() if self.outbox is not None else None,
+                "sent_today": {account: budget.sent_today() for account, budget in self._budgets.items()},
+                "send_p50_s": _percentile(send, 0.5),
+                "send_p95_s": _percentile(send, 0.95),
+                "queued_p50_s": _percentile(waited, 0.5),
+                "queued_p95_s": _percentile(waited, 0.95)
+            }
+
+# Prozessweite Warteschlange für Pipeline und Scheduler
+_queue = None
+
+def get_mail_queue() -> MailQueue:
+    """Gibt die Singleton-Instanz der Versandwarteschlange zurück."""
+    global _queue
+    if _queue is None:
+        _queue = MailQueue(
+            pool=get_smtp_pool(),
+            senders=int(os.getenv("MAIL_SENDERS", "2")),
+            per_minute=int(os.getenv("MAIL_PER_MINUTE", "20")),
+            per_day=int(os.getenv("MAIL_PER_DAY", "500")),
+            jitter=float(os.getenv("MAIL_JITTER", "0.3")),
+            drain_timeout=float(os.getenv("MAIL_DRAIN_TIMEOUT", "60")),
+            outbox=get_mail_outbox()
+        )
+    return _queue
@@ -13,8 +13,8 @@ class LeadState(TypedDict):
 
 def create_lead_processing_graph():
     # Initialisiere die Komponenten
-    lead_processor = LeadProcessor()
     sheets_manager = SheetsManager()
+    lead_processor = LeadProcessor(sheets_manager)
     
     # Definiere die Workflow-Funktionen
     def fetch_leads(state: LeadState) -> LeadState:
@@ -34,6 +34,7 @@ def create_lead_processing_graph():
         try:
             processed_lead = lead_processor.process_lead(current_lead)
             sheets_manager.append_lead(processed_lead)
+            lead_processor.deliver(processed_lead)
             
             return {
                 "leads": remaining_leads,
@@ -0,0 +1,104 @@
+from typing import Any, Dict, Optional
+import logging
+import math
+import os
+from prompt_registry import Prompt
+
+logger = logging.getLogger(__name__)
+
+# Modellklasse pro Stufe (Prompt-Name). Zusammenfassen und Klassifizieren laufen
+# auf dem kleinen Modell, nur die finale Nachricht auf dem großen.
+STAGE_TIERS = {
+    "website_analysis": "small",
+    "linkedin_analysis": "small",
+    "communication_style": "small",
+    "communication_analysis": "small",
+    "interest_analysis": "small",
+    "chunk_summary": "small",
+    "personalization": "large",
+    "personalized_email": "large",
+    "fused_style_email": "large",
+    "fused_analysis": "large",
+    "packed_analysis": "large",
+    "message_generation": "large",
+    "packed_message_generation": "large",
+    "lead_analysis": "large"
+}
+
+# Preise in USD pro 1 Mio. Tokens (Eingabe, Ausgabe); unbekannte Modelle werden mit 0 bewertet
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4-turbo-preview": (10.00, 30.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0)
+}
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Kosten eines Aufrufs in USD; datierte Modellnamen (gpt-4o-2024-08-06) zählen wie das Basismodell"""
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        base = max((name for name in MODEL_PRICES if model.startswith(name + "-")), key=len, default=None)
+        prices = MODEL_PRICES.get(base, (0.0, 0.0))
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+def response_confidence(response: Any) -> Optional[float]:
+    """Geometrisches Mittel der Token-Wahrscheinlichkeiten aus den Logprobs, None ohne Logprobs"""
+    logprobs = getattr(response.choices[0], "logprobs", None)
+    tokens = getattr(logprobs, "content", None) or []
+    if not tokens:
+        return None
+    return math.exp(sum(token.logprob for token in tokens) / len(tokens))
+
+class ModelRouter:
+    """Wählt das Modell pro Stufe und optional ein größeres Modell bei unsicherer Antwort.
+
+    Mit min_confidence > 0 fordern Stufen auf dem kleinen Modell Logprobs an;
+    liegt die mittlere Token-Wahrscheinlichkeit darunter, wiederholt der
+    LLM-Client den Aufruf auf dem großen Modell.
+    """
+
+    def __init__(self, small_model: str = "gpt-4o-mini", large_model: str = "gpt-4o",
+                 stages: Optional[Dict[str, str]] = None, min_confidence: float = 0.0):
+        self.models = {"small": small_model, "large": large_model}
+        self.stages = {**STAGE_TIERS, **(stages or {})}
+        self.min_confidence = min_confidence
+
+    def model_for(self, stage: str) -> str:
+        """Modell einer Stufe; Werte in stages sind eine Modellklasse oder ein Modellname"""
+        route = self.stages.get(stage, "large")
+        return self.models.get(route, route)
+
+    def request(self, prompt: Prompt, inputs: Dict[str, Any], temperature: float, **params) -> Dict[str, Any]:
+        """Wie Prompt.request, mit dem Modell der Stufe und ggf. den Parametern für die Eskalation"""
+        model = self.model_for(prompt.name)
+        request = prompt.request(inputs, model, temperature, **params)
+        if self.min_confidence > 0 and model != self.models["large"]:
+            request.update(escalate_to=self.models["large"], min_confidence=self.min_confidence)
+        return request
+
+def parse_stages(value: str) -> Dict[str, str]:
+    """Liest Überschreibungen im Format "stufe=small,stufe=gpt-4o" """
+    stages = {}
+    for entry in value.split(","):
+        if "=" in entry:
+            stage, route = entry.split("=", 1)
+            stages[stage.strip()] = route.strip()
+    return stages
+
+# Prozessweite Instanz, die sich alle Agenten teilen
+_router = None
+
+def get_model_router() -> ModelRouter:
+    """Gibt die Singleton-Instanz des Model-Routers zurück."""
+    global _router
+    if _router is None:
+        _router = ModelRouter(
+            small_model=os.getenv("LLM_SMALL_MODEL", "gpt-4o-mini"),
+            large_model=os.getenv("LLM_LARGE_MODEL", "gpt-4o"),
+            stages=parse_stages(os.getenv("LLM_STAGE_MODELS", "")),
+            min_confidence=float(os.getenv("LLM_ESCALATION_CONFIDENCE", "0"))
+        )
+    return _router
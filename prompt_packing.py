@@ -0,0 +1,112 @@
+from typing import Any, Callable, Dict, List, Tuple
+import json
+import logging
+from structured_output import parse_json
+
+logger = logging.getLogger(__name__)
+
+# Anweisung, die einem gepackten Prompt angehängt wird; {item_format} beschreibt das Ergebnis je Lead
+PACKED_INSTRUCTIONS = """
+Du erhältst mehrere Leads als JSON-Objekt, Schlüssel ist jeweils die Lead-ID.
+Bearbeite jeden Lead unabhängig von den anderen.
+Antworte ausschließlich mit einem JSON-Objekt, das für jede Lead-ID genau einen Eintrag enthält.
+Jeder Eintrag hat folgendes Format:
+{item_format}
+"""
+
+def packed_instructions(item_format: str) -> str:
+    """Anweisung für die id-basierte Ausgabe mehrerer Leads in einer Antwort"""
+    return PACKED_INSTRUCTIONS.format(item_format=item_format.strip())
+
+def pack_items(items: Dict[str, Any]) -> str:
+    """Serialisiert die Eingaben mehrerer Leads kompakt, Schlüssel ist die Lead-ID"""
+    return json.dumps(items, ensure_ascii=False, separators=(",", ":"))
+
+def split_packed(result: str, ids: List[str], validate: Callable[[Any], bool]) -> Tuple[Dict[str, Any], List[str]]:
+    """Teilt eine gepackte Antwort auf und gibt (gültige Ergebnisse, fehlerhafte IDs) zurück"""
+    # Lokale Reparatur: ein kleiner Formatfehler soll nicht das ganze Paket kosten
+    data = parse_json(result)
+    if not isinstance(data, dict):
+        data = {}
+
+    parsed, failed = {}, []
+    for item_id in ids:
+        item = data.get(item_id)
+        if item is not None and validate(item):
+            parsed[item_id] = item
+        else:
+            failed.append(item_id)
+    return parsed, failed
+
+class PackedRunner:
+    """Bearbeitet viele Leads mit wenigen Completions, indem mehrere Leads in einen Prompt gepackt werden.
+
+    build_request erhält die Eingaben eines Pakets (ID -> Eingaben) und gibt die
+    Parameter für LLMClient.acomplete zurück. Nur Leads mit fehlerhafter oder
+    fehlender Ausgabe werden erneut angefragt; was danach noch fehlt, fehlt im
+    Ergebnis und wird vom Aufrufer einzeln verarbeitet.
+    """
+
+    def __init__(self, llm_client, build_request: Callable[[Dict[str, Any]], Dict],
+                 validate: Callable[[Any], bool], pack_size: int = 10, max_attempts: int = 2):
+        self.llm_client = llm_client
+        self.build_request = build_request
+        self.validate = validate
+        self.pack_size = pack_size
+        self.max_attempts = max_attempts
+        self.requests = 0
+        self.items = 0
+        self.retried = 0
+
+    async def _arun_pack(self, pack: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        ids = list(pack)
+        request = self.build_request(pack)
+        # Nur vollständig gültige Pakete landen im Cache
+        request["validate"] = lambda result: not split_packed(result, ids, self.validate)[1]
+        result = await self.llm_client.acomplete(**request)
+        return split_packed(result, ids, self.validate)
+
+    async def arun(self, items: Dict[str, Any]) -> Dict[str, Any]:
+        """Gibt die gültigen Ergebnisse je Lead-ID zurück"""
+        pending = dict(items)
+        results = {}
+        self.items += len(items)
+
+        for attempt in range(self.max_attempts):
+            if not pending:
+                break
+            if attempt:
+                self.retried += len(pending)
+                logger.info(f"Wiederhole {len(pending)} Leads mit fehlerhafter Ausgabe")
+
+            ids = list(pending)
+            packs = [{item_id: pending[item_id] for item_id in ids[i:i + self.pack_size]}
+                     for i in range(0, len(ids), self.pack_size)]
+            self.requests += len(packs)
+            outputs = await self.llm_client.gather([self._arun_pack(pack) for pack in packs], return_exceptions=True)
+
+            for output in outputs:
+                if isinstance(output, Exception):
+                    logger.error(f"Gepackter LLM-Aufruf fehlgeschlagen: {str(output)}")
+                    continue
+                parsed, _ = output
+                results.update(parsed)
+                for item_id in parsed:
+                    pending.pop(item_id)
+
+        if pending:
+            logger.warning(f"{len(pending)} Leads ohne gültige Ausgabe nach {self.max_attempts} Versuchen")
+        return results
+
+    def run(self, items: Dict[str, Any]) -> Dict[str, Any]:
+        """Blockierende Variante von arun"""
+        return self.llm_client.run(self.arun(items))
+
+    def stats(self) -> Dict[str, Any]:
+        """Requests pro Lead und Anzahl erneut angefragter Leads"""
+        return {
+            "items": self.items,
+            "requests": self.requests,
+            "requests_per_item": round(self.requests / self.items, 3) if self.items else 0.0,
+            "retried": self.retried
+        }
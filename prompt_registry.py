@@ -0,0 +1,100 @@
+from typing import Any, Dict, List, Optional, Tuple
+from string import Formatter
+import json
+import threading
+from llm_cache import prompt_version
+from token_counter import count_message_tokens
+
+# Rollen der Prompt-Nachrichten im OpenAI-Format (LangChain-Schreibweise "human"/"ai" inklusive)
+ROLES = {"system": "system", "user": "user", "human": "user", "assistant": "assistant", "ai": "assistant"}
+
+class Prompt:
+    """Einmal vorbereiteter Prompt mit Versions-Hash.
+
+    Die Vorlagen werden bei der Registrierung geprüft und in OpenAI-Rollen
+    übersetzt; ein Aufruf formatiert nur noch die Strings. partials sind fest
+    gebundene Werte (z.B. Formatanweisungen), die in die Version eingehen.
+    """
+
+    def __init__(self, name: str, messages: List[Tuple[str, str]], partials: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.messages = messages
+        self.partials = dict(partials or {})
+        self._templates = [(ROLES[role], template) for role, template in messages]
+
+        variables = {field for _, template in messages
+                     for _, field, _, _ in Formatter().parse(template) if field}
+        unknown = set(self.partials) - variables
+        if unknown:
+            raise ValueError(f"Prompt {name}: unbekannte Platzhalter {', '.join(sorted(unknown))}")
+        self.input_variables = sorted(variables - set(self.partials))
+
+        # Ohne gebundene Werte entspricht die Version dem bisherigen Hash der Nachrichtenliste
+        if self.partials:
+            self.version = prompt_version([messages, *(self.partials[key] for key in sorted(self.partials))])
+        else:
+            self.version = prompt_version(messages)
+
+    def render(self, **inputs) -> List[Dict[str, str]]:
+        """Rendert den Prompt in OpenAI-Nachrichten, ohne das LLM aufzurufen"""
+        missing = [key for key in self.input_variables if key not in inputs]
+        if missing:
+            raise KeyError(f"Prompt {self.name}: fehlende Eingaben {', '.join(missing)}")
+        values = {**inputs, **self.partials}
+        return [{"role": role, "content": template.format(**values)} for role, template in self._templates]
+
+    def count_tokens(self, model: str, **inputs) -> int:
+        """Eingabe-Tokens des gerenderten Prompts"""
+        return count_message_tokens(self.render(**inputs), model)
+
+    def request(self, inputs: Dict[str, Any], model: str, temperature: float,
+                cache_inputs: Any = None, **params) -> Dict[str, Any]:
+        """Parameter für LLMClient.complete; der Prompt-Name ist zugleich der Cache-Namespace"""
+        return {
+            "messages": self.render(**inputs),
+            "model": model,
+            "temperature": temperature,
+            "namespace": self.name,
+            "version": self.version,
+            "cache_inputs": inputs if cache_inputs is None else cache_inputs,
+            **params
+        }
+
+class PromptRegistry:
+    """Hält alle Prompts des Prozesses; jede Variante wird nur einmal aufgebaut"""
+
+    def __init__(self, definitions: Dict[str, List[Tuple[str, str]]]):
+        self.definitions = definitions
+        self._prompts = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, **partials) -> Prompt:
+        """Gibt den Prompt zurück, mit fest gebundenen Werten als eigene Variante"""
+        key = (name, json.dumps(partials, sort_keys=True, ensure_ascii=False))
+        prompt = self._prompts.get(key)
+        if prompt is None:
+            with self._lock:
+                prompt = self._prompts.get(key)
+                if prompt is None:
+                    prompt = Prompt(name, self.definitions[name], partials)
+                    self._prompts[key] = prompt
+        return prompt
+
+    def versions(self) -> Dict[str, str]:
+        """Versions-Hash aller Prompts ohne gebundene Werte"""
+        return {name: self.get(name).version for name in self.definitions}
+
+# Prozessweite Instanz mit den Prompts aus prompts.py
+_registry = None
+
+def get_prompt_registry() -> PromptRegistry:
+    """Gibt die Singleton-Instanz der Prompt-Registry zurück."""
+    global _registry
+    if _registry is None:
+        from prompts import PROMPTS
+        _registry = PromptRegistry(PROMPTS)
+    return _registry
+
+def get_prompt(name: str, **partials) -> Prompt:
+    """Kurzform für get_prompt_registry().get(name, **partials)"""
+    return get_prompt_registry().get(name, **partials)
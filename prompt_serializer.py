@@ -0,0 +1,114 @@
+from typing import Any, Dict, Sequence, Tuple
+import json
+import logging
+from enrichment import FIELD_PATHS, get_field
+from token_counter import count_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Felder, die ein Prompt über den Lead braucht: (Name im Prompt, Feld aus FIELD_PATHS oder Pfad)
+# Die Reihenfolge ist die Priorität; beim Kürzen auf das Budget fallen hintere Felder zuerst weg.
+LEAD_FIELDS = (
+    ("name", "name"),
+    ("position", "title"),
+    ("headline", "headline"),
+    ("company", "company"),
+    ("industry", "industry"),
+    ("company_size", "size"),
+    ("company_description", "company_description"),
+    ("website_title", "domain_info.title"),
+    ("website_description", "domain_info.description"),
+    ("about_company", "domain_info.about"),
+    ("services", "domain_info.services"),
+    ("about_person", "linkedin_info.about"),
+    ("experience", "linkedin_info.experience"),
+    ("skills", "linkedin_info.skills")
+)
+
+# Für die Personalisierung liegt die Analyse bereits vor, daher reicht ein kleinerer Ausschnitt
+PERSONALIZATION_FIELDS = (
+    ("name", "name"),
+    ("position", "title"),
+    ("company", "company"),
+    ("industry", "industry"),
+    ("company_description", "company_description"),
+    ("website_description", "domain_info.description"),
+    ("services", "domain_info.services"),
+    ("headline", "headline")
+)
+
+# Feldauswahl pro Prompt (Cache-Namespace des Aufrufs)
+PROMPT_FIELDS = {
+    "communication_style": LEAD_FIELDS,
+    "personalized_email": LEAD_FIELDS,
+    "fused_style_email": LEAD_FIELDS,
+    "communication_analysis": LEAD_FIELDS,
+    "interest_analysis": LEAD_FIELDS,
+    "fused_analysis": LEAD_FIELDS,
+    "packed_analysis": LEAD_FIELDS,
+    "personalization": PERSONALIZATION_FIELDS
+}
+
+# Token-Budget für die Lead-Daten eines Prompts
+DEFAULT_BUDGET = 1200
+
+def _resolve(lead: Dict, field: str) -> Any:
+    if field in FIELD_PATHS:
+        return get_field(lead, field)
+    value = lead
+    for key in field.split("."):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+def select_fields(lead: Dict, fields: Sequence[Tuple[str, str]]) -> Dict[str, Any]:
+    """Übernimmt nur die freigegebenen, nicht-leeren Felder; doppelte Werte entfallen"""
+    selected = {}
+    seen = set()
+    for name, field in fields:
+        value = _resolve(lead, field)
+        if value in (None, "", [], {}):
+            continue
+        if isinstance(value, str):
+            value = " ".join(value.split())
+        key = _dumps(value)
+        if key in seen:
+            continue
+        seen.add(key)
+        selected[name] = value
+    return selected
+
+def trim_to_budget(data: Dict[str, Any], budget: int, model: str) -> Dict[str, Any]:
+    """Kürzt die Felder mit der niedrigsten Priorität, bis die Daten ins Token-Budget passen"""
+    data = dict(data)
+    tokens = count_tokens(_dumps(data), model)
+    while data and tokens > budget:
+        name = next(reversed(data))
+        value = data[name]
+        excess = tokens - budget
+        if isinstance(value, list) and len(value) > 1:
+            data[name] = value[:-1]
+        elif isinstance(value, str) and count_tokens(value, model) > excess + 16:
+            data[name] = truncate_tokens(value, count_tokens(value, model) - excess - 1, model) + "…"
+        else:
+            del data[name]
+        tokens = count_tokens(_dumps(data), model)
+    return data
+
+def compact_lead(lead: Dict, prompt: str, model: str = "gpt-3.5-turbo", budget: int = DEFAULT_BUDGET) -> Dict[str, Any]:
+    """Whitelist-Auswahl der Lead-Daten für einen Prompt, gekürzt auf das Token-Budget"""
+    selected = select_fields(lead, PROMPT_FIELDS[prompt])
+    trimmed = trim_to_budget(selected, budget, model)
+    if trimmed != selected:
+        logger.debug(f"Lead-Daten für {prompt} auf {budget} Tokens gekürzt")
+    return trimmed
+
+def serialize_lead(lead: Dict, prompt: str, model: str = "gpt-3.5-turbo", budget: int = DEFAULT_BUDGET) -> str:
+    """Kompakte JSON-Darstellung der Lead-Daten für einen Prompt"""
+    return _dumps(compact_lead(lead, prompt, model, budget))
+
+def serialize_compact(data: Any) -> str:
+    """Kompakte JSON-Darstellung ohne Einrückung, z.B. für Analyseergebnisse"""
+    return _dumps(data)
@@ -0,0 +1,264 @@
+"""
+Konfigurationsdatei für alle AI-Prompts und Modelleinstellungen
+"""
+
+from structured_output import Schema, SchemaField
+
+# OpenAI Modell-Konfiguration; das Modell wählt model_router.py pro Stufe
+OPENAI_TEMPERATURE = 0.7
+
+# Prompts für Website-Scraping
+WEBSITE_ANALYSIS_PROMPT = """
+Analysiere die folgende Website und extrahiere die wichtigsten Informationen:
+- Hauptgeschäftsfeld und Branche
+- Produkte oder Dienstleistungen
+- Unternehmensgröße und Standort (falls verfügbar)
+- Besondere Merkmale oder USPs
+- Aktuelle Herausforderungen oder Wachstumsbereiche
+
+Fasse die Informationen in 2-3 prägnanten Sätzen zusammen.
+"""
+
+# Prompts für LinkedIn-Scraping
+LINKEDIN_ANALYSIS_PROMPT = """
+Analysiere das LinkedIn-Profil und extrahiere die wichtigsten Informationen:
+- Aktuelle Position und Verantwortlichkeiten
+- Beruflicher Werdegang
+- Ausbildung und Qualifikationen
+- Interessen und Aktivitäten
+- Gemeinsame Verbindungen oder Interessen
+
+Fasse die Informationen in 2-3 prägnanten Sätzen zusammen.
+"""
+
+# Prompt für die Nachrichtengenerierung
+MESSAGE_GENERATION_PROMPT = """
+Erstelle eine personalisierte Nachricht basierend auf den folgenden Informationen:
+- Website-Analyse: {website_summary}
+- LinkedIn-Analyse: {linkedin_summary}
+- Kommunikationsstil: {communication_style}
+
+Die Nachricht sollte:
+1. Persönlich und authentisch sein
+2. Sich auf spezifische Details aus der Analyse beziehen
+3. Einen klaren Mehrwert für den Empfänger bieten
+4. Eine konkrete nächste Aktion vorschlagen
+5. Im angegebenen Kommunikationsstil (formal/informal) verfasst sein
+
+Maximale Länge: 150 Wörter
+"""
+
+# Systemkontext für das AI-Modell
+SYSTEM_CONTEXT = """
+Du bist ein erfahrener Business Development Manager bei Amplifa, 
+einem führenden Unternehmen für digitales Marketing und Lead-Generierung. 
+Deine Aufgabe ist es, potenzielle Kunden zu analysieren und 
+personalisierte Nachrichten zu erstellen, die authentisch und 
+wertvoll für den Empfänger sind.
+""" 
+
+# Prompts der Lead-Verarbeitung (LeadProcessor)
+COMMUNICATION_STYLE_PROMPT = """
+Du bist ein Experte für Kommunikationsanalyse. Analysiere die folgenden Informationen und bestimme den wahrscheinlichen Kommunikationsstil der Person.
+"""
+
+PERSONALIZED_EMAIL_PROMPT = """
+Du bist ein erfahrener Sales Copywriter. Schreibe eine hochpersonalisierte E-Mail basierend auf den Lead-Daten und dem Kommunikationsstil.
+"""
+
+FUSED_STYLE_EMAIL_PROMPT = """
+Du bist ein Experte für Kommunikationsanalyse und ein erfahrener Sales Copywriter.
+Bestimme den wahrscheinlichen Kommunikationsstil der Person und schreibe darauf abgestimmt eine hochpersonalisierte E-Mail.
+
+Formatiere die Antwort als JSON mit den folgenden Schlüsseln:
+- communication_style: Beschreibung des Kommunikationsstils
+- email: Text der E-Mail
+"""
+
+# Prompts der Kommunikationsanalyse (CommunicationAnalyzer)
+COMMUNICATION_ANALYSIS_PROMPT = """
+Du bist ein Experte für Kommunikationsanalyse.
+Analysiere die folgenden Informationen und bestimme:
+1. Den Kommunikationsstil (formell/informell, direkt/indirekt, etc.)
+2. Die bevorzugte Kommunikationsweise
+3. Mögliche Interessengebiete
+4. Potenzielle Schmerzpunkte
+5. Passende Ansprache
+
+Formatiere die Antwort als JSON mit den folgenden Schlüsseln:
+- style: Hauptkommunikationsstil
+- tone: Tonfall
+- interests: Liste von Interessengebieten
+- pain_points: Liste von möglichen Schmerzpunkten
+- approach: Empfohlene Ansprache
+"""
+
+# Nur Interessen und Schmerzpunkte, wenn der lokale Klassifikator den Stil bereits bestimmt hat
+INTEREST_ANALYSIS_PROMPT = """
+Du bist ein Experte für Vertriebsanalyse.
+Bestimme aus den folgenden Informationen mögliche Interessengebiete und potenzielle Schmerzpunkte.
+
+Formatiere die Antwort als JSON mit den folgenden Schlüsseln:
+- interests: Liste von Interessengebieten
+- pain_points: Liste von möglichen Schmerzpunkten
+"""
+
+PERSONALIZATION_PROMPT = """
+Generiere personalisierte Inhalte für die E-Mail basierend auf:
+1. Lead-Daten
+2. Kommunikationsanalyse
+3. Unternehmen und Position
+
+Formatiere die Antwort als JSON mit den folgenden Schlüsseln:
+- positive_observation: Positive Beobachtung über das Unternehmen/Profil
+- value_proposition: Personalisierter Wertversprechen
+- follow_up: Personalisierter Follow-Up Text
+- final_offer: Personalisiertes finales Angebot
+"""
+
+# Fusionierter Modus: Aufgabe und Ausgabeformat getrennt, damit der gepackte Modus das Format wiederverwendet
+FUSED_ANALYSIS_TASK = """
+Du bist ein Experte für Kommunikationsanalyse und personalisierte Vertriebs-E-Mails.
+Analysiere die folgenden Informationen und bestimme:
+1. Den Kommunikationsstil (formell/informell, direkt/indirekt, etc.)
+2. Die bevorzugte Kommunikationsweise
+3. Mögliche Interessengebiete
+4. Potenzielle Schmerzpunkte
+5. Passende Ansprache
+Generiere darauf abgestimmt die personalisierten Inhalte für die E-Mail.
+"""
+
+FUSED_ANALYSIS_FORMAT = """
+- style: Hauptkommunikationsstil
+- tone: Tonfall
+- interests: Liste von Interessengebieten
+- pain_points: Liste von möglichen Schmerzpunkten
+- approach: Empfohlene Ansprache
+- positive_observation: Positive Beobachtung über das Unternehmen/Profil
+- value_proposition: Personalisierter Wertversprechen
+- follow_up: Personalisierter Follow-Up Text
+- final_offer: Personalisiertes finales Angebot
+"""
+
+# Lead-Analyse im Frontend; {format_instructions} wird beim Laden des Agenten fest gebunden
+LEAD_ANALYSIS_SYSTEM_PROMPT = """
+Du bist ein erfahrener Sales- und Marketing-Experte, der Leads analysiert und personalisierte Nachrichten erstellt.
+
+Analysiere die folgenden Informationen über einen Lead und erstelle eine personalisierte Nachricht.
+
+Antworte ausschließlich mit einem JSON-Objekt mit den folgenden Feldern:
+{format_instructions}
+"""
+
+LEAD_ANALYSIS_USER_PROMPT = """
+Name: {name}
+Unternehmen: {company}
+E-Mail: {email}
+Website-Inhalt: {website_content}
+LinkedIn-Inhalt: {linkedin_content}
+
+Bitte analysiere diese Informationen und erstelle eine personalisierte Nachricht.
+"""
+
+# Map-Schritt für lange Seiten; die Teilzusammenfassungen ersetzen den Rohtext in der Analyse
+CHUNK_SUMMARY_PROMPT = """
+Du erhältst einen Ausschnitt aus einer langen Seite ({source}).
+Fasse ihn sachlich und knapp zusammen. Behalte alle Fakten, die für eine Vertriebsansprache relevant sind:
+Angebot und Leistungen, Branche, Zielgruppe, Größe, Standorte, Personen, Positionen, Zahlen und Erfolge.
+Lass Navigation, Cookie-Hinweise und rechtliche Texte weg. Antworte nur mit der Zusammenfassung.
+"""
+
+# Nachfrage, wenn eine strukturierte Antwort nach der lokalen Reparatur noch Felder vermissen lässt
+FIELD_REPAIR_PROMPT = """
+In deiner Antwort fehlen oder sind ungültig: {fields}.
+Antworte ausschließlich mit einem JSON-Objekt, das nur diese Felder enthält:
+{schema}
+"""
+
+# Schemas der JSON-Antworten; geprüft wird gegen sie statt gegen einzelne json.loads-Aufrufe
+ANALYSIS_SCHEMA = Schema({
+    "style": SchemaField(str, "Hauptkommunikationsstil"),
+    "tone": SchemaField(str, "Tonfall"),
+    "interests": SchemaField(list, "Interessengebiete"),
+    "pain_points": SchemaField(list, "mögliche Schmerzpunkte"),
+    "approach": SchemaField(str, "Empfohlene Ansprache")
+})
+
+INTEREST_SCHEMA = Schema({name: ANALYSIS_SCHEMA.fields[name] for name in ("interests", "pain_points")})
+
+PERSONALIZATION_SCHEMA = Schema({
+    "positive_observation": SchemaField(str, "Positive Beobachtung über das Unternehmen/Profil"),
+    "value_proposition": SchemaField(str, "Personalisierter Wertversprechen"),
+    "follow_up": SchemaField(str, "Personalisierter Follow-Up Text"),
+    "final_offer": SchemaField(str, "Personalisiertes finales Angebot")
+})
+
+FUSED_ANALYSIS_SCHEMA = Schema({**ANALYSIS_SCHEMA.fields, **PERSONALIZATION_SCHEMA.fields})
+
+STYLE_EMAIL_SCHEMA = Schema({
+    "communication_style": SchemaField(str, "Beschreibung des Kommunikationsstils"),
+    "email": SchemaField(str, "Text der E-Mail")
+})
+
+# Alle Prompts des Projekts als Nachrichtenlisten; der Name dient auch als Cache-Namespace
+PROMPTS = {
+    "communication_style": [
+        ("system", COMMUNICATION_STYLE_PROMPT),
+        ("user", "{lead_data}")
+    ],
+    "personalized_email": [
+        ("system", PERSONALIZED_EMAIL_PROMPT),
+        ("user", "Lead-Daten: {lead_data}\nKommunikationsstil: {communication_style}")
+    ],
+    "fused_style_email": [
+        ("system", FUSED_STYLE_EMAIL_PROMPT),
+        ("user", "{lead_data}")
+    ],
+    "communication_analysis": [
+        ("system", COMMUNICATION_ANALYSIS_PROMPT),
+        ("user", "{lead_data}")
+    ],
+    "interest_analysis": [
+        ("system", INTEREST_ANALYSIS_PROMPT),
+        ("user", "{lead_data}")
+    ],
+    "personalization": [
+        ("system", PERSONALIZATION_PROMPT),
+        ("user", "Lead-Daten: {lead_data}\nAnalyse: {analysis}")
+    ],
+    "fused_analysis": [
+        ("system", FUSED_ANALYSIS_TASK + "\nFormatiere die Antwort als JSON mit den folgenden Schlüsseln:" + FUSED_ANALYSIS_FORMAT),
+        ("user", "{lead_data}")
+    ],
+    "packed_analysis": [
+        ("system", FUSED_ANALYSIS_TASK + "{packed_instructions}"),
+        ("user", "{leads}")
+    ],
+    "website_analysis": [
+        ("system", SYSTEM_CONTEXT),
+        ("user", WEBSITE_ANALYSIS_PROMPT + "\n\n{website_content}")
+    ],
+    "linkedin_analysis": [
+        ("system", SYSTEM_CONTEXT),
+        ("user", LINKEDIN_ANALYSIS_PROMPT + "\n\n{linkedin_content}")
+    ],
+    "message_generation": [
+        ("system", SYSTEM_CONTEXT),
+        ("user", MESSAGE_GENERATION_PROMPT)
+    ],
+    "packed_message_generation": [
+        ("system", SYSTEM_CONTEXT),
+        ("user", "{message_rules}{packed_instructions}\n\n{leads}")
+    ],
+    "lead_analysis": [
+        ("system", LEAD_ANALYSIS_SYSTEM_PROMPT),
+        ("human", LEAD_ANALYSIS_USER_PROMPT)
+    ],
+    "chunk_summary": [
+        ("system", CHUNK_SUMMARY_PROMPT),
+        ("user", "{chunk}")
+    ],
+    "field_repair": [
+        ("user", FIELD_REPAIR_PROMPT)
+    ]
+}
@@ -0,0 +1,99 @@
+from typing import Optional
+from collections import deque
+import asyncio
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Länge des gleitenden Fensters in Sekunden
+WINDOW_SECONDS = 60.0
+
+class RateLimiter:
+    """Gemeinsames Limit für Requests und Tokens pro Minute über alle Threads und Event-Loops"""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = deque()  # Zeitstempel
+        self._tokens = deque()    # (Zeitstempel, Tokens)
+        self._token_total = 0
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _purge(self, now: float):
+        while self._requests and now - self._requests[0] >= WINDOW_SECONDS:
+            self._requests.popleft()
+        while self._tokens and now - self._tokens[0][0] >= WINDOW_SECONDS:
+            self._token_total -= self._tokens.popleft()[1]
+
+    def _reserve(self, tokens: int) -> float:
+        """Reserviert Kapazität und gibt 0 zurück, sonst die Wartezeit in Sekunden"""
+        with self._lock:
+            now = time.monotonic()
+            self._purge(now)
+
+            if now < self._blocked_until:
+                return self._blocked_until - now
+
+            if self.requests_per_minute and len(self._requests) >= self.requests_per_minute:
+                return self._requests[0] + WINDOW_SECONDS - now
+
+            # Ein Aufruf über dem Minutenbudget darf nur in ein leeres Fenster
+            if self.tokens_per_minute and self._tokens and self._token_total + tokens > self.tokens_per_minute:
+                excess = self._token_total + tokens - self.tokens_per_minute
+                for timestamp, used in self._tokens:
+                    excess -= used
+                    if excess <= 0:
+                        return timestamp + WINDOW_SECONDS - now
+                return self._tokens[-1][0] + WINDOW_SECONDS - now
+
+            self._requests.append(now)
+            self._tokens.append((now, tokens))
+            self._token_total += tokens
+            return 0.0
+
+    def acquire(self, tokens: int = 0):
+        """Blockiert, bis der Aufruf in das Limit passt"""
+        while True:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int = 0):
+        """Wartet asynchron, bis der Aufruf in das Limit passt"""
+        while True:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def record_usage(self, reserved: int, actual: Optional[int]):
+        """Korrigiert die reservierten Tokens um den tatsächlichen Verbrauch"""
+        if actual is None or actual == reserved:
+            return
+        with self._lock:
+            self._tokens.append((time.monotonic(), actual - reserved))
+            self._token_total += actual - reserved
+
+    def penalize(self, seconds: float):
+        """Pausiert alle Aufrufer, z.B. nach einem 429 mit Retry-After"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        logger.warning(f"Rate-Limit erreicht, pausiere LLM-Aufrufe für {seconds:.1f}s")
+
+# Prozessweite Instanz, die sich alle LLM-Aufrufe teilen
+_limiter = None
+
+def get_rate_limiter() -> RateLimiter:
+    """Gibt die Singleton-Instanz des Rate-Limiters zurück."""
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter(
+            requests_per_minute=int(os.getenv("LLM_RPM_LIMIT", "500")),
+            tokens_per_minute=int(os.getenv("LLM_TPM_LIMIT", "90000"))
+        )
+    return _limiter
@@ -7,35 +7,54 @@ from lead_processor import LeadProcessor
 from sheets_manager import SheetsManager
 from scheduler import Scheduler
 from init_sheets import init_sheets
+from browser_supervisor import reap_orphaned_browsers
+from llm_cache import get_llm_cache
+from semantic_cache import get_semantic_cache
+from llm_client import get_llm_client
+from llm_cassette import get_cassette
+from hedging import get_hedger
+from smtp_pool import get_smtp_pool
+from mail_queue import get_mail_queue
+from style_classifier import get_style_classifier, retrain_style_classifier
 
 def process_leads():
     """Verarbeitet neue Leads und plant Follow-Ups"""
+    lead_processor = None
     try:
         # Initialisiere Komponenten
-        lead_processor = LeadProcessor()
         sheets_manager = SheetsManager()
+        lead_processor = LeadProcessor(sheets_manager)
         scheduler = Scheduler()
         
         # Hole neue Leads von Apify
         logger.info("Hole neue Leads von Apify...")
-        leads = lead_processor.fetch_leads_from_apify()
+        fetched = lead_processor.fetch_leads_from_apify()
         
+        # Bereits gespeicherte Leads, z.B. vor einem Abbruch, nicht erneut anreichern und analysieren;
+        # ein Lead steht im Zeitplan, sobald er in Google Sheets steht und seine E-Mail eingereiht ist
+        leads = [lead for lead in fetched if not lead.get('email') or lead['email'] not in scheduler.schedule]
+        if len(leads) < len(fetched):
+            logger.info(f"{len(fetched) - len(leads)} Leads bereits verarbeitet, überspringe sie")
+            
         if not leads:
             logger.info("Keine neuen Leads gefunden")
             return
             
         logger.info(f"{len(leads)} neue Leads gefunden")
         
-        # Verarbeite jeden Lead
-        for lead in leads:
-            try:
-                # Verarbeite den Lead
-                logger.info(f"Verarbeite Lead: {lead.get('email', '')}")
-                processed_lead = lead_processor.process_lead(lead)
+        def save_lead(lead, processed_lead):
+            """Speichert einen Lead, sobald er fertig ist, damit ein Abbruch keine fertigen Leads verliert"""
+            if isinstance(processed_lead, Exception):
+                logger.error(f"Fehler bei der Verarbeitung des Leads {lead.get('email', '')}: {str(processed_lead)}")
+                return
                 
+            try:
                 # Speichere in Google Sheets
                 sheets_manager.append_lead(processed_lead)
                 
+                # Erst jetzt versenden, damit der Versand-Callback die Zeile des Leads findet
+                lead_processor.deliver(processed_lead)
+                
                 # Plane Follow-Ups
                 scheduled_emails = scheduler.add_to_schedule(
                     processed_lead,
@@ -46,14 +65,37 @@ def process_leads():
                 
             except Exception as e:
                 logger.error(f"Fehler bei der Verarbeitung des Leads {lead.get('email', '')}: {str(e)}")
-                continue
+                
+        # Verarbeite alle Leads gleichzeitig; LLM-Aufrufe teilen sich ein Rate-Limit
+        lead_processor.process_leads(leads, on_result=save_lead)
+                
+        logger.info(f"Anreicherungsstufen (ausgeführt/übersprungen): {lead_processor.enrichment.stats()}")
+        logger.info(f"LLM-Cache: {get_llm_cache().stats()}")
+        if get_semantic_cache() is not None:
+            logger.info(f"Semantischer Cache: {get_semantic_cache().stats()}")
+        logger.info(f"LLM-Verbrauch pro Stufe: {get_llm_client().usage_stats()}")
+        logger.info(f"Strukturierte Antworten: {get_llm_client().structured_stats()}")
+        if get_cassette() is not None:
+            logger.info(f"LLM-Cassette: {get_cassette().stats()}")
+        if get_style_classifier() is not None:
+            logger.info(f"Stil-Klassifikator (lokal/LLM): {get_style_classifier().stats()}")
+        if get_hedger().classes:
+            logger.info(f"Hedging pro Aufrufklasse: {get_hedger().stats()}")
+        logger.info(f"SMTP-Pool (Verbindungen/gesendet): {get_smtp_pool().stats()}")
+        logger.info(f"Mail-Warteschlange: {get_mail_queue().stats()}")
                 
     except Exception as e:
         logger.error(f"Fehler bei der Lead-Verarbeitung: {str(e)}")
+    finally:
+        # Browser nicht dem Garbage Collector überlassen
+        if lead_processor is not None:
+            lead_processor.close()
         
 def process_scheduled_emails():
     """Verarbeitet geplante E-Mails"""
     try:
+        # Fehlgeschlagene E-Mails aus der Ausgangsbox erneut versuchen
+        get_mail_queue().resume()
         scheduler = Scheduler()
         scheduler.process_scheduled_emails()
     except Exception as e:
@@ -63,6 +105,7 @@ def main():
     parser = argparse.ArgumentParser(description="KI-gestützter Lead-Prozessor")
     parser.add_argument('--init', action='store_true', help="Initialisiere Google Sheets")
     parser.add_argument('--test', action='store_true', help="Führe einen Testlauf durch")
+    parser.add_argument('--train-style', action='store_true', help="Trainiere den Stil-Klassifikator aus dem LLM-Cache")
     args = parser.parse_args()
     
     if args.init:
@@ -70,15 +113,28 @@ def main():
         init_sheets()
         return
         
+    if args.train_style:
+        logger.info("Trainiere Stil-Klassifikator aus dem LLM-Cache...")
+        if retrain_style_classifier() is None:
+            logger.info("Zu wenige gelabelte Leads im LLM-Cache, Klassifikator nicht gespeichert")
+        return
+        
     if args.test:
         from test_lead import test_lead_processing
         logger.info("Führe Testlauf durch...")
         test_lead_processing()
         return
         
+    # Räume Browser-Prozesse früherer Läufe auf
+    reap_orphaned_browsers()
+    
+    # Nach einem Absturz nicht verschickte E-Mails fortsetzen, ohne Leads neu zu verarbeiten
+    get_mail_queue().resume()
+    
     # Plane regelmäßige Ausführung
     schedule.every(1).hours.do(process_leads)
     schedule.every(15).minutes.do(process_scheduled_emails)
+    schedule.every(30).minutes.do(reap_orphaned_browsers)
     
     logger.info("Starte Lead-Prozessor...")
     
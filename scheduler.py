@@ -2,11 +2,15 @@ from typing import Dict, List
 import json
 from datetime import datetime
 import os
+import threading
 from logger import logger
 from email_manager import EmailManager
 from sheets_manager import SheetsManager
 
 class Scheduler:
+    # Mehrere Instanzen und die Versand-Callbacks teilen sich die Zeitplan-Datei
+    _file_lock = threading.Lock()
+    
     def __init__(self):
         self.email_manager = EmailManager()
         self.sheets_manager = SheetsManager()
@@ -29,20 +33,32 @@ class Scheduler:
     def add_to_schedule(self, lead_data: Dict, scheduled_emails: Dict):
         """Fügt geplante E-Mails zum Zeitplan hinzu"""
         lead_id = lead_data.get('email', '')
-        if lead_id not in self.schedule:
+        with self._file_lock:
+            # Neu laden, damit Statusänderungen aus dem Hintergrundversand nicht überschrieben werden
+            self.load_schedule()
+            if lead_id in self.schedule:
+                return
             self.schedule[lead_id] = {
                 'lead_data': lead_data,
                 'scheduled_emails': scheduled_emails,
                 'status': 'active'
             }
             self.save_schedule()
-            logger.info(f"Neue E-Mails für {lead_id} geplant")
+        logger.info(f"Neue E-Mails für {lead_id} geplant")
+        
+    def _set_status(self, lead_id: str, status: str):
+        """Setzt den Status eines Leads und speichert den Zeitplan sofort"""
+        with self._file_lock:
+            self.load_schedule()
+            if lead_id in self.schedule:
+                self.schedule[lead_id]['status'] = status
+                self.save_schedule()
             
     def process_scheduled_emails(self):
         """Verarbeitet fällige E-Mails"""
         today = datetime.now().strftime("%Y-%m-%d")
-        processed_leads = []
         
+        due = []
         for lead_id, data in self.schedule.items():
             if data['status'] != 'active':
                 continue
@@ -51,46 +67,52 @@ class Scheduler:
             lead_data = data['lead_data']
             
             for date, email_data in scheduled_emails.items():
-                if date == today:
-                    success = self._send_scheduled_email(lead_data, email_data)
-                    if success:
-                        processed_leads.append(lead_id)
-                        
-        # Aktualisiere den Status der verarbeiteten Leads
-        for lead_id in processed_leads:
-            if lead_id in self.schedule:
-                self.schedule[lead_id]['status'] = 'processed'
-                
-        self.save_schedule()
+                if date == today and email_data.get('type') in ('follow_up', 'final'):
+                    due.append((lead_id, lead_data, email_data))
+                    
+        # Alle fälligen E-Mails in einem Durchgang rendern
+        try:
+            emails = self.email_manager.compose_many([
+                (email_data['type'], lead_data, email_data.get('personalization', {}), email_data.get('days'))
+                for _, lead_data, email_data in due
+            ])
+        except Exception as e:
+            logger.error(f"Fehler beim Erstellen der geplanten E-Mails: {str(e)}")
+            return
+            
+        # In die Versandwarteschlange; der Status wird nach dem Versand gesetzt
+        for (lead_id, lead_data, email_data), email in zip(due, emails):
+            # Der Schlüssel verhindert, dass eine wartende oder bereits verschickte E-Mail erneut rausgeht
+            self.email_manager.queue_email(
+                email,
+                key=self._email_key(lead_id, email_data),
+                on_sent=lambda lead_id=lead_id, lead_data=lead_data, email_data=email_data:
+                    self._on_sent(lead_id, lead_data, email_data)
+            )
+        
+    @staticmethod
+    def _email_key(lead_id: str, email_data: Dict) -> str:
+        """Idempotenzschlüssel pro Lead und E-Mail, z.B. max@firma.de:follow_up:7"""
+        if email_data['type'] == 'follow_up':
+            return f"{lead_id}:follow_up:{email_data['days']}"
+        return f"{lead_id}:{email_data['type']}"
+        
+    def _on_sent(self, lead_id: str, lead_data: Dict, email_data: Dict):
+        """Markiert den Lead nach dem Versand als verarbeitet und aktualisiert Google Sheets"""
+        self._set_status(lead_id, 'processed')
+        self._mark_sent(lead_data, email_data)
         
-    def _send_scheduled_email(self, lead_data: Dict, email_data: Dict) -> bool:
-        """Sendet eine geplante E-Mail"""
+    def _mark_sent(self, lead_data: Dict, email_data: Dict) -> bool:
+        """Aktualisiert den Status einer gesendeten E-Mail in Google Sheets"""
         try:
-            if email_data['type'] == 'follow_up':
-                success = self.email_manager.send_follow_up(
-                    lead_data,
-                    email_data['personalization'],
-                    email_data['days']
-                )
-            elif email_data['type'] == 'final':
-                success = self.email_manager.send_final_email(
-                    lead_data,
-                    email_data['personalization']
-                )
-            else:
-                success = False
-                
-            if success:
-                # Aktualisiere den Status in Google Sheets
-                self.sheets_manager.update_lead_status(
-                    lead_data.get('email', ''),
-                    f"Follow-up gesendet: {email_data['type']}"
-                )
-                
-            return success
+            self.sheets_manager.update_lead_status(
+                lead_data.get('email', ''),
+                f"Follow-up gesendet: {email_data['type']}"
+            )
+            return True
             
         except Exception as e:
-            logger.error(f"Fehler beim Senden der geplanten E-Mail: {str(e)}")
+            logger.error(f"Fehler beim Aktualisieren des Status von {lead_data.get('email', '')}: {str(e)}")
             return False
             
     def get_active_schedules(self) -> List[Dict]:
@@ -108,6 +130,5 @@ class Scheduler:
     def cancel_schedule(self, lead_id: str):
         """Storniert den Zeitplan für einen Lead"""
         if lead_id in self.schedule:
-            self.schedule[lead_id]['status'] = 'cancelled'
-            self.save_schedule()
+            self._set_status(lead_id, 'cancelled')
             logger.info(f"Zeitplan für {lead_id} storniert") 
\ No newline at end of file
@@ -0,0 +1,156 @@
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Schwellen, für die stats() die Trefferquote ausweist, um den Schwellwert abzustimmen
+THRESHOLD_STEPS = (0.85, 0.90, 0.93, 0.95, 0.97, 0.99)
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Normiert Zeilenvektoren auf Länge 1, damit das Skalarprodukt die Kosinus-Ähnlichkeit ist"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+class SemanticCache:
+    """Cache für Analysen nahezu gleicher Eingaben (z.B. ähnliche Websites derselben Branche).
+
+    Die Embeddings jeder Partition (Namespace, Modell, Prompt-Version) liegen als
+    normierte NumPy-Matrix im Speicher; eine Suche ist ein Matrixprodukt über alle
+    Einträge. Persistiert wird in SQLite, geladen wird pro Partition beim ersten Zugriff.
+    """
+
+    def __init__(self, path: str, threshold: float = 0.95, max_entries: int = 5000,
+                 embedding_model: str = "text-embedding-3-small"):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.embedding_model = embedding_model
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS semantic_cache (
+                partition TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (partition, text_hash)
+            )
+        """)
+        self._conn.commit()
+        self._matrices = {}
+        self._responses = {}
+        self._hashes = {}
+        # Laufende Zähler statt aller Ähnlichkeiten, damit der Speicher im Dauerbetrieb konstant bleibt:
+        # Suchen pro Namespace und wie viele davon bei jeder Schwelle aus THRESHOLD_STEPS getroffen hätten
+        self.lookups = Counter()
+        self._hits_at = {}
+        self.hits = Counter()
+
+    def partition(self, namespace: str, model: str, version: str) -> str:
+        """Einträge sind nur innerhalb desselben Prompts, Modells und Embedding-Modells vergleichbar"""
+        return f"{namespace}:{model}:{version}:{self.embedding_model}"
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+    def _load(self, partition: str) -> np.ndarray:
+        """Matrix der Partition; muss unter dem Lock aufgerufen werden"""
+        if partition not in self._matrices:
+            rows = self._conn.execute(
+                "SELECT text_hash, embedding, response FROM semantic_cache WHERE partition = ? ORDER BY created_at",
+                (partition,)
+            ).fetchall()
+            vectors = [np.frombuffer(row[1], dtype=np.float32) for row in rows]
+            self._matrices[partition] = np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+            self._hashes[partition] = [row[0] for row in rows]
+            self._responses[partition] = [row[2] for row in rows]
+        return self._matrices[partition]
+
+    def search(self, partition: str, queries: np.ndarray) -> List[Tuple[Optional[int], float]]:
+        """Bester Eintrag und Ähnlichkeit für jede Zeile von queries, in einem Matrixprodukt"""
+        queries = normalize(np.asarray(queries, dtype=np.float32))
+        with self._lock:
+            matrix = self._load(partition)
+            if not len(matrix):
+                return [(None, 0.0)] * len(queries)
+            similarities = queries @ matrix.T
+        best = similarities.argmax(axis=1)
+        return [(int(index), float(similarities[row, index])) for row, index in enumerate(best)]
+
+    def lookup(self, namespace: str, partition: str, embedding: List[float]) -> Optional[str]:
+        """Gibt die Antwort des ähnlichsten Eintrags zurück, wenn er über dem Schwellwert liegt"""
+        index, score = self.search(partition, np.asarray([embedding]))[0]
+        with self._lock:
+            self.lookups[namespace] += 1
+            self._hits_at.setdefault(namespace, Counter()).update(step for step in THRESHOLD_STEPS if score >= step)
+            if index is None or score < self.threshold:
+                return None
+            self.hits[namespace] += 1
+            response = self._responses[partition][index]
+        logger.info(f"Semantischer Cache-Treffer für {namespace} (Ähnlichkeit {score:.3f})")
+        return response
+
+    def add(self, partition: str, text: str, embedding: List[float], response: str):
+        """Legt eine Antwort ab und verdrängt bei Bedarf die ältesten Einträge der Partition"""
+        vector = normalize(np.asarray([embedding], dtype=np.float32))
+        text_hash = self._hash(text)
+        with self._lock:
+            matrix = self._load(partition)
+            if text_hash in self._hashes[partition]:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO semantic_cache VALUES (?, ?, ?, ?, ?)",
+                (partition, text_hash, vector[0].tobytes(), response, time.time())
+            )
+            self._matrices[partition] = np.vstack([matrix, vector]) if len(matrix) else vector
+            self._hashes[partition].append(text_hash)
+            self._responses[partition].append(response)
+
+            overflow = len(self._hashes[partition]) - self.max_entries
+            if self.max_entries and overflow > 0:
+                self._conn.executemany(
+                    "DELETE FROM semantic_cache WHERE partition = ? AND text_hash = ?",
+                    [(partition, evicted) for evicted in self._hashes[partition][:overflow]]
+                )
+                self._matrices[partition] = self._matrices[partition][overflow:]
+                self._hashes[partition] = self._hashes[partition][overflow:]
+                self._responses[partition] = self._responses[partition][overflow:]
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Trefferquote pro Namespace und die Quote, die andere Schwellwerte ergeben hätten"""
+        with self._lock:
+            stats = {}
+            for namespace, lookups in self.lookups.items():
+                hits_at = self._hits_at[namespace]
+                stats[namespace] = {
+                    "lookups": lookups,
+                    "hits": self.hits[namespace],
+                    "hit_rate": round(self.hits[namespace] / lookups, 3),
+                    "threshold": self.threshold,
+                    "hit_rate_at": {step: round(hits_at[step] / lookups, 3) for step in THRESHOLD_STEPS}
+                }
+            return stats
+
+# Prozessweite Instanz; None, wenn der semantische Cache deaktiviert ist
+_cache = None
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Gibt die Singleton-Instanz des semantischen Caches zurück (None mit LLM_SEMANTIC_CACHE=false)."""
+    global _cache
+    if _cache is None and os.getenv("LLM_SEMANTIC_CACHE", "false").lower() == "true":
+        _cache = SemanticCache(
+            path=os.getenv("LLM_SEMANTIC_CACHE_PATH", "semantic_cache.sqlite3"),
+            threshold=float(os.getenv("LLM_SEMANTIC_THRESHOLD", "0.95")),
+            max_entries=int(os.getenv("LLM_SEMANTIC_MAX_ENTRIES", "5000")),
+            embedding_model=os.getenv("LLM_EMBEDDING_MODEL", "text-embedding-3-small")
+        )
+    return _cache
@@ -4,12 +4,15 @@ from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
 import os.path
 import json
+import threading
 from config import *
 
 class SheetsManager:
     def __init__(self):
         self.creds = None
         self.service = None
+        # Die Versand-Callbacks schreiben aus einem anderen Thread; der HTTP-Client ist nicht threadsicher
+        self._lock = threading.Lock()
         self.setup_credentials()
         
     def setup_credentials(self):
@@ -52,22 +55,46 @@ class SheetsManager:
             'values': values
         }
         
-        result = self.service.spreadsheets().values().append(
-            spreadsheetId=SPREADSHEET_ID,
-            range=f'{LEADS_SHEET_NAME}!A:I',
-            valueInputOption='RAW',
-            insertDataOption='INSERT_ROWS',
-            body=body
-        ).execute()
+        with self._lock:
+            result = self.service.spreadsheets().values().append(
+                spreadsheetId=SPREADSHEET_ID,
+                range=f'{LEADS_SHEET_NAME}!A:I',
+                valueInputOption='RAW',
+                insertDataOption='INSERT_ROWS',
+                body=body
+            ).execute()
         
         return result
         
+    def update_lead_status(self, email: str, status: str) -> bool:
+        """Setzt den Status (Spalte I) des Leads; False, wenn die E-Mail nicht in der Tabelle steht"""
+        with self._lock:
+            result = self.service.spreadsheets().values().get(
+                spreadsheetId=SPREADSHEET_ID,
+                range=f'{LEADS_SHEET_NAME}!A:A'
+            ).execute()
+            
+            rows = result.get('values', [])
+            # Die jüngste Zeile des Leads, falls er mehrfach eingetragen wurde
+            for index in range(len(rows) - 1, 0, -1):
+                if rows[index] and rows[index][0] == email:
+                    self.service.spreadsheets().values().update(
+                        spreadsheetId=SPREADSHEET_ID,
+                        range=f'{LEADS_SHEET_NAME}!I{index + 1}',
+                        valueInputOption='RAW',
+                        body={'values': [[status]]}
+                    ).execute()
+                    return True
+                    
+        return False
+        
     def get_all_leads(self):
         """Holt alle Leads aus der Google Sheet"""
-        result = self.service.spreadsheets().values().get(
-            spreadsheetId=SPREADSHEET_ID,
-            range=f'{LEADS_SHEET_NAME}!A:I'
-        ).execute()
+        with self._lock:
+            result = self.service.spreadsheets().values().get(
+                spreadsheetId=SPREADSHEET_ID,
+                range=f'{LEADS_SHEET_NAME}!A:I'
+            ).execute()
         
         values = result.get('values', [])
         if not values:
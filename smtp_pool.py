@@ -0,0 +1,176 @@
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+logger = logging.getLogger(__name__)
+
+# Fehler, nach denen die Verbindung verworfen und der Versand einmal neu versucht wird
+DISCONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionResetError, BrokenPipeError)
+
+def build_message(sender: str, to_email: str, subject: str, body: str) -> MIMEMultipart:
+    """Baut eine einfache Text-E-Mail"""
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    return msg
+
+class SMTPPool:
+    """Hält angemeldete SMTP-Sitzungen offen und verschickt viele Nachrichten pro Sitzung.
+
+    STARTTLS und Login kosten oft mehr Zeit als der Versand selbst; eine Sitzung
+    wird deshalb nach jeder Nachricht in den Pool zurückgelegt. Bis zu size
+    Sitzungen sind gleichzeitig offen. Eine Sitzung wird nach max_messages
+    Nachrichten (Provider-Limits pro Verbindung) oder nach idle_timeout Sekunden
+    ohne Versand geschlossen; trennt der Server trotzdem, wird neu verbunden und
+    die Nachricht einmal wiederholt.
+    """
+
+    def __init__(self, host: str, port: int, username: Optional[str], password: Optional[str],
+                 size: int = 2, max_messages: int = 100, idle_timeout: float = 240.0, timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        # Freie Sitzungen als (SMTP, gesendete Nachrichten, letzter Versand)
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.counts = Counter()
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            self._close(server)
+            raise
+        with self._lock:
+            self.counts["connections"] += 1
+        return server
+
+    @staticmethod
+    def _close(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _checkout(self) -> Tuple[smtplib.SMTP, int]:
+        """Gibt eine freie, nicht abgelaufene Sitzung zurück oder öffnet eine neue"""
+        while True:
+            try:
+                server, sent, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect(), 0
+            if time.monotonic() - last_used < self.idle_timeout:
+                return server, sent
+            self._close(server)
+
+    def _checkin(self, server: smtplib.SMTP, sent: int):
+        if sent >= self.max_messages:
+            self._close(server)
+        else:
+            self._idle.put((server, sent, time.monotonic()))
+
+    @contextmanager
+    def session(self):
+        """Leiht eine angemeldete Sitzung aus; sie wird danach wiederverwendet"""
+        with self._slots:
+            server, sent = self._checkout()
+            try:
+                yield server
+            except smtplib.SMTPRecipientsRefused:
+                # Abgelehnte Empfänger setzt smtplib zurück, die Sitzung bleibt nutzbar
+                self._checkin(server, sent + 1)
+                raise
+            except BaseException:
+                # Nach einem Fehler ist der Zustand der Sitzung unklar
+                self._close(server)
+                raise
+            self._checkin(server, sent + 1)
+
+    def send(self, msg: MIMEMultipart):
+        """Verschickt eine Nachricht; Fehler werden an den Aufrufer weitergegeben"""
+        for attempt in range(2):
+            try:
+                with self.session() as server:
+                    server.send_message(msg)
+                with self._lock:
+                    self.counts["sent"] += 1
+                return
+            except DISCONNECT_ERRORS as e:
+                if attempt == 1:
+                    raise
+                with self._lock:
+                    self.counts["reconnects"] += 1
+                # Die übrigen freien Sitzungen hat der Server meist gleichzeitig getrennt
+                self.close()
+                logger.warning(f"SMTP-Verbindung getrennt, verbinde neu: {type(e).__name__}")
+
+    def send_many(self, messages: List[MIMEMultipart]) -> List[Any]:
+        """Verschickt mehrere Nachrichten über die offenen Sitzungen.
+
+        Gibt pro Nachricht True oder die aufgetretene Exception zurück, damit
+        eine abgelehnte Adresse den Rest nicht abbricht.
+        """
+        def send_one(msg):
+            try:
+                self.send(msg)
+                return True
+            except Exception as e:
+                logger.error(f"Fehler beim Senden der E-Mail an {msg['To']}: {str(e)}")
+                return e
+
+        if len(messages) <= 1 or self.size == 1:
+            return [send_one(msg) for msg in messages]
+        with ThreadPoolExecutor(max_workers=min(self.size, len(messages))) as executor:
+            return list(executor.map(send_one, messages))
+
+    def close(self):
+        """Schließt alle freien Sitzungen"""
+        while True:
+            try:
+                server, _, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(server)
+
+    def stats(self) -> Dict[str, int]:
+        """Geöffnete Verbindungen, gesendete Nachrichten und Neuverbindungen"""
+        with self._lock:
+            return dict(self.counts)
+
+# Prozessweiter Pool, den sich EmailManager und LeadProcessor teilen
+_pool = None
+
+def get_smtp_pool() -> SMTPPool:
+    """Gibt die Singleton-Instanz des SMTP-Pools zurück."""
+    global _pool
+    if _pool is None:
+        _pool = SMTPPool(
+            host=os.getenv("SMTP_SERVER", "smtp.gmail.com"),
+            port=int(os.getenv("SMTP_PORT", "587")),
+            username=os.getenv("EMAIL_USERNAME"),
+            password=os.getenv("EMAIL_PASSWORD"),
+            size=int(os.getenv("SMTP_POOL_SIZE", "2")),
+            max_messages=int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100")),
+            idle_timeout=float(os.getenv("SMTP_IDLE_TIMEOUT", "240"))
+        )
+    return _pool
@@ -0,0 +1,212 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import ast
+import json
+import re
+
+# JSON-Modus der Chat-Completions-API: das Modell antwortet garantiert mit einem JSON-Objekt
+JSON_MODE = {"type": "json_object"}
+
+# Typografische Anführungszeichen, die Modelle gelegentlich statt " als Begrenzer ausgeben
+SMART_QUOTES = ("“", "”", "„")
+
+class SchemaField:
+    """Ein Feld der erwarteten Antwort: Text oder Liste von Texten"""
+
+    def __init__(self, kind: type, description: str = "", required: bool = True):
+        self.kind = kind
+        self.description = description
+        self.required = required
+
+    def coerce(self, value: Any) -> Any:
+        """Bringt einen Wert in den erwarteten Typ oder gibt None zurück, wenn das nicht sinnvoll geht"""
+        if self.kind is list:
+            if isinstance(value, list):
+                return [str(item) for item in value if item not in (None, "")]
+            if isinstance(value, str):
+                return [part.strip() for part in re.split(r"[\n;]", value) if part.strip()]
+            return None
+        if isinstance(value, str):
+            return value
+        if isinstance(value, (int, float, bool)):
+            return str(value)
+        if isinstance(value, list) and all(isinstance(item, str) for item in value):
+            return ", ".join(value)
+        return None
+
+class Schema:
+    """Kompakte Beschreibung einer JSON-Antwort mit Prüfung und Typkorrektur"""
+
+    def __init__(self, fields: Dict[str, SchemaField]):
+        self.fields = fields
+
+    @classmethod
+    def from_pydantic(cls, model) -> "Schema":
+        """Übernimmt Felder und Beschreibungen eines Pydantic-Modells (v1 und v2)"""
+        fields = {}
+        model_fields = getattr(model, "model_fields", None) or model.__fields__
+        for name, field in model_fields.items():
+            info = getattr(field, "field_info", field)
+            # v1 (ModelField) liefert Typ ohne Optional und allow_none, v2 (FieldInfo) die Annotation
+            annotation = getattr(field, "outer_type_", None) or field.annotation
+            optional = getattr(field, "allow_none", None)
+            if optional is None:
+                optional = type(None) in getattr(annotation, "__args__", ())
+            is_list = getattr(annotation, "__origin__", None) is list or annotation is list
+            fields[name] = SchemaField(list if is_list else str, info.description or "", required=not optional)
+        return cls(fields)
+
+    def describe(self, names: Optional[Iterable[str]] = None) -> str:
+        """Eine Zeile pro Feld, deutlich kürzer als die Pydantic-Formatanweisungen"""
+        lines = []
+        for name in names or self.fields:
+            field = self.fields[name]
+            kind = "Liste von Texten" if field.kind is list else "Text"
+            optional = ", optional" if not field.required else ""
+            lines.append(f"- {name} ({kind}{optional}): {field.description}")
+        return "\n".join(lines)
+
+    def check(self, data: Any, names: Optional[Iterable[str]] = None) -> Tuple[Dict[str, Any], List[str]]:
+        """Gibt (gültige Felder, fehlende oder ungültige Felder) zurück"""
+        names = list(names or self.fields)
+        if not isinstance(data, dict):
+            return {}, [name for name in names if self.fields[name].required]
+
+        valid, failed = {}, []
+        for name in names:
+            field = self.fields[name]
+            value = data.get(name)
+            if value in (None, "", []):
+                if field.required:
+                    failed.append(name)
+                else:
+                    valid[name] = None
+                continue
+            coerced = field.coerce(value)
+            if coerced is None:
+                failed.append(name)
+            else:
+                valid[name] = coerced
+        return valid, failed
+
+    def is_complete(self, text: str, names: Optional[Iterable[str]] = None) -> bool:
+        """True, wenn der Text ohne Reparatur alle Pflichtfelder im erwarteten Typ enthält"""
+        try:
+            data = json.loads(text)
+        except (TypeError, ValueError):
+            return False
+        valid, failed = self.check(data, names)
+        return not failed and all(data.get(name) == value for name, value in valid.items())
+
+# Nach einem schließenden Anführungszeichen folgt :, Komma, } oder ] bzw. das Ende der Antwort
+_CLOSES_STRING = re.compile(r"\s*(?:[:,}\]]|$)")
+
+def _normalize_quotes(text: str) -> str:
+    """Ersetzt typografische Anführungszeichen durch ", wo sie Schlüssel oder Werte begrenzen.
+
+    Außerhalb eines Strings öffnet jedes Anführungszeichen einen String. Innerhalb
+    schließt ein typografisches ihn nur, wenn danach :, Komma, } oder ] folgt;
+    sonst ist es Teil des Textes (z.B. „Zitat“ in einer deutschen Antwort) und
+    bleibt unverändert.
+    """
+    chars = []
+    in_string = False
+    escaped = False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            elif char in SMART_QUOTES:
+                if _CLOSES_STRING.match(text, i + 1):
+                    char = '"'
+                    in_string = False
+        elif char in SMART_QUOTES:
+            char = '"'
+            in_string = True
+        elif char == '"':
+            in_string = True
+        chars.append(char)
+    return "".join(chars)
+
+def _outside_strings(text: str, rewrite) -> str:
+    """Wendet rewrite nur auf die Teile an, die nicht in einem JSON-String stehen"""
+    parts = re.split(r'("(?:\\.|[^"\\])*(?:"|$))', text)
+    return "".join(part if i % 2 else rewrite(part) for i, part in enumerate(parts))
+
+def _fix_literals(text: str) -> str:
+    text = re.sub(r",\s*([}\]])", r"\1", text)
+    text = re.sub(r"([:\[,]\s*)True\b", r"\1true", text)
+    text = re.sub(r"([:\[,]\s*)False\b", r"\1false", text)
+    return re.sub(r"([:\[,]\s*)None\b", r"\1null", text)
+
+def _close_truncated(text: str) -> str:
+    """Schließt offene Strings, Objekte und Listen einer abgeschnittenen Antwort"""
+    stack = []
+    in_string = False
+    escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+
+    if in_string:
+        text += '"'
+    text = re.sub(r"[,:]\s*$", "", text.rstrip())
+    # Ein Schlüssel ohne Wert am Ende eines Objekts wird verworfen
+    if stack and stack[-1] == "}":
+        text = re.sub(r',\s*"[^"]*"\s*$', "", text)
+    return text + "".join(reversed(stack))
+
+def repair_json(text: str) -> Optional[Any]:
+    """Repariert fast gültiges JSON lokal: Codeblöcke, Begleittext, typografische
+    Anführungszeichen, überzählige Kommas, Python-Literale und abgeschnittene Antworten"""
+    if not text:
+        return None
+    candidate = text.strip()
+
+    fenced = re.search(r"```(?:json)?\s*(.*?)(?:```|$)", candidate, re.S)
+    if fenced:
+        candidate = fenced.group(1).strip()
+
+    starts = [i for i in (candidate.find("{"), candidate.find("[")) if i >= 0]
+    if not starts:
+        return None
+    candidate = candidate[min(starts):]
+
+    # Texte in Strings bleiben unverändert, auch Anführungszeichen, Kommas und True/None darin
+    candidate = _outside_strings(_normalize_quotes(candidate), _fix_literals)
+
+    decoder = json.JSONDecoder()
+    for attempt in (candidate, _close_truncated(candidate)):
+        try:
+            # raw_decode ignoriert Text nach dem ersten vollständigen Wert
+            return decoder.raw_decode(attempt)[0]
+        except ValueError:
+            pass
+
+    # Python-Dict-Schreibweise mit einfachen Anführungszeichen
+    try:
+        value = ast.literal_eval(candidate)
+        return value if isinstance(value, (dict, list)) else None
+    except (ValueError, SyntaxError):
+        return None
+
+def parse_json(text: str) -> Optional[Any]:
+    """Parst eine LLM-Antwort als JSON und repariert sie bei Bedarf lokal"""
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        return repair_json(text)
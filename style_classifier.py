@@ -0,0 +1,251 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import logging
+import os
+import re
+from collections import Counter
+import numpy as np
+from llm_cache import LLMCache, get_llm_cache
+from structured_output import parse_json
+
+logger = logging.getLogger(__name__)
+
+# Namespaces im LLM-Cache, deren Antworten einen Kommunikationsstil zu Lead-Daten enthalten
+LABEL_NAMESPACES = ("communication_style", "communication_analysis", "fused_style_email", "fused_analysis")
+
+# Muster pro Klasse; gewählt wird die Klasse, deren Muster in der LLM-Antwort zuerst vorkommt
+LABEL_PATTERNS = {
+    "formality": {
+        "formell": r"(?<!in)form(?:ell|al)|förmlich|siez",
+        "informell": r"informell|informal|nicht form|locker|lässig|duz"
+    },
+    "directness": {
+        "direkt": r"(?<!in)direkt|geradlinig|auf den punkt",
+        "indirekt": r"indirekt|nicht direkt|zurückhaltend|diplomatisch"
+    },
+    "tone": {
+        "sachlich": r"sachlich|professionell|neutral|nüchtern",
+        "freundlich": r"freundlich|herzlich|warm|verbindlich|empathisch",
+        "begeistert": r"enthusias|begeister|energiegeladen|motivierend|inspirierend|leidenschaft",
+        "analytisch": r"analytisch|datengetrieben|faktenbasiert|technisch|detailorientiert"
+    }
+}
+HEADS = tuple(LABEL_PATTERNS)
+
+# Wörter mit mindestens zwei Zeichen, Umlaute inklusive
+TOKEN = re.compile(r"\w{2,}")
+
+def _match_label(text: str, head: str) -> Optional[str]:
+    positions = {}
+    for label, pattern in LABEL_PATTERNS[head].items():
+        match = re.search(pattern, text)
+        if match:
+            positions[label] = match.start()
+    return min(positions, key=positions.get) if positions else None
+
+def extract_labels(response: str) -> Dict[str, str]:
+    """Liest Förmlichkeit, Direktheit und Tonfall aus einer gecachten Stilanalyse (Freitext oder JSON)"""
+    data = parse_json(response) if response.lstrip().startswith(("{", "`")) else None
+    if isinstance(data, dict):
+        style = str(data.get("style") or data.get("communication_style") or "")
+        tone = str(data.get("tone") or style)
+    else:
+        style = tone = response
+    sources = {"formality": style.lower(), "directness": style.lower(), "tone": tone.lower()}
+    labels = {head: _match_label(text, head) for head, text in sources.items()}
+    return {head: label for head, label in labels.items() if label}
+
+def describe_style(prediction: Dict[str, Any]) -> str:
+    """Kurzbeschreibung einer Vorhersage, wie sie der E-Mail-Prompt als Kommunikationsstil erhält"""
+    return f"{prediction['formality']}, {prediction['directness']}, Tonfall {prediction['tone']}"
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+class StyleClassifier:
+    """Lokaler Klassifikator für den Kommunikationsstil: TF-IDF und ein lineares Modell pro Merkmal.
+
+    Eingabe sind dieselben kompakten Lead-Daten, die der Stil-Prompt erhält
+    (Headline, Position, About-Text, ...). Ein Batch ist ein Matrixprodukt, also
+    Millisekunden statt eines LLM-Aufrufs pro Lead. classify gibt None zurück,
+    wenn die Wahrscheinlichkeit eines Merkmals unter min_confidence liegt; der
+    Aufrufer fragt dann das LLM.
+    """
+
+    def __init__(self, vocabulary: Sequence[str], idf: np.ndarray, heads: Dict[str, Dict[str, np.ndarray]],
+                 min_confidence: float = 0.8):
+        self.vocabulary = {term: index for index, term in enumerate(vocabulary)}
+        self.idf = idf
+        self.heads = heads
+        self.min_confidence = min_confidence
+        self.counts = Counter()
+
+    @staticmethod
+    def _tokens(text: str) -> List[str]:
+        return TOKEN.findall(text.lower())
+
+    def transform(self, texts: Sequence[str]) -> np.ndarray:
+        """TF-IDF-Matrix mit logarithmischer Termfrequenz, zeilenweise auf Länge 1 normiert"""
+        matrix = np.zeros((len(texts), len(self.vocabulary)), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for term, count in Counter(self._tokens(text)).items():
+                index = self.vocabulary.get(term)
+                if index is not None:
+                    matrix[row, index] = 1 + np.log(count)
+        matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+    @classmethod
+    def fit(cls, texts: Sequence[str], labels: Sequence[Dict[str, str]], max_features: int = 5000,
+            epochs: int = 300, learning_rate: float = 5.0, l2: float = 1e-4,
+            min_confidence: float = 0.8) -> "StyleClassifier":
+        """Trainiert Vokabular, IDF und eine Softmax-Regression pro Merkmal.
+
+        Ein Beispiel geht nur in die Merkmale ein, für die es ein Label hat.
+        """
+        documents = [set(cls._tokens(text)) for text in texts]
+        frequency = Counter(term for document in documents for term in document)
+        vocabulary = sorted(term for term, _ in frequency.most_common(max_features))
+        idf = np.array([np.log((1 + len(texts)) / (1 + frequency[term])) + 1 for term in vocabulary], dtype=np.float32)
+        classifier = cls(vocabulary, idf, {}, min_confidence)
+        features = classifier.transform(texts)
+
+        for head in HEADS:
+            rows = [i for i, label in enumerate(labels) if head in label]
+            classes = sorted({labels[i][head] for i in rows})
+            if len(classes) < 2:
+                raise ValueError(f"Merkmal {head}: zu wenige Klassen in den Trainingsdaten ({', '.join(classes) or 'keine'})")
+            x = features[rows]
+            targets = np.eye(len(classes), dtype=np.float32)[[classes.index(labels[i][head]) for i in rows]]
+            weights = np.zeros((x.shape[1], len(classes)), dtype=np.float32)
+            bias = np.zeros(len(classes), dtype=np.float32)
+            for _ in range(epochs):
+                gradient = (_softmax(x @ weights + bias) - targets) / len(rows)
+                weights -= learning_rate * (x.T @ gradient + l2 * weights)
+                bias -= learning_rate * gradient.sum(axis=0)
+            classifier.heads[head] = {"classes": np.array(classes), "weights": weights, "bias": bias}
+        return classifier
+
+    def predict(self, texts: Sequence[str]) -> List[Dict[str, Any]]:
+        """Label pro Merkmal und die kleinste Wahrscheinlichkeit der Merkmale als confidence"""
+        features = self.transform(texts)
+        predictions = [{} for _ in texts]
+        confidence = np.ones(len(texts), dtype=np.float32)
+        for head, model in self.heads.items():
+            probabilities = _softmax(features @ model["weights"] + model["bias"])
+            best = probabilities.argmax(axis=1)
+            confidence = np.minimum(confidence, probabilities[np.arange(len(texts)), best])
+            for prediction, index in zip(predictions, best):
+                prediction[head] = str(model["classes"][index])
+        for prediction, value in zip(predictions, confidence):
+            prediction["confidence"] = round(float(value), 3)
+        return predictions
+
+    def classify(self, texts: Sequence[str]) -> List[Optional[Dict[str, Any]]]:
+        """Wie predict, aber None für Vorhersagen unter min_confidence"""
+        results = []
+        for prediction in self.predict(texts):
+            confident = prediction["confidence"] >= self.min_confidence
+            self.counts["local" if confident else "fallback"] += 1
+            results.append(prediction if confident else None)
+        return results
+
+    def evaluate(self, texts: Sequence[str], labels: Sequence[Dict[str, str]]) -> Dict[str, float]:
+        """Trefferquote pro Merkmal sowie Anteil und Trefferquote der Vorhersagen über min_confidence"""
+        predictions = self.predict(texts)
+        report = {}
+        for head in HEADS:
+            pairs = [(p[head], l[head]) for p, l in zip(predictions, labels) if head in l]
+            report[f"{head}_accuracy"] = round(sum(a == b for a, b in pairs) / len(pairs), 3) if pairs else 0.0
+        confident = [i for i, p in enumerate(predictions) if p["confidence"] >= self.min_confidence]
+        correct = [i for i in confident if all(predictions[i][h] == labels[i].get(h, predictions[i][h]) for h in HEADS)]
+        report["coverage"] = round(len(confident) / len(texts), 3) if texts else 0.0
+        report["confident_accuracy"] = round(len(correct) / len(confident), 3) if confident else 0.0
+        return report
+
+    def save(self, path: str):
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        arrays = {"vocabulary": np.array(terms), "idf": self.idf}
+        for head, model in self.heads.items():
+            arrays.update({f"{head}_{name}": value for name, value in model.items()})
+        with open(path, "wb") as file:
+            np.savez(file, **arrays)
+
+    @classmethod
+    def load(cls, path: str, min_confidence: float = 0.8) -> "StyleClassifier":
+        with np.load(path, allow_pickle=False) as data:
+            heads = {head: {name: data[f"{head}_{name}"] for name in ("classes", "weights", "bias")} for head in HEADS}
+            return cls(list(data["vocabulary"]), data["idf"], heads, min_confidence)
+
+    def stats(self) -> Dict[str, Any]:
+        """Lokal klassifizierte Leads und Rückfälle auf das LLM"""
+        total = sum(self.counts.values())
+        return {**self.counts, "local_rate": round(self.counts["local"] / total, 3) if total else 0.0}
+
+def training_data(cache: LLMCache) -> Tuple[List[str], List[Dict[str, str]]]:
+    """(Lead-Daten, Labels) aus den gecachten LLM-Stilanalysen"""
+    texts, labels = [], []
+    for _, inputs, response in cache.entries(LABEL_NAMESPACES):
+        text = inputs.get("lead_data") if isinstance(inputs, dict) else None
+        label = extract_labels(response)
+        if isinstance(text, str) and label:
+            texts.append(text)
+            labels.append(label)
+    return texts, labels
+
+def train_from_cache(cache: LLMCache, min_samples: int = 50, min_confidence: float = 0.8) -> Optional[StyleClassifier]:
+    """Trainiert den Klassifikator aus dem LLM-Cache; None bei zu wenigen gelabelten Leads.
+
+    Jedes fünfte Beispiel dient zunächst als Testmenge, deren Ergebnis geloggt
+    wird; das endgültige Modell lernt auf allen Beispielen.
+    """
+    texts, labels = training_data(cache)
+    if len(texts) < min_samples:
+        logger.info(f"Stil-Klassifikator nicht trainiert: {len(texts)} von {min_samples} gelabelten Leads im Cache")
+        return None
+    try:
+        held_out = set(range(0, len(texts), 5))
+        train = [i for i in range(len(texts)) if i not in held_out]
+        trial = StyleClassifier.fit([texts[i] for i in train], [labels[i] for i in train], min_confidence=min_confidence)
+        report = trial.evaluate([texts[i] for i in held_out], [labels[i] for i in held_out])
+        classifier = StyleClassifier.fit(texts, labels, min_confidence=min_confidence)
+    except ValueError as e:
+        logger.info(f"Stil-Klassifikator nicht trainiert: {str(e)}")
+        return None
+    logger.info(f"Stil-Klassifikator aus {len(texts)} Leads trainiert, Testmenge: {report}")
+    return classifier
+
+# Prozessweite Instanz; None, wenn der Klassifikator deaktiviert oder noch nicht trainierbar ist
+_classifier = None
+_loaded = False
+
+def _settings() -> Tuple[str, float]:
+    return (os.getenv("LLM_STYLE_CLASSIFIER_PATH", "style_classifier.npz"),
+            float(os.getenv("LLM_STYLE_CLASSIFIER_CONFIDENCE", "0.8")))
+
+def retrain_style_classifier() -> Optional[StyleClassifier]:
+    """Trainiert neu aus dem LLM-Cache, speichert das Modell und ersetzt die Singleton-Instanz"""
+    global _classifier, _loaded
+    path, min_confidence = _settings()
+    classifier = train_from_cache(get_llm_cache(), min_confidence=min_confidence)
+    if classifier is not None:
+        classifier.save(path)
+        _classifier, _loaded = classifier, True
+    return classifier
+
+def get_style_classifier() -> Optional[StyleClassifier]:
+    """Gibt die Singleton-Instanz zurück (None mit LLM_STYLE_CLASSIFIER=false).
+
+    Ohne gespeichertes Modell wird beim ersten Aufruf aus dem LLM-Cache trainiert.
+    """
+    global _classifier, _loaded
+    if not _loaded and os.getenv("LLM_STYLE_CLASSIFIER", "false").lower() == "true":
+        _loaded = True
+        path, min_confidence = _settings()
+        if os.path.exists(path):
+            _classifier = StyleClassifier.load(path, min_confidence)
+        else:
+            retrain_style_classifier()
+    return _classifier
@@ -0,0 +1,125 @@
+from typing import Dict, List, Optional
+import hashlib
+import logging
+import os
+import re
+from collections import Counter
+from llm_client import LLMClient, get_llm_client
+from model_router import ModelRouter, get_model_router
+from prompt_registry import get_prompt
+from token_counter import count_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Satzgrenzen, an denen bevorzugt geschnitten wird
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Höchstens so viele Verdichtungsrunden, falls auch die Teilzusammenfassungen zu lang sind
+MAX_ROUNDS = 3
+
+# Länge, auf die ein Abschnitt gekürzt wird, wenn seine Zusammenfassung fehlschlägt
+FALLBACK_TOKENS = 200
+
+def chunk_text(text: str, chunk_tokens: int, model: str = "gpt-3.5-turbo") -> List[str]:
+    """Teilt einen Text in Abschnitte von höchstens chunk_tokens Tokens, möglichst an Satzgrenzen"""
+    pieces = []
+    for sentence in SENTENCE_END.split(" ".join(text.split())):
+        # Überlange "Sätze" (z.B. Navigationslisten ohne Satzzeichen) werden wortweise verteilt
+        pieces.extend(sentence.split(" ") if count_tokens(sentence, model) > chunk_tokens else [sentence])
+
+    chunks, current, current_tokens = [], [], 0
+    for piece in pieces:
+        tokens = count_tokens(piece, model) + 1
+        if current and current_tokens + tokens > chunk_tokens:
+            chunks.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+class MapReduceSummarizer:
+    """Verdichtet lange Seiten, statt sie hart abzuschneiden.
+
+    Texte bis max_tokens bleiben unverändert. Längere Texte werden in Abschnitte
+    von chunk_tokens zerlegt, die gleichzeitig unter dem gemeinsamen Rate-Limit
+    zusammengefasst werden (map). Die Teilzusammenfassungen werden aneinander-
+    gehängt (reduce); die anschließende Analyse arbeitet auf diesem Ergebnis.
+    Sind sie zusammen noch zu lang, folgt eine weitere Runde. Jede Abschnitts-
+    zusammenfassung wird unter dem Hash des Abschnitts gecacht.
+    """
+
+    def __init__(self, llm_client: LLMClient, router: Optional[ModelRouter] = None,
+                 max_tokens: int = 3000, chunk_tokens: int = 1500, temperature: float = 0.3):
+        self.llm_client = llm_client
+        self.router = router or get_model_router()
+        self.max_tokens = max_tokens
+        self.chunk_tokens = chunk_tokens
+        self.temperature = temperature
+        self.model = self.router.model_for("chunk_summary")
+        self.counts = Counter()
+
+    def _chunk_request(self, source: str, chunk: str) -> Dict:
+        chunk_hash = hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+        return self.router.request(
+            get_prompt("chunk_summary"), {"source": source, "chunk": chunk}, self.temperature,
+            cache_inputs={"source": source, "chunk": chunk_hash}
+        )
+
+    async def _amap(self, text: str, source: str, depth: int) -> str:
+        chunks = chunk_text(text, self.chunk_tokens, self.model)
+        summaries = await self.llm_client.gather(
+            [self.llm_client.acomplete(**self._chunk_request(source, chunk)) for chunk in chunks],
+            return_exceptions=True
+        )
+        partials = []
+        for chunk, summary in zip(chunks, summaries):
+            if isinstance(summary, Exception):
+                logger.warning(f"Zusammenfassung eines Abschnitts fehlgeschlagen: {str(summary)}")
+                summary = truncate_tokens(chunk, FALLBACK_TOKENS, self.model)
+            partials.append(summary.strip())
+        self.counts["chunks"] += len(chunks)
+
+        combined = "\n".join(partials)
+        if depth < MAX_ROUNDS and count_tokens(combined, self.model) > self.max_tokens:
+            return await self._amap(combined, source, depth + 1)
+        return combined
+
+    async def acondense(self, text: str, source: str = "Website") -> str:
+        """Gibt kurze Texte unverändert und lange Texte als Zusammenfassung der Abschnitte zurück"""
+        tokens = count_tokens(text, self.model)
+        if tokens <= self.max_tokens:
+            return text
+        summary = await self._amap(text, source, 1)
+        self.counts["condensed"] += 1
+        logger.info(f"{source} mit {tokens} Tokens auf {count_tokens(summary, self.model)} Tokens verdichtet")
+        return summary
+
+    def condense(self, text: str, source: str = "Website") -> str:
+        """Blockierende Variante von acondense"""
+        if count_tokens(text, self.model) <= self.max_tokens:
+            return text
+        return self.llm_client.run(self.acondense(text, source))
+
+    def stats(self) -> Dict[str, int]:
+        """Verdichtete Texte und zusammengefasste Abschnitte"""
+        return dict(self.counts)
+
+# Prozessweite Instanz mit dem gemeinsamen LLM-Client
+_summarizer = None
+
+def get_summarizer(llm_client: Optional[LLMClient] = None) -> MapReduceSummarizer:
+    """Gibt die Singleton-Instanz zurück; mit eigenem LLM-Client eine neue Instanz mit denselben Einstellungen."""
+    global _summarizer
+    shared = llm_client is None
+    if shared and _summarizer is not None:
+        return _summarizer
+    summarizer = MapReduceSummarizer(
+        llm_client or get_llm_client(),
+        max_tokens=int(os.getenv("LLM_SUMMARY_MAX_TOKENS", "3000")),
+        chunk_tokens=int(os.getenv("LLM_SUMMARY_CHUNK_TOKENS", "1500"))
+    )
+    if shared:
+        _summarizer = summarizer
+    return summarizer
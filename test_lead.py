@@ -16,8 +16,8 @@ def test_lead_processing():
     
     try:
         # Initialisiere die Komponenten
-        lead_processor = LeadProcessor()
         sheets_manager = SheetsManager()
+        lead_processor = LeadProcessor(sheets_manager)
         
         # Verarbeite den Lead
         print("Verarbeite Test-Lead...")
@@ -27,6 +27,10 @@ def test_lead_processing():
         print("Speichere in Google Sheets...")
         sheets_manager.append_lead(processed_lead)
         
+        # Versende die E-Mail
+        print("Reihe E-Mail zum Versand ein...")
+        lead_processor.deliver(processed_lead)
+        
         print("Test erfolgreich abgeschlossen!")
         print("\nVerarbeiteter Lead:")
         print(json.dumps(processed_lead, indent=2, ensure_ascii=False))
@@ -0,0 +1,23 @@
+import os
+import sys
+import tempfile
+
+# config.py bricht ohne diese Variablen ab; die Tests sprechen keine echten Dienste an
+for key in ("OPENAI_API_KEY", "APIFY_API_KEY", "APIFY_ACTOR_ID", "APIFY_DATASET_URL",
+            "SPREADSHEET_ID", "EMAIL_USERNAME", "EMAIL_PASSWORD"):
+    os.environ.setdefault(key, "test")
+
+# Caches, Ausgangsbox und Prozessliste nicht im Repository anlegen
+_runtime = tempfile.mkdtemp(prefix="lead_tests_")
+for key, name in (("LLM_CACHE_PATH", "llm_cache.sqlite3"), ("LLM_SEMANTIC_CACHE_PATH", "semantic_cache.sqlite3"),
+                  ("MAIL_OUTBOX_PATH", "mail_outbox.sqlite3"), ("BROWSER_PROCESS_DB", "browser_processes.sqlite3"),
+                  ("LLM_BATCH_DIR", "llm_batches"), ("LLM_CASSETTE_PATH", "llm_cassette.jsonl"),
+                  ("LLM_STYLE_CLASSIFIER_PATH", "style_classifier.npz")):
+    os.environ[key] = os.path.join(_runtime, name)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Mock-Server der Lasttests
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+# config.py prüft credentials.json relativ zum Arbeitsverzeichnis
+os.chdir(ROOT)
@@ -0,0 +1,92 @@
+import shutil
+import subprocess
+import sys
+import psutil
+import pytest
+import browser_supervisor
+from browser_supervisor import BrowserRegistry, reap_orphaned_browsers
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    registry = BrowserRegistry(str(tmp_path / "browser_processes.sqlite3"))
+    monkeypatch.setattr(browser_supervisor, "_registry", registry)
+    return registry
+
+@pytest.fixture
+def spawn(tmp_path):
+    """Startet Prozesse, die wie ein Browser heißen"""
+    fake = tmp_path / "chromedriver"
+    shutil.copy(shutil.which("sleep"), fake)
+    started = []
+
+    def start():
+        process = subprocess.Popen([str(fake), "60"])
+        started.append(process)
+        return process
+
+    yield start
+    for process in started:
+        process.kill()
+        process.wait()
+
+def owner_entry(process: psutil.Process):
+    return process.pid, process.create_time()
+
+def insert(registry, browser, owner, source="selenium"):
+    child = psutil.Process(browser.pid)
+    registry._conn.execute(
+        "INSERT INTO browser_processes VALUES (?, ?, ?, ?, ?)",
+        (child.pid, child.create_time(), *owner, source)
+    )
+    registry._conn.commit()
+
+def test_unregistered_browser_is_never_killed(registry, spawn):
+    browser = spawn()
+    assert reap_orphaned_browsers() == 0
+    assert browser.poll() is None
+
+def test_browser_of_exited_owner_is_killed(registry, spawn):
+    owner = subprocess.Popen([sys.executable, "-c", "pass"])
+    owner_info = owner_entry(psutil.Process(owner.pid))
+    owner.wait()
+    browser = spawn()
+    insert(registry, browser, owner_info)
+
+    assert reap_orphaned_browsers() == 1
+    assert browser.wait(timeout=5) != 0
+    assert registry.entries() == []
+
+def test_browser_of_running_instance_is_kept(registry, spawn):
+    owner = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    try:
+        browser = spawn()
+        insert(registry, browser, owner_entry(psutil.Process(owner.pid)))
+        assert reap_orphaned_browsers() == 0
+        assert browser.poll() is None
+    finally:
+        owner.kill()
+        owner.wait()
+
+def test_own_unsupervised_selenium_process_is_killed(registry, spawn):
+    selenium = spawn()
+    playwright = spawn()
+    registry.register([psutil.Process(selenium.pid)])
+    registry.register([psutil.Process(playwright.pid)], source="playwright")
+
+    assert reap_orphaned_browsers() == 1
+    assert selenium.wait(timeout=5) != 0
+    assert playwright.poll() is None
+
+def test_exited_processes_are_forgotten(registry, spawn):
+    browser = spawn()
+    registry.register([psutil.Process(browser.pid)], source="playwright")
+    browser.kill()
+    browser.wait()
+    reap_orphaned_browsers()
+    assert registry.entries() == []
+
+def test_rss_counts_every_process_once(spawn):
+    browser = psutil.Process(spawn().pid)
+    single = browser_supervisor.processes_rss_mb([browser])
+    assert single > 0
+    assert browser_supervisor.processes_rss_mb([browser, browser]) == pytest.approx(single, rel=0.5)
@@ -0,0 +1,47 @@
+import types
+import pytest
+from communication_analyzer import CommunicationAnalyzer
+from prompts import INTEREST_SCHEMA
+
+LLM_ANALYSIS = {"style": "informell", "tone": "locker", "interests": ["KI"], "pain_points": ["Zeit"], "approach": "kurz"}
+INTERESTS = {"interests": ["Golf"], "pain_points": ["Kosten"]}
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    analyzer = CommunicationAnalyzer(fused=False, pack_size=0)
+    # Der Klassifikator ist sich nur bei Anna sicher
+    analyzer.style_classifier = types.SimpleNamespace(classify=lambda texts: [
+        {"formality": "formell", "directness": "direkt", "tone": "sachlich"} if "Anna" in text else None
+        for text in texts
+    ])
+    calls = []
+
+    def complete_json(schema, **request):
+        calls.append(request["namespace"])
+        return dict(INTERESTS) if schema is INTEREST_SCHEMA else dict(LLM_ANALYSIS)
+
+    async def acomplete_json(schema, **request):
+        return complete_json(schema, **request)
+
+    monkeypatch.setattr(analyzer.llm_client, "complete_json", complete_json)
+    monkeypatch.setattr(analyzer.llm_client, "acomplete_json", acomplete_json)
+    return analyzer, calls
+
+def test_local_style_keeps_interests_and_pain_points(analyzer):
+    analyzer, calls = analyzer
+    analysis = analyzer.analyze_style({"name": "Anna"})
+
+    assert analysis["style"] == "formell, direkt"
+    assert analysis["tone"] == "sachlich"
+    assert analysis["interests"] == ["Golf"]
+    assert analysis["pain_points"] == ["Kosten"]
+    # Nur der kürzere Prompt, keine vollständige Stilanalyse
+    assert calls == ["interest_analysis"]
+
+def test_batch_mixes_local_and_llm_analyses(analyzer):
+    analyzer, calls = analyzer
+    anna, ben = analyzer.llm_client.run(analyzer.aanalyze_styles([{"name": "Anna"}, {"name": "Ben"}]))
+
+    assert (anna["style"], anna["interests"]) == ("formell, direkt", ["Golf"])
+    assert ben == LLM_ANALYSIS
+    assert sorted(calls) == ["communication_analysis", "interest_analysis"]
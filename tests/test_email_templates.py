@@ -0,0 +1,29 @@
+import pytest
+from email_templates import CompiledTemplate, TemplateEngine, TemplateError
+
+def test_rejects_unknown_and_formatted_placeholders():
+    with pytest.raises(TemplateError):
+        CompiledTemplate("t", "Hallo {vorname}", ["name"])
+    with pytest.raises(TemplateError):
+        CompiledTemplate("t", "Hallo {name!r}", ["name"])
+    with pytest.raises(TemplateError):
+        CompiledTemplate("t", "Hallo {name", ["name"])
+
+def test_render_fills_missing_values_with_empty_text():
+    template = CompiledTemplate("t", "Hallo {name}, {name} von {company}", ["name", "company"])
+    assert template.render({"name": "Anna"}) == "Hallo Anna, Anna von "
+
+def test_render_caches_per_values():
+    engine = TemplateEngine({"t": ("Für {name}", "Hallo {name}", ("name",))})
+    assert engine.render("t", {"name": "Anna"}) == ("Für Anna", "Hallo Anna")
+    engine.render("t", {"name": "Anna"})
+    assert engine.stats()["cache_hits"] == 2
+    assert engine.render_many("t", [{"name": "Ben"}, {"name": "Ben"}]) == [("Für Ben", "Hallo Ben")] * 2
+    assert engine.stats()["rendered"] == 4
+    with pytest.raises(TemplateError):
+        engine.render("unbekannt", {})
+
+def test_shipped_templates_compile():
+    subject, body = TemplateEngine().render("initial", {"name": "Anna", "company": "Berg GmbH"})
+    assert "Anna" in subject
+    assert "Berg GmbH" in body
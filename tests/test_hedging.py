@@ -0,0 +1,95 @@
+import asyncio
+import time
+from hedging import HedgePolicy, Hedger
+
+def test_unlisted_class_is_not_hedged():
+    hedger = Hedger(["website"])
+    assert hedger.policy("llm") is None
+    assert hedger.call("llm", lambda: "ok") == "ok"
+    assert Hedger(["*"]).policy("llm") is not None
+
+def test_slow_call_is_hedged():
+    hedger = Hedger(["llm"], percentile=0.5, budget=1.0, min_samples=3)
+    for _ in range(3):
+        hedger.call("llm", lambda: "schnell")
+    calls = []
+
+    def primary():
+        calls.append("primary")
+        time.sleep(0.5)
+        return "primary"
+
+    def backup():
+        calls.append("backup")
+        return "backup"
+
+    started = time.monotonic()
+    assert hedger.call("llm", primary, backup) == "backup"
+    assert time.monotonic() - started < 0.4
+    stats = hedger.stats()["llm"]
+    assert stats["hedged"] == 1
+    assert stats["hedge_wins"] == 1
+
+def test_budget_limits_hedges():
+    policy = HedgePolicy("llm", percentile=0.5, budget=0.0, min_samples=1)
+    policy.call(lambda: "schnell")
+    assert policy.call(lambda: time.sleep(0.05) or "langsam", executor=Hedger([]).executor) == "langsam"
+    assert policy.hedged == 0
+
+def test_async_hedge():
+    policy = HedgePolicy("llm", percentile=0.5, budget=1.0, min_samples=1)
+
+    async def fast():
+        return "schnell"
+
+    async def slow():
+        await asyncio.sleep(0.5)
+        return "langsam"
+
+    async def run():
+        await policy.acall(fast)
+        return await policy.acall(slow, fast)
+
+    assert asyncio.run(run()) == "schnell"
+    assert policy.wins == 1
+
+def test_async_loser_is_cancelled():
+    policy = HedgePolicy("llm", percentile=0.5, budget=1.0, min_samples=1)
+    cancelled = []
+
+    async def fast():
+        return "schnell"
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "langsam"
+
+    async def run():
+        await policy.acall(fast)
+        result = await policy.acall(slow, fast)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == "schnell"
+    assert cancelled == [True]
+    # Der abgebrochene erste Versuch zählt nicht für die Schwelle
+    assert len(policy._primary) == 1
+
+def test_failed_primaries_are_not_recorded():
+    policy = HedgePolicy("llm", min_samples=1)
+
+    def fail():
+        raise ValueError("kaputt")
+
+    for _ in range(3):
+        try:
+            policy.call(fail)
+        except ValueError:
+            pass
+    assert len(policy._primary) == 0
+    assert policy.call(lambda: "ok") == "ok"
+    assert len(policy._primary) == 1
@@ -0,0 +1,66 @@
+import logging
+import threading
+import pytest
+
+pytest.importorskip("langgraph")
+pytest.importorskip("apify_client")
+from lead_processor import LeadProcessor
+from mail_outbox import MailOutbox
+from mail_queue import MailQueue
+
+class FakePool:
+    def __init__(self, fail=0):
+        self.fail = fail
+
+    def send(self, msg):
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("SMTP nicht erreichbar")
+
+class FakeSheets:
+    """Merkt sich die gesetzten Status; done wird beim ersten gesetzt"""
+
+    def __init__(self):
+        self.statuses = []
+        self.done = threading.Event()
+
+    def update_lead_status(self, email, status):
+        self.statuses.append((email, status))
+        self.done.set()
+        return True
+
+def make_processor(tmp_path, pool):
+    # Ohne __init__: kein Browser, kein Apify, nur Ergebnis und Versand
+    processor = LeadProcessor.__new__(LeadProcessor)
+    processor.logger = logging.getLogger("test")
+    processor.sheets_manager = FakeSheets()
+    processor.mail_queue = MailQueue(pool, senders=1, per_minute=0, per_day=0, jitter=0,
+                                     outbox=MailOutbox(str(tmp_path / "outbox.sqlite3"), max_attempts=2))
+    return processor
+
+def test_result_has_lead_fields_at_top_level(tmp_path):
+    processor = make_processor(tmp_path, FakePool())
+    lead_data = {"email": "anna@berg.de", "name": "Anna", "domain_info": {"title": "Berg"}}
+    result = processor._lead_result(lead_data, "formell", "Hallo Anna")
+    assert result["email"] == "anna@berg.de"
+    assert result["domain_info"] == {"title": "Berg"}
+    assert result["lead_data"] == lead_data
+    assert result["communication_style"] == "formell"
+    assert not result["email_sent"]
+
+def test_deliver_marks_row_sent(tmp_path):
+    processor = make_processor(tmp_path, FakePool())
+    result = processor._lead_result({"email": "anna@berg.de"}, "formell", "Hallo Anna")
+    assert processor.deliver(result)
+    assert result["email_queued"]
+    assert processor.sheets_manager.done.wait(5)
+    assert processor.sheets_manager.statuses == [("anna@berg.de", "Sent")]
+    processor.mail_queue.close()
+
+def test_deliver_marks_row_failed(tmp_path):
+    processor = make_processor(tmp_path, FakePool(fail=1))
+    processor.deliver(processor._lead_result({"email": "anna@berg.de"}, "formell", "Hallo Anna"))
+    assert processor.sheets_manager.done.wait(5)
+    [(email, status)] = processor.sheets_manager.statuses
+    assert status.startswith("Versand wird wiederholt")
+    processor.mail_queue.close()
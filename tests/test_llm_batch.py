@@ -0,0 +1,100 @@
+import importlib.util
+import json
+import os
+import sys
+import pytest
+from llm_batch import BatchBackend, BatchManager, LocalBatchBackend
+
+FRONTEND = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "frontend")
+
+def load_frontend(name, filename):
+    # frontend/scheduler.py und frontend/ai_agent.py heißen wie Module im Hauptverzeichnis
+    spec = importlib.util.spec_from_file_location(name, os.path.join(FRONTEND, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+VALID = {
+    "name": "Anna Berg",
+    "company": "Berg GmbH",
+    "website_summary": "Maschinenbau",
+    "linkedin_summary": "Geschäftsführerin",
+    "communication_style": "formal",
+    "personalized_message": "Guten Tag Frau Berg",
+    "status": "aktiv"
+}
+
+LEADS = [
+    {"name": "Anna Berg", "company": "Berg GmbH", "email": "anna@berg.de"},
+    {"name": "Ben Kurz", "company": "Kurz AG", "email": "ben@kurz.de"}
+]
+
+def responder(body):
+    """Vollständige Analyse für Anna, unvollständige für Ben"""
+    if "Anna Berg" in json.dumps(body["messages"], ensure_ascii=False):
+        return json.dumps(VALID, ensure_ascii=False)
+    return json.dumps({"name": "Ben Kurz"})
+
+@pytest.fixture
+def scheduler(tmp_path, monkeypatch):
+    # frontend/scheduler.py importiert "ai_agent"
+    sys.modules["ai_agent"] = load_frontend("ai_agent", "ai_agent.py")
+    module = load_frontend("frontend_scheduler", "scheduler.py")
+    manager = BatchManager(LocalBatchBackend(str(tmp_path / "local"), responder), str(tmp_path / "batches"))
+    monkeypatch.setattr(module, "get_batch_manager", lambda: manager)
+    monkeypatch.chdir(tmp_path)
+    scheduler = module.LeadScheduler(batch_mode=True)
+    scheduler.ai_agent = sys.modules["ai_agent"].AIAgent()
+    yield scheduler, manager
+    sys.modules.pop("ai_agent", None)
+
+def test_backend_without_overrides_cannot_be_created():
+    class Incomplete(BatchBackend):
+        def submit(self, input_path):
+            return "job"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_local_backend_round_trip(tmp_path):
+    backend = LocalBatchBackend(str(tmp_path), lambda body: body["messages"][0]["content"].upper())
+    input_path = tmp_path / "input.jsonl"
+    input_path.write_text(json.dumps({
+        "custom_id": "a", "method": "POST", "url": "/v1/chat/completions",
+        "body": {"model": "m", "messages": [{"role": "user", "content": "hallo"}]}
+    }) + "\n", encoding="utf-8")
+
+    job_id = backend.submit(str(input_path))
+    assert backend.status(job_id) == "completed"
+    assert backend.results(job_id) == {"a": "HALLO"}
+
+def test_invalid_response_leaves_lead_unprocessed(scheduler):
+    scheduler, manager = scheduler
+    job_id = scheduler._submit_batch(LEADS)
+
+    assert scheduler.collect_batches() == 1
+    anna, ben = (scheduler._lead_id(lead) for lead in LEADS)
+    assert scheduler.processed_leads == [anna]
+    with open(scheduler.analyses_file, encoding="utf-8") as f:
+        analyses = json.load(f)
+    assert [analysis["email"] for analysis in analyses] == ["anna@berg.de"]
+    assert analyses[0]["personalized_message"] == VALID["personalized_message"]
+
+    # Der Job ist erledigt; Ben ist weder verarbeitet noch wartet er in einem Job und wird neu eingereicht
+    assert manager.job(job_id)["status"] == "collected"
+    assert scheduler._open_batch_jobs() == []
+    assert ben not in scheduler.processed_leads
+
+def test_only_valid_responses_are_cached(scheduler):
+    scheduler, manager = scheduler
+    requests = dict(zip((scheduler._lead_id(lead) for lead in LEADS), scheduler.ai_agent.prepare_requests(LEADS)))
+    job_id = manager.submit(requests)
+    manager.collect(job_id, validate=scheduler.ai_agent._is_valid_analysis)
+
+    # Eine erneute Einreichung findet nur Annas Antwort im Cache
+    resubmitted = manager.submit(requests)
+    rows = manager._conn.execute(
+        "SELECT custom_id, response FROM batch_requests WHERE job_id = ?", (resubmitted,)
+    ).fetchall()
+    cached = {custom_id for custom_id, response in rows if response is not None}
+    assert cached == {scheduler._lead_id(LEADS[0])}
@@ -0,0 +1,45 @@
+from llm_cache import LLMCache, prompt_version
+
+def test_key_ignores_whitespace(tmp_path):
+    key = LLMCache.make_key("gpt-4o-mini", 0.0, "v1", {"text": "Hallo   Welt\n"})
+    assert key == LLMCache.make_key("gpt-4o-mini", 0.0, "v1", {"text": "Hallo Welt"})
+    assert key != LLMCache.make_key("gpt-4o-mini", 0.0, "v2", {"text": "Hallo Welt"})
+    assert key != LLMCache.make_key("gpt-4o", 0.0, "v1", {"text": "Hallo Welt"})
+    assert prompt_version([{"a": 1}]) != prompt_version([{"a": 2}])
+
+def test_get_set_and_stats(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=0, max_entries=0)
+    assert cache.get("k") is None
+    cache.set("k", "Antwort", "analyse", {"lead": 1})
+    assert cache.get("k") == "Antwort"
+    assert cache.entries(["analyse"]) == [("analyse", {"lead": 1}, "Antwort")]
+    assert cache.stats()["hit_rate"] == 0.5
+
+def test_ttl_expires(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=1, max_entries=0)
+    cache.set("k", "Antwort")
+    cache._conn.execute("UPDATE llm_cache SET created_at = created_at - 10")
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=0, max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache._conn.execute("UPDATE llm_cache SET last_access = last_access - 10 WHERE key = 'b'")
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.evictions == 1
+
+def test_get_or_compute_validates(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=0, max_entries=0)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return "kaputt"
+
+    for _ in range(2):
+        cache.get_or_compute("analyse", "gpt-4o-mini", 0.0, "v1", "x", compute, validate=lambda text: text != "kaputt")
+    assert len(calls) == 2
@@ -0,0 +1,37 @@
+import pytest
+from llm_cassette import Cassette, CassetteMissError
+
+PARAMS = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "Hallo"}], "temperature": 0.0}
+
+def record_of(content):
+    return {"content": content, "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5}, "logprobs": None}
+
+def test_replays_recordings_in_order(tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    recorder = Cassette(path, mode="record")
+    recorder.record("chat", PARAMS, record_of("erste"), 0.5)
+    recorder.record("chat", PARAMS, record_of("zweite"), 0.5)
+
+    cassette = Cassette(path, mode="replay")
+    # Übertragungsparameter gehören nicht zum Schlüssel
+    assert cassette.play("chat", {**PARAMS, "stream": True})[0]["content"] == "erste"
+    assert cassette.play("chat", PARAMS) == (record_of("zweite"), 0.0)
+    # Danach bleibt es bei der letzten Aufnahme
+    assert cassette.play("chat", PARAMS)[0]["content"] == "zweite"
+    assert Cassette(path, mode="replay", latency="recorded").play("chat", PARAMS)[1] == 0.5
+
+def test_missing_recording_raises(tmp_path):
+    cassette = Cassette(str(tmp_path / "cassette.jsonl"), mode="replay")
+    with pytest.raises(CassetteMissError):
+        cassette.play("chat", PARAMS)
+    assert cassette.stats()["missing"] == 1
+
+def test_client_replays_chat_and_stream(tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    Cassette(path, mode="record").record("chat", PARAMS, record_of("Guten Tag aus der Aufnahme"), 0.1)
+
+    client = Cassette(path, mode="replay").wrap(lambda: pytest.fail("Replay darf keinen echten Client anlegen"))
+    assert client.chat.completions.create(**PARAMS).choices[0].message.content == "Guten Tag aus der Aufnahme"
+    chunks = list(client.chat.completions.create(**PARAMS, stream=True))
+    assert "".join(chunk.choices[0].delta.content for chunk in chunks if chunk.choices) == "Guten Tag aus der Aufnahme"
+    assert chunks[-1].usage.total_tokens == 5
@@ -0,0 +1,164 @@
+import asyncio
+import time
+from types import SimpleNamespace
+import openai
+import pytest
+from hedging import Hedger
+from llm_cache import LLMCache
+from llm_cassette import Cassette
+from llm_client import LLMClient, retry_after
+from mock_openai_server import MockOpenAIServer
+from rate_limiter import RateLimiter
+
+MESSAGES = [{"role": "user", "content": "Sag Hallo"}]
+ANSWER = "Hallo aus dem Mock-Server"
+
+@pytest.fixture
+def start_server():
+    servers = []
+
+    def start(**options):
+        options.setdefault("canned", [{"match": "Sag Hallo", "content": ANSWER}])
+        server = MockOpenAIServer(**options).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+def make_client(server, **kwargs):
+    # Eigener Limiter und Hedger, damit sich die Tests nicht über die Singletons beeinflussen
+    return LLMClient(api_key="test", base_url=server.base_url, limiter=RateLimiter(0, 0),
+                     hedger=Hedger([]), timeout=5, **kwargs)
+
+def fail_once(server):
+    """Der erste Aufruf bekommt ein 429 mit Retry-After, alle weiteren gehen durch"""
+    admit = server.mock.admit
+
+    def admit_once(tokens):
+        rejection = admit(tokens)
+        server.mock.error_rate = 0.0
+        return rejection
+
+    server.mock.error_rate = 1.0
+    server.mock.admit = admit_once
+
+def test_complete(start_server):
+    server = start_server()
+    client = make_client(server)
+    assert client.complete(MESSAGES, "gpt-4o-mini", 0.0, namespace="test") == ANSWER
+    assert client.usage_stats()["test"]["calls"] == 1
+
+def test_429_waits_for_retry_after(start_server):
+    server = start_server(retry_after=0.3)
+    fail_once(server)
+    client = make_client(server)
+    started = time.monotonic()
+    assert client.complete(MESSAGES, "gpt-4o-mini", 0.0) == ANSWER
+    assert time.monotonic() - started >= 0.3
+    assert server.mock.counts["injected_429"] == 1
+    assert server.mock.counts["chat_requests"] == 2
+
+def test_429_async_waits_for_retry_after(start_server):
+    server = start_server(retry_after=0.3)
+    fail_once(server)
+    client = make_client(server)
+    started = time.monotonic()
+    assert client.run(client.acomplete(MESSAGES, "gpt-4o-mini", 0.0)) == ANSWER
+    assert time.monotonic() - started >= 0.3
+    assert server.mock.counts["chat_requests"] == 2
+
+def test_retries_exhausted(start_server):
+    server = start_server(error_rate=1.0, retry_after=0)
+    client = make_client(server, max_retries=2)
+    with pytest.raises(openai.RateLimitError):
+        client.complete(MESSAGES, "gpt-4o-mini", 0.0)
+    assert server.mock.counts["chat_requests"] == 3
+
+def test_retry_after_headers():
+    def error(headers):
+        return SimpleNamespace(response=SimpleNamespace(headers=headers))
+
+    assert retry_after(error({"retry-after-ms": "250"}), 0) == 0.25
+    assert retry_after(error({"retry-after": "2"}), 0) == 2.0
+    # Ohne verwertbaren Header: exponentielles Backoff mit Jitter
+    assert 2.0 <= retry_after(error({"retry-after": "bald"}), 2) <= 4.0
+
+def test_streaming(start_server):
+    server = start_server()
+    client = make_client(server)
+    partials = []
+    assert client.complete(MESSAGES, "gpt-4o-mini", 0.0, namespace="stream", on_partial=partials.append) == ANSWER
+    assert len(partials) > 1
+    assert partials[-1] == ANSWER
+    assert all(ANSWER.startswith(partial) for partial in partials)
+    # Verbrauch kommt aus dem letzten Chunk (stream_options.include_usage)
+    assert client.usage_stats()["stream"]["completion_tokens"] > 0
+
+def test_streaming_async(start_server):
+    server = start_server()
+    client = make_client(server)
+    partials = []
+    result = client.run(client.acomplete(MESSAGES, "gpt-4o-mini", 0.0, on_partial=partials.append))
+    assert result == ANSWER
+    assert partials[-1] == ANSWER
+
+def test_cache_hit_skips_server(start_server):
+    server = start_server()
+    client = make_client(server)
+    inputs = {"lead": f"cache-{time.time()}"}
+    first = client.complete(MESSAGES, "gpt-4o-mini", 0.0, version="v1", cache_inputs=inputs)
+    partials = []
+    second = client.complete(MESSAGES, "gpt-4o-mini", 0.0, version="v1", cache_inputs=inputs,
+                             on_partial=partials.append)
+    assert first == second == ANSWER
+    assert partials == [ANSWER]
+    assert server.mock.counts["chat_requests"] == 1
+
+def test_cassette_replay_without_server(start_server, tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    server = start_server()
+    recorded = make_client(server, cassette=Cassette(path, mode="record")).complete(MESSAGES, "gpt-4o-mini", 0.0)
+    server.stop()
+
+    client = LLMClient(api_key="test", base_url="http://127.0.0.1:9/v1", limiter=RateLimiter(0, 0),
+                       hedger=Hedger([]), cassette=Cassette(path, mode="replay"))
+    assert client.complete(MESSAGES, "gpt-4o-mini", 0.0) == recorded == ANSWER
+
+def test_as_completed_yields_in_completion_order(start_server):
+    client = make_client(start_server())
+
+    async def after(delay, value):
+        await asyncio.sleep(delay)
+        return value
+
+    async def collect():
+        return [value async for value in client.as_completed([after(0.2, "langsam"), after(0.0, "schnell")])]
+
+    assert client.run(collect()) == ["schnell", "langsam"]
+
+def fake_response(content, logprob=None):
+    logprobs = SimpleNamespace(content=[SimpleNamespace(logprob=logprob)]) if logprob is not None else None
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content), logprobs=logprobs)],
+                           usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15))
+
+def test_escalation_validates_and_caches_under_large_model(start_server, tmp_path):
+    client = make_client(start_server())
+    client.cache = LLMCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=0, max_entries=0)
+    answers = {"klein": fake_response("unsicher", logprob=-3.0), "gross": fake_response("kaputt")}
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+        create=lambda model, **kwargs: answers[model]
+    )))
+    request = dict(namespace="analyse", version="v1", cache_inputs={"lead": 1},
+                   escalate_to="gross", min_confidence=0.5, validate=lambda text: text != "kaputt")
+
+    assert client.complete([{"role": "user", "content": "x"}], "klein", 0.0, **request) == "kaputt"
+    assert client.escalated["analyse"] == 1
+    # Weder die ungültige Antwort noch eine Antwort des großen Modells unter dem Schlüssel des kleinen
+    assert client.cache.stats()["entries"] == 0
+
+    answers["gross"] = fake_response("gut")
+    assert client.complete([{"role": "user", "content": "x"}], "klein", 0.0, **request) == "gut"
+    assert client.cache.get(client._cache_key("gross", 0.0, "v1", {"lead": 1})) == "gut"
+    assert client.cache.get(client._cache_key("klein", 0.0, "v1", {"lead": 1})) is None
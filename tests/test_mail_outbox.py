@@ -0,0 +1,122 @@
+import threading
+import pytest
+from mail_outbox import MailOutbox, message_id
+from mail_queue import MailQueue
+from smtp_pool import build_message
+
+@pytest.fixture
+def outbox(tmp_path):
+    return MailOutbox(str(tmp_path / "outbox.sqlite3"), max_attempts=2)
+
+def message(to="anna@berg.de"):
+    return build_message("vertrieb@firma.de", to, "Betreff", "Text")
+
+class FakePool:
+    """Verschickt nichts, merkt sich die Empfänger; fail lässt die ersten Versuche scheitern"""
+
+    def __init__(self, fail=0):
+        self.fail = fail
+        self.sent = []
+
+    def send(self, msg):
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("SMTP nicht erreichbar")
+        self.sent.append(msg['To'])
+
+def make_queue(pool, outbox):
+    return MailQueue(pool, senders=1, per_minute=0, per_day=0, jitter=0, drain_timeout=5, outbox=outbox)
+
+def test_pending_sending_sent(outbox):
+    assert outbox.add("anna:initial", message()) == "pending"
+    assert outbox.claim("anna:initial")
+    assert outbox.state("anna:initial") == "sending"
+    # Eine E-Mail in sending wird kein zweites Mal beansprucht
+    assert not outbox.claim("anna:initial")
+    outbox.mark_sent("anna:initial")
+    assert outbox.state("anna:initial") == "sent"
+    assert outbox.add("anna:initial", message()) == "sent"
+    assert not outbox.claim("anna:initial")
+    assert outbox.stats() == {"sent": 1}
+
+def test_failed_after_max_attempts(outbox):
+    outbox.add("anna:initial", message())
+    outbox.claim("anna:initial")
+    outbox.mark_failed("anna:initial", "Timeout")
+    assert outbox.state("anna:initial") == "pending"
+    outbox.claim("anna:initial")
+    outbox.mark_failed("anna:initial", "Timeout")
+    assert outbox.state("anna:initial") == "failed"
+    assert outbox.pending() == []
+
+def test_recover_after_crash(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    crashed = MailOutbox(path)
+    crashed.add("anna:initial", message())
+    crashed.add("ben:initial", message("ben@kurz.de"))
+    crashed.claim("anna:initial")
+    crashed.claim("ben:initial")
+    crashed.mark_sent("ben:initial")
+
+    # Neuer Prozess: nur der unterbrochene Versand geht zurück auf pending
+    restarted = MailOutbox(path)
+    assert restarted.state("anna:initial") == "sending"
+    assert restarted.recover() == 1
+    assert restarted.state("anna:initial") == "pending"
+    assert restarted.state("ben:initial") == "sent"
+    [(key, msg)] = restarted.pending()
+    assert key == "anna:initial"
+    assert msg['To'] == "anna@berg.de"
+
+def test_message_id_is_stable():
+    assert message_id("anna:initial", "vertrieb@firma.de") == message_id("anna:initial", "vertrieb@firma.de")
+    assert message_id("anna:initial", "vertrieb@firma.de").endswith("@firma.de>")
+    assert message_id("anna:initial", None) != message_id("anna:follow_up", None)
+
+def test_queue_sends_once_and_calls_back(outbox):
+    pool = FakePool()
+    queue = make_queue(pool, outbox)
+    sent = threading.Event()
+    assert queue.enqueue(message(), key="anna:initial", on_sent=sent.set)
+    assert queue.join(timeout=5)
+    assert sent.wait(5)
+    assert outbox.state("anna:initial") == "sent"
+
+    # Dieselbe E-Mail erneut: nicht verschickt, on_sent läuft sofort
+    again = threading.Event()
+    assert not queue.enqueue(message(), key="anna:initial", on_sent=again.set)
+    assert again.is_set()
+    assert pool.sent == ["anna@berg.de"]
+    queue.close()
+
+def test_queue_failure_calls_on_failed(outbox):
+    queue = make_queue(FakePool(fail=1), outbox)
+    errors = []
+    failed = threading.Event()
+
+    def on_failed(error):
+        errors.append(error)
+        failed.set()
+
+    queue.enqueue(message(), key="anna:initial", on_failed=on_failed)
+    assert failed.wait(5)
+    assert isinstance(errors[0], ConnectionError)
+    assert outbox.state("anna:initial") == "pending"
+    assert queue.stats()["failed"] == 1
+    queue.close()
+
+def test_resume_sends_interrupted_mail(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    crashed = MailOutbox(path)
+    crashed.add("anna:initial", message())
+    crashed.claim("anna:initial")
+    crashed.add("ben:initial", message("ben@kurz.de"))
+
+    pool = FakePool()
+    outbox = MailOutbox(path)
+    queue = make_queue(pool, outbox)
+    assert queue.resume() == 2
+    assert queue.join(timeout=5)
+    assert sorted(pool.sent) == ["anna@berg.de", "ben@kurz.de"]
+    assert outbox.stats() == {"sent": 2}
+    queue.close()
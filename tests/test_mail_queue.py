@@ -0,0 +1,76 @@
+import threading
+from mail_queue import MailQueue, SendBudget
+from smtp_pool import build_message
+
+def message(to="anna@berg.de"):
+    return build_message("vertrieb@firma.de", to, "Betreff", "Text")
+
+class FakePool:
+    """Verschickt nichts, merkt sich die Empfänger; fail lässt die ersten Versuche scheitern"""
+
+    def __init__(self, fail=0, hold=None):
+        self.fail = fail
+        self.hold = hold
+        self.sent = []
+
+    def send(self, msg):
+        if self.hold is not None:
+            self.hold.wait(5)
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("SMTP nicht erreichbar")
+        self.sent.append(msg['To'])
+
+def make_queue(pool):
+    return MailQueue(pool, senders=1, per_minute=0, per_day=0, jitter=0, drain_timeout=5)
+
+def test_queue_sends_and_calls_back():
+    pool = FakePool()
+    queue = make_queue(pool)
+    sent = threading.Event()
+    assert queue.enqueue(message(), key="anna:initial", on_sent=sent.set)
+    assert queue.join(timeout=5)
+    assert sent.wait(5)
+    assert pool.sent == ["anna@berg.de"]
+    assert queue.stats()["sent"] == 1
+    queue.close()
+
+def test_waiting_mail_is_not_enqueued_twice():
+    hold = threading.Event()
+    pool = FakePool(hold=hold)
+    queue = make_queue(pool)
+    assert queue.enqueue(message(), key="anna:follow_up")
+    assert not queue.enqueue(message(), key="anna:follow_up")
+    hold.set()
+    assert queue.join(timeout=5)
+    assert pool.sent == ["anna@berg.de"]
+    # Nach dem Versand darf derselbe Schlüssel wieder eingereiht werden
+    assert queue.enqueue(message(), key="anna:follow_up")
+    queue.close()
+
+def test_queue_failure_calls_on_failed():
+    queue = make_queue(FakePool(fail=1))
+    errors = []
+    failed = threading.Event()
+
+    def on_failed(error):
+        errors.append(error)
+        failed.set()
+
+    queue.enqueue(message(), key="anna:initial", on_failed=on_failed)
+    assert failed.wait(5)
+    assert isinstance(errors[0], ConnectionError)
+    assert queue.stats()["failed"] == 1
+    queue.close()
+
+def test_send_budget_spacing():
+    budget = SendBudget(per_minute=60, per_day=2, jitter=0)
+    assert budget.reserve() == 0
+    # Gleichmäßiger Abstand von 60/per_minute Sekunden
+    assert 0 < budget.reserve() <= 1.0
+    budget._next = 0
+    assert budget.reserve() == 0
+    budget._next = 0
+    # Tageslimit erreicht
+    assert budget.reserve() > 60
+    assert budget.sent_today() == 2
@@ -0,0 +1,39 @@
+import pytest
+from prompt_registry import Prompt, PromptRegistry, get_prompt_registry
+
+MESSAGES = [("system", "Du bist {rolle}."), ("human", "Analysiere {lead_data}")]
+
+def test_render_maps_roles_and_binds_partials():
+    prompt = Prompt("analyse", MESSAGES, {"rolle": "Vertriebsexperte"})
+    assert prompt.input_variables == ["lead_data"]
+    assert prompt.render(lead_data="Anna") == [
+        {"role": "system", "content": "Du bist Vertriebsexperte."},
+        {"role": "user", "content": "Analysiere Anna"}
+    ]
+    with pytest.raises(KeyError):
+        prompt.render()
+    with pytest.raises(ValueError):
+        Prompt("analyse", MESSAGES, {"unbekannt": "x"})
+
+def test_version_changes_with_template_and_partials():
+    base = Prompt("analyse", MESSAGES)
+    assert base.version == Prompt("analyse", list(MESSAGES)).version
+    assert base.version != Prompt("analyse", MESSAGES[:1]).version
+    assert Prompt("analyse", MESSAGES, {"rolle": "a"}).version != Prompt("analyse", MESSAGES, {"rolle": "b"}).version
+
+def test_request_uses_name_as_namespace():
+    request = Prompt("analyse", MESSAGES).request({"rolle": "x", "lead_data": "Anna"}, "gpt-4o-mini", 0.2, max_tokens=10)
+    assert request["namespace"] == "analyse"
+    assert request["cache_inputs"] == {"rolle": "x", "lead_data": "Anna"}
+    assert request["max_tokens"] == 10
+
+def test_registry_builds_each_variant_once():
+    registry = PromptRegistry({"analyse": MESSAGES})
+    assert registry.get("analyse") is registry.get("analyse")
+    assert registry.get("analyse", rolle="a") is not registry.get("analyse", rolle="b")
+    assert set(registry.versions()) == {"analyse"}
+
+def test_shipped_prompts_build():
+    versions = get_prompt_registry().versions()
+    assert "interest_analysis" in versions
+    assert all(len(version) == 12 for version in versions.values())
@@ -0,0 +1,30 @@
+import asyncio
+import time
+from rate_limiter import RateLimiter
+
+def test_requests_per_minute():
+    limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=0)
+    assert limiter._reserve(0) == 0
+    assert limiter._reserve(0) == 0
+    assert 59 < limiter._reserve(0) <= 60
+
+def test_tokens_per_minute():
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=1000)
+    assert limiter._reserve(600) == 0
+    assert limiter._reserve(600) > 0
+    # Ein einzelner Aufruf über dem Budget passt in ein leeres Fenster
+    assert RateLimiter(0, 1000)._reserve(5000) == 0
+
+def test_record_usage_corrects_reservation():
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=1000)
+    assert limiter._reserve(900) == 0
+    limiter.record_usage(900, 100)
+    assert limiter._reserve(800) == 0
+
+def test_penalize_blocks_all_callers():
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=0)
+    limiter.penalize(0.2)
+    started = time.monotonic()
+    limiter.acquire()
+    asyncio.run(limiter.aacquire())
+    assert time.monotonic() - started >= 0.2
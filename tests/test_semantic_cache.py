@@ -0,0 +1,40 @@
+from semantic_cache import SemanticCache
+
+def test_lookup_above_threshold(tmp_path):
+    cache = SemanticCache(str(tmp_path / "semantic.sqlite3"), threshold=0.95)
+    partition = cache.partition("analyse", "gpt-4o-mini", "v1")
+    cache.add(partition, "Maschinenbau aus Stuttgart", [1.0, 0.0, 0.0], "formell")
+    assert cache.lookup("analyse", partition, [0.99, 0.05, 0.0]) == "formell"
+    assert cache.lookup("analyse", partition, [0.0, 1.0, 0.0]) is None
+    # Andere Prompt-Version, andere Partition
+    assert cache.lookup("analyse", cache.partition("analyse", "gpt-4o-mini", "v2"), [1.0, 0.0, 0.0]) is None
+    stats = cache.stats()["analyse"]
+    assert stats["lookups"] == 3
+    assert stats["hits"] == 1
+
+def test_persists_and_evicts_oldest(tmp_path):
+    path = str(tmp_path / "semantic.sqlite3")
+    cache = SemanticCache(path, threshold=0.95, max_entries=2)
+    partition = cache.partition("analyse", "gpt-4o-mini", "v1")
+    cache.add(partition, "a", [1.0, 0.0, 0.0], "A")
+    cache.add(partition, "b", [0.0, 1.0, 0.0], "B")
+    cache.add(partition, "c", [0.0, 0.0, 1.0], "C")
+    # Gleicher Text (bis auf Whitespace) wird nicht doppelt abgelegt
+    cache.add(partition, " c ", [0.0, 0.0, 1.0], "C2")
+
+    reloaded = SemanticCache(path, threshold=0.95, max_entries=2)
+    assert reloaded.lookup("analyse", partition, [1.0, 0.0, 0.0]) is None
+    assert reloaded.lookup("analyse", partition, [0.0, 1.0, 0.0]) == "B"
+    assert reloaded.lookup("analyse", partition, [0.0, 0.0, 1.0]) == "C"
+
+def test_stats_for_other_thresholds(tmp_path):
+    cache = SemanticCache(str(tmp_path / "semantic.sqlite3"), threshold=0.99)
+    partition = cache.partition("analyse", "gpt-4o-mini", "v1")
+    cache.add(partition, "a", [1.0, 0.0], "A")
+    for _ in range(3):
+        cache.lookup("analyse", partition, [1.0, 0.0])
+    cache.lookup("analyse", partition, [0.96, 0.28])
+    stats = cache.stats()["analyse"]
+    assert stats["hit_rate"] == 0.75
+    assert stats["hit_rate_at"][0.95] == 1.0
+    assert stats["hit_rate_at"][0.97] == 0.75
@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("googleapiclient")
+pytest.importorskip("google_auth_oauthlib")
+from sheets_manager import SheetsManager
+
+class FakeSheet:
+    """Nachbau von service.spreadsheets().values() über einer Liste von Zeilen"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.updates = []
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId, range):
+        column = range.endswith("A:A")
+        return Result({"values": [row[:1] if column else row for row in self.rows]})
+
+    def update(self, spreadsheetId, range, valueInputOption, body):
+        self.updates.append((range, body["values"]))
+        return Result({})
+
+class Result:
+    def __init__(self, value):
+        self.value = value
+
+    def execute(self):
+        return self.value
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(SheetsManager, "setup_credentials", lambda self: None)
+    manager = SheetsManager()
+    manager.service = FakeSheet([
+        ["Email", "Name"],
+        ["anna@berg.de", "Anna"],
+        ["ben@kurz.de", "Ben"],
+        ["anna@berg.de", "Anna"]
+    ])
+    return manager
+
+def test_update_lead_status_sets_latest_row(manager):
+    assert manager.update_lead_status("anna@berg.de", "Sent")
+    assert manager.service.updates == [("Leads!I4", [["Sent"]])]
+
+def test_update_lead_status_unknown_lead(manager):
+    assert not manager.update_lead_status("Email", "Sent")
+    assert not manager.update_lead_status("carla@neu.de", "Sent")
+    assert manager.service.updates == []
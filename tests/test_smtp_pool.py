@@ -0,0 +1,78 @@
+import smtplib
+import pytest
+import smtp_pool
+from smtp_pool import SMTPPool, build_message
+
+class FakeSMTP:
+    """Ersetzt smtplib.SMTP; disconnects lässt die nächsten Sendeversuche mit getrennter Verbindung scheitern"""
+    connections = []
+    disconnects = 0
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.closed = False
+        self.logged_in = False
+        FakeSMTP.connections.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        self.logged_in = True
+
+    def send_message(self, msg):
+        if FakeSMTP.disconnects:
+            FakeSMTP.disconnects -= 1
+            raise smtplib.SMTPServerDisconnected("Verbindung getrennt")
+        self.sent.append(msg['To'])
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def fake_smtp(monkeypatch):
+    FakeSMTP.connections = []
+    FakeSMTP.disconnects = 0
+    monkeypatch.setattr(smtp_pool.smtplib, "SMTP", FakeSMTP)
+    return FakeSMTP
+
+def message(to):
+    return build_message("vertrieb@firma.de", to, "Betreff", "Text")
+
+def test_reuses_session(fake_smtp):
+    pool = SMTPPool("smtp.test", 587, "user", "secret", size=1)
+    for i in range(3):
+        pool.send(message(f"lead{i}@firma.de"))
+    [server] = fake_smtp.connections
+    assert server.logged_in
+    assert server.sent == ["lead0@firma.de", "lead1@firma.de", "lead2@firma.de"]
+    assert pool.stats() == {"connections": 1, "sent": 3}
+
+def test_closes_after_max_messages(fake_smtp):
+    pool = SMTPPool("smtp.test", 587, None, None, size=1, max_messages=2)
+    for i in range(3):
+        pool.send(message(f"lead{i}@firma.de"))
+    assert len(fake_smtp.connections) == 2
+    assert fake_smtp.connections[0].closed
+    assert not fake_smtp.connections[0].logged_in
+
+def test_reconnects_once_after_disconnect(fake_smtp):
+    pool = SMTPPool("smtp.test", 587, None, None, size=1)
+    fake_smtp.disconnects = 1
+    pool.send(message("lead@firma.de"))
+    assert pool.stats()["reconnects"] == 1
+    assert fake_smtp.connections[-1].sent == ["lead@firma.de"]
+
+    fake_smtp.disconnects = 2
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        pool.send(message("lead@firma.de"))
+
+def test_send_many_reports_errors_per_message(fake_smtp):
+    pool = SMTPPool("smtp.test", 587, None, None, size=2)
+    fake_smtp.disconnects = 2
+    results = pool.send_many([message("a@firma.de"), message("b@firma.de"), message("c@firma.de")])
+    assert sum(result is True for result in results) >= 2
+    assert all(result is True or isinstance(result, smtplib.SMTPServerDisconnected) for result in results)
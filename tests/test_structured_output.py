@@ -0,0 +1,42 @@
+import pytest
+from structured_output import Schema, SchemaField, parse_json, repair_json
+
+@pytest.mark.parametrize("text, expected", [
+    # Typografische Anführungszeichen im Text bleiben erhalten
+    ('{"text": "he said “hi”"}', {"text": "he said “hi”"}),
+    ('{"text": "sie sagte „ja“"}', {"text": "sie sagte „ja“"}),
+    # ... und werden als Begrenzer durch " ersetzt
+    ('{“text”: “he said “hi””}', {"text": "he said “hi”"}),
+    ('{„name“: „Anna“, „rolle“: „CTO“}', {"name": "Anna", "rolle": "CTO"}),
+    # Kommas und Python-Literale in Strings bleiben unverändert
+    ('{"a": "x, ]", "b": True,}', {"a": "x, ]", "b": True}),
+    ('{"a": "None of it", "b": None, "c": [False,]}', {"a": "None of it", "b": None, "c": [False]}),
+])
+def test_repair_json_quotes_and_literals(text, expected):
+    assert repair_json(text) == expected
+
+def test_repair_json_code_fence_and_surrounding_text():
+    assert repair_json('Hier ist das Ergebnis:\n```json\n{"a": 1}\n```\nGern geschehen.') == {"a": 1}
+
+def test_repair_json_truncated():
+    assert repair_json('{"a": "voll", "b": ["x", "y') == {"a": "voll", "b": ["x", "y"]}
+    assert repair_json('{"a": "voll", "b"') == {"a": "voll"}
+
+def test_repair_json_python_dict():
+    assert repair_json("{'a': 'b'}") == {"a": "b"}
+
+def test_repair_json_without_json():
+    assert repair_json("keine Antwort") is None
+    assert parse_json("") is None
+
+def test_schema_check_coerces_and_reports_missing():
+    schema = Schema({
+        "style": SchemaField(str),
+        "interests": SchemaField(list),
+        "note": SchemaField(str, required=False)
+    })
+    valid, failed = schema.check({"style": "formal", "interests": "Technik; Golf"})
+    assert valid == {"style": "formal", "interests": ["Technik", "Golf"], "note": None}
+    assert failed == []
+    assert schema.check({"interests": []})[1] == ["style", "interests"]
+    assert not schema.is_complete('{"style": "formal", "interests": "Technik"}')
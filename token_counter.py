@@ -0,0 +1,59 @@
+from functools import lru_cache
+from typing import Dict, List
+import logging
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+# Zuschlag pro Nachricht und für den Beginn der Antwort im Chat-Format
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+# Zeichen pro Token, falls kein Tokenizer geladen werden kann
+CHARS_PER_TOKEN = 4
+
+@lru_cache(maxsize=None)
+def encoding_for(model: str):
+    """Tokenizer des Modells; unbekannte Modelle zählen mit cl100k_base.
+
+    tiktoken lädt die Kodierung beim ersten Gebrauch herunter. Ohne Netzwerk und
+    ohne lokalen Cache wird auf eine Schätzung über die Zeichenzahl ausgewichen.
+    """
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"Tokenizer für {model} nicht verfügbar, schätze Tokens über die Textlänge: {str(e)}")
+        return None
+
+def _encode(text: str, model: str):
+    encoding = encoding_for(model)
+    return encoding.encode(text, disallowed_special=()) if encoding is not None else None
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """Anzahl der Tokens eines Textes"""
+    tokens = _encode(text, model)
+    if tokens is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(tokens)
+
+def count_message_tokens(messages: List[Dict[str, str]], model: str = "gpt-3.5-turbo") -> int:
+    """Eingabe-Tokens einer Chat-Completion im OpenAI-Nachrichtenformat"""
+    total = TOKENS_PER_REPLY
+    for message in messages:
+        total += TOKENS_PER_MESSAGE
+        total += count_tokens(message["role"], model)
+        total += count_tokens(message["content"] or "", model)
+    return total
+
+def truncate_tokens(text: str, max_tokens: int, model: str = "gpt-3.5-turbo") -> str:
+    """Kürzt einen Text auf höchstens max_tokens Tokens"""
+    max_tokens = max(0, max_tokens)
+    tokens = _encode(text, model)
+    if tokens is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding_for(model).decode(tokens[:max_tokens])